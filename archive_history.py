@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Move old expense history out of the hot tables
+
+Expenses (with their shares) and payments at or before a group's latest
+checkpoint are settled and never read again; they are moved to the archived_*
+tables, in the main database or in the SQLite file named by DB_ARCHIVE_PATH.
+With --before, unsettled history older than the date is moved too and its net
+(payer, borrower) amounts are kept in opening_balances, so balances and
+settlements come out unchanged.
+
+Each group is archived in its own transaction. Rows are copied before they are
+deleted and copies are skipped when already present, so an interrupted run
+(where an attached WAL archive may commit without the main database) can be
+repeated.
+
+Usage:
+    python archive_history.py [--group GROUP_ID] [--before YYYY-MM-DD] [--archive-path FILE]
+"""
+
+import argparse
+import logging
+import os
+from database import Database, DatabaseError, archive_prefix
+
+logger = logging.getLogger(__name__)
+
+# Net amounts of the unsettled rows being moved, merged into the group's opening balances
+OPENING_BALANCE_UPSERT = """
+    INSERT INTO opening_balances (group_id, payer_id, borrower_id, amount_cents, ledger_version)
+    SELECT ?, payer, borrower, SUM(amount), MAX(version) FROM (
+        SELECT es.paid_by_id AS payer, es.borrower_id AS borrower, es.amount_cents AS amount,
+               e.ledger_version AS version
+        FROM expense e
+        JOIN expense_share es ON es.expense_id = e.expense_id
+        WHERE e.group_id = ? AND {expense_condition} AND e.ledger_version > ? AND es.paid_by_id != es.borrower_id
+        UNION ALL
+        SELECT p.payer_id, p.receiver_id, p.amount_cents, p.ledger_version
+        FROM payments p
+        WHERE p.group_id = ? AND {payment_condition} AND p.ledger_version > ?
+    ) AS moved
+    WHERE true
+    GROUP BY payer, borrower
+    ON CONFLICT (group_id, payer_id, borrower_id) DO UPDATE SET
+        amount_cents = opening_balances.amount_cents + excluded.amount_cents,
+        ledger_version = CASE WHEN excluded.ledger_version > opening_balances.ledger_version
+                              THEN excluded.ledger_version ELSE opening_balances.ledger_version END
+"""
+
+
+def archive_condition(alias, before):
+    """Rows to move: settled ones (at or before the checkpoint), or older than the cutoff date"""
+    if before:
+        return f"({alias}ledger_version <= ? OR {alias}created_at < ?)"
+    return f"{alias}ledger_version <= ?"
+
+
+def archive_group(db, group_id, before=None):
+    """
+    Archive one group's old history in the caller's transaction.
+
+    :param before: Also move unsettled history created before this date ('YYYY-MM-DD')
+    :return: {"expenses", "shares", "payments"} moved row counts
+    """
+    # Takes the write lock before the checkpoint is read
+    db.cur.execute("UPDATE groups SET checkpoint_version = checkpoint_version WHERE group_id = ?", (group_id,))
+    db.cur.execute("SELECT checkpoint_version FROM groups WHERE group_id = ?", (group_id,))
+    row = db.cur.fetchone()
+    checkpoint = row[0] if row and row[0] is not None else -1
+    condition_params = (checkpoint, before) if before else (checkpoint,)
+    prefix = archive_prefix()
+
+    def condition(alias=""):
+        return archive_condition(f"{alias}." if alias else "", before)
+
+    # Opening balances from before the checkpoint are settled
+    db.cur.execute("DELETE FROM opening_balances WHERE group_id = ? AND ledger_version <= ?", (group_id, checkpoint))
+    if before:
+        db.cur.execute(OPENING_BALANCE_UPSERT.format(expense_condition=condition("e"), payment_condition=condition("p")),
+                       (group_id, group_id, *condition_params, checkpoint, group_id, *condition_params, checkpoint))
+
+    db.cur.execute(f"""
+        INSERT INTO {prefix}archived_expense (expense_id, name, paid_by, total_amount, total_cents, split_type,
+                                              group_id, created_at, ledger_version)
+        SELECT e.expense_id, e.name, e.paid_by, e.total_amount, e.total_cents, e.split_type,
+               e.group_id, e.created_at, e.ledger_version
+        FROM expense e
+        WHERE e.group_id = ? AND {condition("e")}
+        ON CONFLICT DO NOTHING
+    """, (group_id, *condition_params))
+    db.cur.execute(f"""
+        INSERT INTO {prefix}archived_expense_share (expense_id, borrower_id, paid_by_id, amount, amount_cents,
+                                                    created_at)
+        SELECT es.expense_id, es.borrower_id, es.paid_by_id, es.amount, es.amount_cents, es.created_at
+        FROM expense e
+        JOIN expense_share es ON es.expense_id = e.expense_id
+        WHERE e.group_id = ? AND {condition("e")}
+        ON CONFLICT DO NOTHING
+    """, (group_id, *condition_params))
+    db.cur.execute(f"""
+        INSERT INTO {prefix}archived_payments (payment_id, group_id, payer_id, receiver_id, amount_cents,
+                                               ledger_version, created_at)
+        SELECT p.payment_id, p.group_id, p.payer_id, p.receiver_id, p.amount_cents, p.ledger_version, p.created_at
+        FROM payments p
+        WHERE p.group_id = ? AND {condition("p")}
+        ON CONFLICT DO NOTHING
+    """, (group_id, *condition_params))
+
+    db.cur.execute(f"""
+        DELETE FROM expense_share WHERE expense_id IN (
+            SELECT expense_id FROM expense WHERE group_id = ? AND {condition()}
+        )
+    """, (group_id, *condition_params))
+    shares = db.cur.rowcount
+    db.cur.execute(f"DELETE FROM expense WHERE group_id = ? AND {condition()}", (group_id, *condition_params))
+    expenses = db.cur.rowcount
+    db.cur.execute(f"DELETE FROM payments WHERE group_id = ? AND {condition()}", (group_id, *condition_params))
+    return {"expenses": expenses, "shares": shares, "payments": db.cur.rowcount}
+
+
+def archive_history(group_ids=None, before=None):
+    """
+    Archive old history of the given groups (every group with something to move when None).
+
+    :return: Total {"groups", "expenses", "shares", "payments"} moved
+    """
+    totals = {"groups": 0, "expenses": 0, "shares": 0, "payments": 0}
+    with Database() as db:
+        if group_ids is None:
+            # Without a cutoff date only groups that were settled at some point have history to move
+            query = "SELECT group_id FROM groups" if before else \
+                "SELECT group_id FROM groups WHERE checkpoint_version IS NOT NULL"
+            db.cur.execute(query)
+            group_ids = [row[0] for row in db.cur.fetchall()]
+
+        for group_id in group_ids:
+            try:
+                moved = archive_group(db, group_id, before)
+                db.conn.commit()
+            except DatabaseError as e:
+                db.conn.rollback()
+                logger.error(f"Error archiving group {group_id}: {e}")
+                raise
+            if moved["expenses"] or moved["payments"]:
+                totals["groups"] += 1
+                for key, count in moved.items():
+                    totals[key] += count
+    logger.info(f"Archived {totals['expenses']} expenses and {totals['payments']} payments "
+                f"from {totals['groups']} groups")
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Move settled expense history into the archive tables")
+    parser.add_argument("--group", default=None, help="Only archive this group")
+    parser.add_argument("--before", default=None,
+                        help="Also archive unsettled history created before this date (YYYY-MM-DD)")
+    parser.add_argument("--archive-path", default=None,
+                        help="SQLite file for the archive tables (defaults to DB_ARCHIVE_PATH, else the main database)")
+    args = parser.parse_args()
+
+    if args.archive_path:
+        os.environ['DB_ARCHIVE_PATH'] = args.archive_path
+    totals = archive_history([args.group] if args.group else None, args.before)
+    print(f"Archived {totals['expenses']} expenses ({totals['shares']} shares) and {totals['payments']} payments "
+          f"from {totals['groups']} groups")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
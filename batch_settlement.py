@@ -0,0 +1,167 @@
+"""
+Vectorized settlement recomputation for many groups at once.
+
+Shares and payments of all requested groups since their last checkpoint are
+loaded as NumPy arrays, net balances are summed with one sort-and-reduce over
+interned (group, user) keys, and the matcher selected by SETTLEMENT_SOLVER runs
+per group, so results are identical to BalanceCalculator.settle_transactions on
+the same balances.
+"""
+
+import logging
+import os
+from operator import itemgetter
+import numpy as np
+from database import Database
+from logic import (BalanceCalculator, HISTORY_SQL, history_filters, match_settlements, diff_settlements,
+                   write_settlement_diff)
+from settlement_solver import optimal_settlements
+
+logger = logging.getLogger(__name__)
+
+# Bound on ? placeholders per IN (...) list
+GROUP_CHUNK_SIZE = 500
+
+
+def _in_chunks(items, size=GROUP_CHUNK_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class ShareArrays:
+    """Shares and payments as parallel arrays of interned group and user indices"""
+    def __init__(self, groups, users, group_idx, payer_idx, borrower_idx, cents):
+        self.groups = groups          # index -> group_id
+        self.users = users            # index -> user_id, sorted
+        self.group_idx = group_idx
+        self.payer_idx = payer_idx
+        self.borrower_idx = borrower_idx
+        self.cents = cents
+
+    @classmethod
+    def from_rows(cls, rows):
+        if not rows:
+            empty = np.zeros(0, dtype=np.int64)
+            return cls([], [], empty, empty, empty, empty)
+        # Column-wise extraction is much cheaper than zip(*rows) for millions of rows
+        groups, group_idx = np.unique(np.array(list(map(itemgetter(0), rows))), return_inverse=True)
+        user_col = np.array(list(map(itemgetter(1), rows)) + list(map(itemgetter(2), rows)))
+        # Sorted so each group's members come out in user_id order, like the ledger query
+        users, user_idx = np.unique(user_col, return_inverse=True)
+        payer_idx, borrower_idx = np.split(user_idx.astype(np.int64), 2)
+        cents = np.fromiter(map(itemgetter(3), rows), dtype=np.int64, count=len(rows))
+        return cls(groups.tolist(), users.tolist(), group_idx.astype(np.int64), payer_idx, borrower_idx, cents)
+
+
+class BatchSettlement:
+    def __init__(self, solver=None):
+        self.solver = solver or os.getenv('SETTLEMENT_SOLVER', 'greedy')
+        if self.solver not in BalanceCalculator.SOLVERS:
+            raise ValueError(f"Invalid settlement solver. Must be one of: {list(BalanceCalculator.SOLVERS)}")
+
+    def load(self, group_ids=None):
+        """
+        Read ledger versions and history rows for the given groups (all groups when None).
+
+        Versions are read before the shares, so a concurrent write can only make the
+        stored result look stale (and be recomputed on view), never newer than it is.
+
+        :return: ({group_id: ledger_version}, ShareArrays)
+        """
+        with Database() as db:
+            versions, rows = {}, []
+            if group_ids is None:
+                db.cur.execute("SELECT group_id, ledger_version FROM groups")
+                versions.update(db.cur.fetchall())
+                filters, params = history_filters()
+                db.cur.execute(HISTORY_SQL.format(**filters), params)
+                rows = db.cur.fetchall()
+            else:
+                group_ids = list(group_ids)
+                for chunk in _in_chunks(group_ids):
+                    placeholders = ", ".join("?" * len(chunk))
+                    db.cur.execute(f"SELECT group_id, ledger_version FROM groups WHERE group_id IN ({placeholders})",
+                                   chunk)
+                    versions.update(db.cur.fetchall())
+                for chunk in _in_chunks(group_ids):
+                    filters, params = history_filters(chunk)
+                    db.cur.execute(HISTORY_SQL.format(**filters), params)
+                    rows.extend(db.cur.fetchall())
+        return versions, ShareArrays.from_rows(rows)
+
+    def net_balances(self, shares):
+        """Non-zero net balances in cents per group: {group_id: {user_id: cents}}"""
+        if not len(shares.cents):
+            return {}
+        num_users = len(shares.users)
+        # Payer is owed the share, borrower owes it; one (group, user) key per entry
+        keys = np.concatenate([shares.group_idx * num_users + shares.payer_idx,
+                               shares.group_idx * num_users + shares.borrower_idx])
+        deltas = np.concatenate([shares.cents, -shares.cents])
+
+        order = np.argsort(keys, kind="stable")
+        keys, deltas = keys[order], deltas[order]
+        starts = np.flatnonzero(np.concatenate([[True], keys[1:] != keys[:-1]]))
+        totals = np.add.reduceat(deltas, starts)
+        keys = keys[starts]
+
+        nonzero = totals != 0
+        keys, totals = keys[nonzero], totals[nonzero]
+        group_of, user_of = np.divmod(keys, num_users)
+
+        # Keys are sorted, so each group's members are one contiguous run
+        bounds = np.flatnonzero(np.diff(group_of)) + 1
+        starts = np.concatenate([[0], bounds]).tolist()
+        ends = np.concatenate([bounds, [len(keys)]]).tolist()
+        group_of, user_of, totals = group_of.tolist(), user_of.tolist(), totals.tolist()
+        users = shares.users
+
+        balances = {}
+        for start, end in zip(starts, ends):
+            if start == end:
+                continue
+            balances[shares.groups[group_of[start]]] = {users[u]: c for u, c in zip(user_of[start:end],
+                                                                                  totals[start:end])}
+        return balances
+
+    def settle(self, group_ids=None):
+        """
+        Compute settlements without storing them.
+
+        :return: ({group_id: [(group_id, debtor, creditor, amount)]}, {group_id: ledger_version})
+        """
+        versions, shares = self.load(group_ids)
+        balances = self.net_balances(shares)
+        match = optimal_settlements if self.solver == "optimal" else match_settlements
+        results = {group_id: match(balances[group_id], group_id) if group_id in balances else []
+                   for group_id in versions}
+        return results, versions
+
+    def store(self, results, versions):
+        """
+        Write the balance_sheet changes of every group in results in one transaction.
+
+        :return: {"inserted", "updated", "deleted"} row counts
+        """
+        group_ids = list(results)
+        with Database() as db:
+            # The version stamps go first: they take the write lock before the rows are read
+            db.cur.executemany("UPDATE groups SET settled_version = ? WHERE group_id = ?",
+                               [(versions[group_id], group_id) for group_id in group_ids])
+            stored = {group_id: [] for group_id in group_ids}
+            for chunk in _in_chunks(group_ids):
+                placeholders = ", ".join("?" * len(chunk))
+                db.cur.execute("SELECT group_id, id, borrower_id, receiver_id, amount_cents FROM balance_sheet "
+                               f"WHERE group_id IN ({placeholders})", chunk)
+                for row in db.cur.fetchall():
+                    stored[row[0]].append(row[1:])
+            diffs = [diff_settlements(stored[group_id], results[group_id]) for group_id in group_ids]
+            write_settlement_diff(db.cur, diffs)
+        return {key: sum(len(diff[key]) for diff in diffs) for key in ("inserted", "updated", "deleted")}
+
+    def recompute(self, group_ids=None):
+        """Recompute and store settlements; returns the number of groups processed"""
+        results, versions = self.settle(group_ids)
+        self.store(results, versions)
+        logger.info(f"Recomputed settlements for {len(results)} groups")
+        return len(results)
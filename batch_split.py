@@ -0,0 +1,142 @@
+"""
+Vectorized expense splitting for many expenses at once.
+
+The process_batch methods of the split strategies take columnar inputs instead
+of one expense's list of dicts:
+
+    expense_idx  - expense index of each share row, non-decreasing (rows grouped by expense)
+    borrower_ids - borrower of each share row
+    paid_by      - payer of each expense
+    total_cents  - total of each expense in minor units
+    values       - per share row: amount in minor units (unequal) or percentage (percentage)
+
+Sums are validated and amounts allocated for all expenses in one pass, with the
+same largest-remainder rule as money.allocate, so every valid expense gets the
+same shares as process_split. Percentages are resolved to PERCENT_DIGITS decimals.
+"""
+
+import numpy as np
+from money import to_cents, from_cents
+
+PERCENT_DIGITS = 4
+PERCENT_SCALE = 10 ** PERCENT_DIGITS
+
+
+class SplitBatch:
+    """Share rows of every valid expense whose borrower is not the payer, as parallel arrays"""
+    def __init__(self, expense_idx, borrower_ids, paid_by_ids, cents, invalid):
+        self.expense_idx = expense_idx
+        self.borrower_ids = borrower_ids
+        self.paid_by_ids = paid_by_ids
+        self.cents = cents
+        self.invalid = invalid    # per expense: failed validation, rows left out
+
+    def transactions(self):
+        """{expense index: [(borrower_id, paid_by_id, amount)]} for the valid expenses, like process_split"""
+        result = {int(index): [] for index in np.flatnonzero(~self.invalid)}
+        for index, borrower, payer, cents in zip(self.expense_idx.tolist(), self.borrower_ids.tolist(),
+                                                 self.paid_by_ids.tolist(), self.cents.tolist()):
+            result[index].append((borrower, payer, from_cents(cents)))
+        return result
+
+
+def share_columns(expenses, value_key=None):
+    """
+    Columnar inputs from expense dicts (as taken by Expense) with "paid_by",
+    "total_amount" and "user_shares".
+
+    :param value_key: "amount" (returned in minor units) or "percentage" to also return row values
+    :return: (expense_idx, borrower_ids, paid_by, total_cents, values or None)
+    """
+    expense_idx, borrower_ids, values = [], [], []
+    for index, expense in enumerate(expenses):
+        for share in expense["user_shares"]:
+            expense_idx.append(index)
+            borrower_ids.append(share["borrower_id"])
+            if value_key == "amount":
+                values.append(to_cents(share["amount"]))
+            elif value_key:
+                values.append(float(share[value_key]))
+    paid_by = [expense["paid_by"] for expense in expenses]
+    total_cents = [to_cents(expense["total_amount"]) for expense in expenses]
+    return expense_idx, borrower_ids, paid_by, total_cents, (values if value_key else None)
+
+
+def _prepare(expense_idx, borrower_ids, paid_by, total_cents, values=None):
+    expense_idx = np.asarray(expense_idx, dtype=np.int64)
+    borrower_ids = np.asarray(borrower_ids)
+    paid_by = np.asarray(paid_by)
+    total_cents = np.asarray(total_cents, dtype=np.int64)
+    if len(borrower_ids) != len(expense_idx) or (values is not None and len(values) != len(expense_idx)):
+        raise ValueError("expense_idx, borrower_ids and values must have one entry per share row")
+    if len(paid_by) != len(total_cents):
+        raise ValueError("paid_by and total_cents must have one entry per expense")
+    if len(expense_idx) and (np.any(np.diff(expense_idx) < 0) or expense_idx[0] < 0
+                             or expense_idx[-1] >= len(total_cents)):
+        raise ValueError("expense_idx must be non-decreasing indices into the expenses")
+    # Row range [starts[i], ends[i]) of expense i
+    ends = np.searchsorted(expense_idx, np.arange(len(total_cents)), side="right")
+    starts = np.concatenate([[0], ends[:-1]]).astype(np.int64)
+    return expense_idx, borrower_ids, paid_by, total_cents, starts, ends
+
+
+def _segment_sums(values, starts, ends):
+    """Exact integer sum of every expense's rows (zero for expenses without rows)"""
+    cumulative = np.concatenate([[0], np.cumsum(values, dtype=np.int64)])
+    return cumulative[ends] - cumulative[starts]
+
+
+def _allocate(expense_idx, starts, ends, total_cents, weights, weight_sums):
+    """
+    Vectorized money.allocate: split each expense's total proportionally to its
+    rows' weights; leftover cents go to the largest remainders, earlier rows first.
+    """
+    row_totals = total_cents[expense_idx]
+    row_weight_sums = weight_sums[expense_idx]
+    exact = row_totals * weights
+    cents = exact // row_weight_sums
+    remainders = exact % row_weight_sums
+    leftover = total_cents - _segment_sums(cents, starts, ends)
+
+    positions = np.arange(len(expense_idx))
+    order = np.lexsort((positions, -remainders, expense_idx))
+    rank = positions - starts[expense_idx[order]]
+    cents[order[rank < leftover[expense_idx[order]]]] += 1
+    return cents
+
+
+def _finish(expense_idx, borrower_ids, paid_by, cents, invalid):
+    payers = paid_by[expense_idx]
+    keep = ~invalid[expense_idx] & (borrower_ids != payers)
+    return SplitBatch(expense_idx[keep], borrower_ids[keep], payers[keep], cents[keep], invalid)
+
+
+def split_equal(expense_idx, borrower_ids, paid_by, total_cents):
+    """Batch EqualExpenseSplit; expenses without share rows are invalid"""
+    expense_idx, borrower_ids, paid_by, total_cents, starts, ends = _prepare(
+        expense_idx, borrower_ids, paid_by, total_cents)
+    counts = ends - starts
+    invalid = counts == 0
+    weights = np.ones(len(expense_idx), dtype=np.int64)
+    cents = _allocate(expense_idx, starts, ends, total_cents, weights, np.maximum(counts, 1))
+    return _finish(expense_idx, borrower_ids, paid_by, cents, invalid)
+
+
+def split_unequal(expense_idx, borrower_ids, paid_by, total_cents, amount_cents):
+    """Batch UnequalExpenseSplit; expenses whose share amounts do not add up to the total are invalid"""
+    expense_idx, borrower_ids, paid_by, total_cents, starts, ends = _prepare(
+        expense_idx, borrower_ids, paid_by, total_cents, amount_cents)
+    cents = np.asarray(amount_cents, dtype=np.int64)
+    invalid = _segment_sums(cents, starts, ends) != total_cents
+    return _finish(expense_idx, borrower_ids, paid_by, cents, invalid)
+
+
+def split_percentage(expense_idx, borrower_ids, paid_by, total_cents, percentages):
+    """Batch PercentageExpenseSplit; expenses whose percentages do not add up to 100 are invalid"""
+    expense_idx, borrower_ids, paid_by, total_cents, starts, ends = _prepare(
+        expense_idx, borrower_ids, paid_by, total_cents, percentages)
+    weights = np.rint(np.asarray(percentages, dtype=np.float64) * PERCENT_SCALE).astype(np.int64)
+    invalid = _segment_sums(weights, starts, ends) != 100 * PERCENT_SCALE
+    weight_sums = np.full(len(total_cents), 100 * PERCENT_SCALE, dtype=np.int64)
+    cents = _allocate(expense_idx, starts, ends, total_cents, weights, weight_sums)
+    return _finish(expense_idx, borrower_ids, paid_by, cents, invalid)
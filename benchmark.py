@@ -0,0 +1,513 @@
+#!/usr/bin/env python3
+"""
+Performance benchmarks for SplitWise
+
+Each benchmark builds its own throwaway database in a temp directory.
+
+Usage:
+    python benchmark.py profile [--seconds 5] [--readers 4]
+    python benchmark.py bulk [--expenses 5000]
+    python benchmark.py settle [--members 10 1000 10000 100000]
+    python benchmark.py balances [--shares 1000000] [--group-members 100]
+    python benchmark.py migrate [--shares 1000000]
+    python benchmark.py batch [--groups 100000] [--loop-groups 5000]
+    python benchmark.py solver [--solver-members 6 10 14 18 20 24] [--trials 20]
+    python benchmark.py split [--split-expenses 100000]
+    python benchmark.py import [--import-records 50000 200000]
+    python benchmark.py export [--export-shares 100000 1000000]
+    python benchmark.py ids [--id-shares 10000000] [--id-stages 5]
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+import resource
+import logging
+from connection_sqlite import Database, close_all_pools
+from expense_controller import ExpenseController
+from logic import BalanceCalculator
+from batch_settlement import BatchSettlement
+from settlement_solver import optimal_settlements
+from expense import Expense
+from batch_split import share_columns
+from import_expenses import import_expenses
+from ledger_export import export_group
+from migrations import migrate_database
+from ids import new_id
+
+
+def use_fresh_database(name, **env):
+    """Point DB_PATH (and any DB_* settings) at a new temp database"""
+    close_all_pools()
+    for key, value in env.items():
+        os.environ[key] = str(value)
+    os.environ['DB_PATH'] = os.path.join(tempfile.mkdtemp(prefix='splitwise_bench_'), f'{name}.db')
+    return os.environ['DB_PATH']
+
+
+def seed_group(num_members, group_id='bench_group'):
+    """Create a group with num_members users; returns the member ids"""
+    with Database() as db:
+        db.cur.execute("INSERT INTO groups (group_id, group_name) VALUES (?, ?)", (group_id, 'Benchmark'))
+        db.cur.executemany(
+            "INSERT INTO users (user_id, user_name) VALUES (?, ?)",
+            [(i, f'bench_user_{i}') for i in range(1, num_members + 1)]
+        )
+        db.cur.executemany(
+            "INSERT INTO group_members (group_id, user_id) VALUES (?, ?)",
+            [(group_id, i) for i in range(1, num_members + 1)]
+        )
+    return list(range(1, num_members + 1))
+
+
+def bench_profile(args):
+    """Read throughput while a writer keeps inserting expenses, per DB_PROFILE"""
+    print(f"{'Profile':<12} {'Reads/s':>10} {'Writes/s':>10} {'Read errors':>12} {'Write errors':>13}")
+    print("-" * 61)
+    for profile in ['default', 'production']:
+        use_fresh_database(f'profile_{profile}', DB_PROFILE=profile, DB_POOL_SIZE=args.readers + 1)
+        members = seed_group(8)
+        controller = ExpenseController()
+        for i in range(200):
+            controller.create_expense('bench_group', f'seed {i}', 80.0, members[i % 8], members)
+
+        stop = threading.Event()
+        counts = {"reads": 0, "read_errors": 0, "writes": 0, "write_errors": 0}
+        lock = threading.Lock()
+
+        def writer():
+            i = 0
+            while not stop.is_set():
+                result = controller.create_expense('bench_group', f'expense {i}', 80.0, members[i % 8], members)
+                with lock:
+                    counts["writes" if result['success'] else "write_errors"] += 1
+                i += 1
+
+        def reader():
+            while not stop.is_set():
+                try:
+                    with Database() as db:
+                        db.cur.execute("""
+                            SELECT e.expense_id, e.name, e.total_cents, e.paid_by, u.user_name, e.created_at
+                            FROM expense e
+                            JOIN users u ON e.paid_by = u.user_id
+                            WHERE e.group_id = ?
+                            ORDER BY e.created_at DESC
+                            LIMIT 50
+                        """, ('bench_group',))
+                        db.cur.fetchall()
+                    key = "reads"
+                except Exception:
+                    key = "read_errors"
+                with lock:
+                    counts[key] += 1
+
+        threads = [threading.Thread(target=writer)] + [threading.Thread(target=reader) for _ in range(args.readers)]
+        for thread in threads:
+            thread.start()
+        time.sleep(args.seconds)
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+        print(f"{profile:<12} {counts['reads'] / args.seconds:>10.0f} {counts['writes'] / args.seconds:>10.0f} "
+              f"{counts['read_errors']:>12} {counts['write_errors']:>13}")
+    close_all_pools()
+
+
+def bench_bulk(args):
+    """Expense import throughput: one create_expense call per expense vs bulk_create_expenses"""
+    num_members = 8
+    print(f"{'Path':<24} {'Expenses':>9} {'Seconds':>9} {'Rows/s':>10}")
+    print("-" * 55)
+    for path in ['create_expense', 'bulk_create_expenses']:
+        use_fresh_database(f'bulk_{path}')
+        members = seed_group(num_members)
+        controller = ExpenseController()
+        rows = args.expenses * (1 + num_members)
+
+        start = time.perf_counter()
+        if path == 'create_expense':
+            for i in range(args.expenses):
+                controller.create_expense('bench_group', f'expense {i}', 80.0, members[i % num_members], members)
+        else:
+            result = controller.bulk_create_expenses(
+                {"name": f'expense {i}', "paid_by": members[i % num_members], "total_amount": 80.0,
+                 "split_type": 'equal', "group_id": 'bench_group',
+                 "user_shares": [{"borrower_id": m, "amount": 10.0} for m in members]}
+                for i in range(args.expenses)
+            )
+            assert result['created'] == args.expenses, result['errors'][:3]
+        elapsed = time.perf_counter() - start
+        print(f"{path:<24} {args.expenses:>9} {elapsed:>9.2f} {rows / elapsed:>10.0f}")
+    close_all_pools()
+
+
+def random_net_balances(num_members, seed=0):
+    """Zero-sum net balances in cents for num_members users"""
+    rng = random.Random(seed)
+    balances = [rng.randint(-50000, 50000) for _ in range(num_members - 1)]
+    balances.append(-sum(balances))
+    return {user: cents for user, cents in enumerate(balances, start=1) if cents}
+
+
+def bench_settle(args):
+    """BalanceCalculator.settle_transactions for growing group sizes"""
+    calculator = BalanceCalculator()
+    print(f"{'Members':>9} {'Settlements':>12} {'Seconds':>9}")
+    print("-" * 32)
+    for num_members in args.members:
+        net_balances = random_net_balances(num_members)
+        start = time.perf_counter()
+        settlements = calculator.settle_transactions(net_balances, 'bench_group')
+        elapsed = time.perf_counter() - start
+        print(f"{num_members:>9} {len(settlements):>12} {elapsed:>9.4f}")
+
+
+def bench_balances(args):
+    """Net balance computation per BalanceCalculator balance source on one large group"""
+    use_fresh_database('balances')
+    members = seed_group(args.group_members)
+    rng = random.Random(0)
+    per_expense = 10
+    with Database() as db:
+        expenses, shares = [], []
+        for i in range(args.shares // per_expense):
+            expense_id = f'e{i}'
+            paid_by = rng.choice(members)
+            expenses.append((expense_id, 'bench', paid_by, per_expense * 10.0, per_expense * 1000, 'equal', 'bench_group'))
+            shares.extend((expense_id, borrower, paid_by, 10.0, 1000) for borrower in rng.sample(members, per_expense))
+        db.cur.executemany("INSERT INTO expense (expense_id, name, paid_by, total_amount, total_cents, split_type, "
+                           "group_id) VALUES (?, ?, ?, ?, ?, ?, ?)", expenses)
+        db.cur.executemany("INSERT INTO expense_share (expense_id, borrower_id, paid_by_id, amount, amount_cents) "
+                           "VALUES (?, ?, ?, ?, ?)", shares)
+    BalanceCalculator().reconcile_group_balances('bench_group')
+
+    print(f"{len(shares)} shares, {len(members)} members")
+    print(f"{'Source':<8} {'Members':>8} {'Seconds':>9}")
+    print("-" * 27)
+    for source in BalanceCalculator.BALANCE_SOURCES:
+        calculator = BalanceCalculator(balance_source=source)
+        start = time.perf_counter()
+        balances = calculator.get_net_balances('bench_group')
+        elapsed = time.perf_counter() - start
+        print(f"{source:<8} {len(balances):>8} {elapsed:>9.3f}")
+    close_all_pools()
+
+
+def bench_migrate(args):
+    """Online cents backfill (migration 6) on a large database while an old-schema writer keeps inserting"""
+    db_path = use_fresh_database('migrate', DB_AUTO_MIGRATE=0)
+    migrate_database(db_path, target=5)
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA journal_mode = WAL")
+    rng = random.Random(0)
+    with conn:
+        conn.executemany("INSERT INTO expense_share (expense_id, borrower_id, paid_by_id, amount) VALUES (?, ?, ?, ?)",
+                         ((f'e{i // 10}', i % 10, rng.randint(1, 100), rng.randint(1, 10000) / 100)
+                          for i in range(args.shares)))
+    conn.close()
+
+    stop = threading.Event()
+    latencies = []
+
+    def writer():
+        # Writes like a process still running the pre-cents code
+        writer_conn = sqlite3.connect(db_path, timeout=30)
+        i = 0
+        while not stop.is_set():
+            start = time.perf_counter()
+            with writer_conn:
+                writer_conn.execute("INSERT INTO expense_share (expense_id, borrower_id, paid_by_id, amount) "
+                                    "VALUES (?, ?, ?, ?)", (f'live{i}', 1, 2, 12.34))
+            latencies.append(time.perf_counter() - start)
+            i += 1
+            time.sleep(0.001)
+        writer_conn.close()
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    start = time.perf_counter()
+    migrate_database(db_path)
+    elapsed = time.perf_counter() - start
+    stop.set()
+    thread.join()
+
+    conn = sqlite3.connect(db_path)
+    missing = conn.execute("SELECT COUNT(*) FROM expense_share WHERE amount_cents IS NULL").fetchone()[0]
+    conn.close()
+    print(f"{'Shares':>9} {'Seconds':>9} {'Writes':>8} {'Max write ms':>13} {'Unconverted':>12}")
+    print("-" * 55)
+    print(f"{args.shares:>9} {elapsed:>9.2f} {len(latencies):>8} {max(latencies, default=0) * 1000:>13.1f} {missing:>12}")
+    close_all_pools()
+
+
+def bench_batch(args):
+    """Recompute every group's settlements: process_group_settlements loop vs BatchSettlement"""
+    use_fresh_database('batch')
+    rng = random.Random(0)
+    num_users = 10000
+    with Database() as db:
+        db.cur.executemany("INSERT INTO users (user_id, user_name) VALUES (?, ?)",
+                           [(i, f'bench_user_{i}') for i in range(1, num_users + 1)])
+        db.cur.executemany("INSERT INTO groups (group_id, group_name) VALUES (?, ?)",
+                           [(f'g{g}', 'Benchmark') for g in range(args.groups)])
+        expenses, shares = [], []
+        for g in range(args.groups):
+            members = rng.sample(range(1, num_users + 1), 6)
+            for j in range(5):
+                expense_id = f'g{g}e{j}'
+                paid_by = members[j]
+                expenses.append((expense_id, 'bench', paid_by, 60.0, 6000, 'equal', f'g{g}'))
+                shares.extend((expense_id, borrower, paid_by, 10.0, 1000) for borrower in members)
+        db.cur.executemany("INSERT INTO expense (expense_id, name, paid_by, total_amount, total_cents, split_type, "
+                           "group_id) VALUES (?, ?, ?, ?, ?, ?, ?)", expenses)
+        db.cur.executemany("INSERT INTO expense_share (expense_id, borrower_id, paid_by_id, amount, amount_cents) "
+                           "VALUES (?, ?, ?, ?, ?)", shares)
+    print(f"{args.groups} groups, {len(shares)} shares")
+    print(f"{'Path':<28} {'Groups':>8} {'Seconds':>9} {'Groups/s':>10}")
+    print("-" * 58)
+
+    calculator = BalanceCalculator(balance_source="python")
+    loop_groups = min(args.loop_groups, args.groups)
+    start = time.perf_counter()
+    for g in range(loop_groups):
+        calculator.process_group_settlements(f'g{g}')
+    elapsed = time.perf_counter() - start
+    print(f"{'process_group_settlements':<28} {loop_groups:>8} {elapsed:>9.2f} {loop_groups / elapsed:>10.0f}")
+
+    start = time.perf_counter()
+    processed = BatchSettlement().recompute()
+    elapsed = time.perf_counter() - start
+    print(f"{'BatchSettlement.recompute':<28} {processed:>8} {elapsed:>9.2f} {processed / elapsed:>10.0f}")
+    close_all_pools()
+
+
+def random_group_balances(num_members, rng):
+    """Net balances in cents of a group after 3 expenses per member between random pairs"""
+    balances = {user: 0 for user in range(1, num_members + 1)}
+    for _ in range(3 * num_members):
+        payer, borrower = rng.sample(range(1, num_members + 1), 2)
+        amount = rng.choice([500, 1000, 1500, 2000, 2500])
+        balances[payer] += amount
+        balances[borrower] -= amount
+    return {user: cents for user, cents in balances.items() if cents}
+
+
+def bench_solver(args):
+    """Transfers saved by the optimal settlement solver versus the CPU time it spends"""
+    calculator = BalanceCalculator()
+    print(f"{'Members':>8} {'Greedy':>8} {'Optimal':>8} {'Saved':>7} {'Greedy ms':>10} {'Optimal ms':>11}")
+    print("-" * 57)
+    for num_members in args.solver_members:
+        rng = random.Random(num_members)
+        greedy_count = optimal_count = 0
+        greedy_time = optimal_time = 0.0
+        for _ in range(args.trials):
+            net_balances = random_group_balances(num_members, rng)
+            start = time.process_time()
+            greedy_count += len(calculator.settle_transactions(net_balances, 'bench_group'))
+            greedy_time += time.process_time() - start
+            start = time.process_time()
+            optimal_count += len(optimal_settlements(net_balances, 'bench_group'))
+            optimal_time += time.process_time() - start
+        saved = (greedy_count - optimal_count) / greedy_count * 100 if greedy_count else 0
+        print(f"{num_members:>8} {greedy_count / args.trials:>8.2f} {optimal_count / args.trials:>8.2f} "
+              f"{saved:>6.1f}% {greedy_time / args.trials * 1000:>10.2f} {optimal_time / args.trials * 1000:>11.2f}")
+
+
+def random_split_expenses(count, split_type, rng):
+    """Expense dicts with 2-8 shares each, valid for split_type"""
+    expenses = []
+    for _ in range(count):
+        members = rng.sample(range(1, 1000), rng.randint(2, 8))
+        if split_type == "unequal":
+            share_cents = [rng.randint(1, 20000) for _ in members]
+            shares = [{"borrower_id": user, "amount": cents / 100} for user, cents in zip(members, share_cents)]
+            total = sum(share_cents) / 100
+        elif split_type == "percentage":
+            bounds = [0] + sorted(rng.sample(range(1, 10000), len(members) - 1)) + [10000]
+            shares = [{"borrower_id": user, "percentage": (bounds[i + 1] - bounds[i]) / 100}
+                      for i, user in enumerate(members)]
+            total = rng.randint(1, 50000) / 100
+        else:
+            shares = [{"borrower_id": user} for user in members]
+            total = rng.randint(1, 50000) / 100
+        expenses.append({"paid_by": members[0], "total_amount": total, "user_shares": shares})
+    return expenses
+
+
+def bench_split(args):
+    """Batch split (columnar, one vectorized pass) versus process_split per expense"""
+    value_keys = {"equal": None, "unequal": "amount", "percentage": "percentage"}
+    print(f"{'Split':<11} {'Expenses':>9} {'Loop s':>8} {'Columns s':>10} {'Batch s':>8} {'Speedup':>8}")
+    print("-" * 59)
+    for split_type, value_key in value_keys.items():
+        strategy = Expense.SPLIT_STRATEGIES[split_type]()
+        expenses = random_split_expenses(args.split_expenses, split_type, random.Random(len(split_type)))
+
+        start = time.perf_counter()
+        for expense in expenses:
+            strategy.process_split(expense["paid_by"], expense["user_shares"], expense["total_amount"])
+        loop_time = time.perf_counter() - start
+
+        # Building the columns from dicts is measured apart: bulk callers can produce them directly
+        start = time.perf_counter()
+        expense_idx, borrower_ids, paid_by, total_cents, values = share_columns(expenses, value_key)
+        columns_time = time.perf_counter() - start
+        start = time.perf_counter()
+        batch = strategy.process_batch(expense_idx, borrower_ids, paid_by, total_cents,
+                                       *([values] if value_key else []))
+        batch_time = time.perf_counter() - start
+        assert not batch.invalid.any()
+
+        print(f"{split_type:<11} {len(expenses):>9} {loop_time:>8.2f} {columns_time:>10.2f} {batch_time:>8.3f} "
+              f"{loop_time / batch_time:>7.0f}x")
+
+
+def bench_import(args):
+    """Streaming CSV import: throughput and peak process memory for growing files"""
+    num_members = 8
+    print(f"{'Records':>9} {'Seconds':>9} {'Records/s':>10} {'Max RSS MB':>11}")
+    print("-" * 42)
+    for num_records in args.import_records:
+        use_fresh_database(f'import_{num_records}')
+        seed_group(num_members)
+        path = os.path.join(os.path.dirname(os.environ['DB_PATH']), 'expenses.csv')
+        with open(path, 'w') as f:
+            f.write("group_id,name,paid_by,total_amount,split_type,shares\n")
+            names = [f'bench_user_{i}' for i in range(1, num_members + 1)]
+            for i in range(num_records):
+                borrowers = names[:2 + i % (num_members - 1)]
+                f.write(f"bench_group,expense {i},{names[i % num_members]},{len(borrowers) * 12.5},unequal,"
+                        f"{';'.join(name + ':12.50' for name in borrowers)}\n")
+
+        stats = import_expenses(path)
+        # Peak of the whole process so far: flat across sizes when memory use is constant
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        assert stats['imported'] == num_records, stats['errors'][:3]
+        print(f"{num_records:>9} {stats['seconds']:>9.2f} {num_records / stats['seconds']:>10.0f} "
+              f"{max_rss / 1024:>11.1f}")
+    close_all_pools()
+
+
+def bench_export(args):
+    """Streaming group export: time to first chunk, throughput and peak process memory for growing groups"""
+    per_expense = 4
+    print(f"{'Shares':>9} {'Format':<8} {'First ms':>9} {'Seconds':>8} {'MB out':>8} {'Max RSS MB':>11}")
+    print("-" * 58)
+    for num_shares in args.export_shares:
+        use_fresh_database(f'export_{num_shares}')
+        members = seed_group(8)
+        num_expenses = num_shares // per_expense
+        # Generators keep the seeding itself out of the memory peak
+        with Database() as db:
+            db.cur.executemany(
+                "INSERT INTO expense (expense_id, name, paid_by, total_amount, total_cents, split_type, group_id, "
+                "created_at) VALUES (?, 'bench', ?, 40.0, 4000, 'equal', 'bench_group', datetime(?, 'unixepoch'))",
+                ((f'e{i:09d}', members[i % 8], 1500000000 + i) for i in range(num_expenses)))
+            db.cur.executemany(
+                "INSERT INTO expense_share (expense_id, borrower_id, paid_by_id, amount, amount_cents) "
+                "VALUES (?, ?, ?, 10.0, 1000)",
+                ((f'e{i // per_expense:09d}', members[i % 8], members[(i // per_expense) % 8])
+                 for i in range(num_expenses * per_expense)))
+
+        for fmt, compress in [("csv", False), ("jsonl", False), ("csv", True)]:
+            start = time.perf_counter()
+            chunks = export_group('bench_group', fmt, compress=compress)
+            size = len(next(chunks))
+            first_chunk = time.perf_counter() - start
+            for chunk in chunks:
+                size += len(chunk)
+            elapsed = time.perf_counter() - start
+            # Peak of the whole process so far: flat across sizes when memory use is constant
+            max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            label = fmt + (".gz" if compress else "")
+            print(f"{num_shares:>9} {label:<8} {first_chunk * 1000:>9.1f} {elapsed:>8.2f} {size / 2 ** 20:>8.1f} "
+                  f"{max_rss / 1024:>11.1f}")
+    close_all_pools()
+
+
+def bench_ids(args):
+    """Insert throughput as expense_share grows, with random uuid4 keys versus time-ordered keys"""
+    per_expense = 4
+    expenses_per_transaction = 500
+    key_schemes = {"uuid4": lambda: uuid.uuid4().hex, "uuid7": new_id}
+    stage_expenses = args.id_shares // per_expense // args.id_stages
+    print(f"{'Keys':<6} {'Shares':>10} {'Rows/s':>9} {'DB MB':>8}")
+    print("-" * 36)
+    for scheme, make_id in key_schemes.items():
+        db_path = use_fresh_database(f'ids_{scheme}', DB_PROFILE='production')
+        members = seed_group(8)
+        with Database() as db:
+            for stage in range(1, args.id_stages + 1):
+                # Rows/s of each stage shows how inserting slows down as the table grows
+                start = time.perf_counter()
+                for _ in range(0, stage_expenses, expenses_per_transaction):
+                    expense_ids = [make_id() for _ in range(expenses_per_transaction)]
+                    db.cur.executemany(
+                        "INSERT INTO expense (expense_id, name, paid_by, total_amount, total_cents, split_type, "
+                        "group_id) VALUES (?, 'bench', 1, 40.0, 4000, 'equal', 'bench_group')",
+                        ((expense_id,) for expense_id in expense_ids))
+                    db.cur.executemany(
+                        "INSERT INTO expense_share (expense_id, borrower_id, paid_by_id, amount, amount_cents) "
+                        "VALUES (?, ?, 1, 10.0, 1000)",
+                        ((expense_id, borrower) for expense_id in expense_ids for borrower in members[:per_expense]))
+                    db.conn.commit()
+                elapsed = time.perf_counter() - start
+                rows = stage_expenses * (1 + per_expense)
+                print(f"{scheme:<6} {stage * stage_expenses * per_expense:>10} {rows / elapsed:>9.0f} "
+                      f"{os.path.getsize(db_path) / 2 ** 20:>8.0f}", flush=True)
+    close_all_pools()
+
+
+BENCHMARKS = {
+    "profile": bench_profile,
+    "bulk": bench_bulk,
+    "settle": bench_settle,
+    "balances": bench_balances,
+    "migrate": bench_migrate,
+    "batch": bench_batch,
+    "solver": bench_solver,
+    "split": bench_split,
+    "import": bench_import,
+    "export": bench_export,
+    "ids": bench_ids,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run SplitWise performance benchmarks")
+    parser.add_argument("benchmark", choices=sorted(BENCHMARKS))
+    parser.add_argument("--seconds", type=float, default=5, help="Duration of timed benchmarks")
+    parser.add_argument("--readers", type=int, default=4, help="Concurrent reader threads")
+    parser.add_argument("--expenses", type=int, default=5000, help="Expenses written by the bulk benchmark")
+    parser.add_argument("--members", type=int, nargs="+", default=[10, 1000, 10000, 100000],
+                        help="Group sizes for the settlement benchmarks")
+    parser.add_argument("--shares", type=int, default=1000000, help="Share rows in the balances and migrate benchmarks")
+    parser.add_argument("--group-members", type=int, default=100, help="Members of the balances benchmark group")
+    parser.add_argument("--groups", type=int, default=100000, help="Groups in the batch benchmark")
+    parser.add_argument("--loop-groups", type=int, default=5000,
+                        help="Groups recomputed one by one for comparison in the batch benchmark")
+    parser.add_argument("--solver-members", type=int, nargs="+", default=[6, 10, 14, 18, 20, 24],
+                        help="Group sizes for the solver benchmark")
+    parser.add_argument("--trials", type=int, default=20, help="Random groups per size in the solver benchmark")
+    parser.add_argument("--split-expenses", type=int, default=100000, help="Expenses per split type in the split benchmark")
+    parser.add_argument("--import-records", type=int, nargs="+", default=[50000, 200000],
+                        help="CSV sizes for the import benchmark")
+    parser.add_argument("--export-shares", type=int, nargs="+", default=[100000, 1000000],
+                        help="Share rows of the exported group in the export benchmark")
+    parser.add_argument("--id-shares", type=int, default=10000000, help="Share rows loaded in the ids benchmark")
+    parser.add_argument("--id-stages", type=int, default=5, help="Throughput samples while loading in the ids benchmark")
+    args = parser.parse_args()
+    BENCHMARKS[args.benchmark](args)
+
+
+if __name__ == "__main__":
+    logging.disable(logging.INFO)
+    main()
\ No newline at end of file
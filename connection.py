@@ -1,47 +1,170 @@
 import psycopg2
+import psycopg2.pool
+import itertools
 import os
+import threading
 import logging
+from functools import lru_cache
 from dotenv import load_dotenv
 
 load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+
+@lru_cache(maxsize=512)
+def translate_query(query):
+    """Rewrite qmark placeholders (?) to psycopg2's %s, leaving quoted text alone.
+
+    Literal % signs are doubled because psycopg2 treats them as format markers
+    whenever parameters are passed.
+    """
+    out = []
+    quote = None
+    for ch in query:
+        if ch == '%':
+            out.append('%%')
+        elif quote:
+            out.append(ch)
+            if ch == quote:
+                quote = None
+        elif ch in ("'", '"'):
+            quote = ch
+            out.append(ch)
+        elif ch == '?':
+            out.append('%s')
+        else:
+            out.append(ch)
+    return ''.join(out)
+
+
+class QmarkCursor:
+    """psycopg2 cursor wrapper accepting the same SQL as the SQLite backend"""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def execute(self, query, params=None):
+        if params is None:
+            return self._cursor.execute(query)
+        return self._cursor.execute(translate_query(query), params)
+
+    def executemany(self, query, seq_of_params):
+        return self._cursor.executemany(translate_query(query), seq_of_params)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+def connect_params():
+    return {"dbname": os.getenv('DB_NAME'), "user": os.getenv('DB_USER'), "password": os.getenv('DB_PASSWORD'),
+            "host": os.getenv('DB_HOST'), "port": os.getenv('DB_PORT')}
+
+
+_pool = None
+_pool_slots = None
+_stream_names = itertools.count(1)
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Process-wide ThreadedConnectionPool, created on first use"""
+    global _pool, _pool_slots
+    with _pool_lock:
+        if _pool is None:
+            max_size = int(os.getenv('DB_POOL_SIZE', '5'))
+            _pool = psycopg2.pool.ThreadedConnectionPool(
+                int(os.getenv('DB_POOL_MIN_SIZE', '1')),
+                max_size,
+                **connect_params()
+            )
+            # ThreadedConnectionPool raises instead of waiting when exhausted
+            _pool_slots = threading.BoundedSemaphore(max_size)
+        return _pool
+
+
+def get_pool_stats():
+    with _pool_lock:
+        if _pool is None:
+            return {}
+        return {"postgres": {"size": len(_pool._used) + len(_pool._pool),
+                             "in_use": len(_pool._used), "max_size": _pool.maxconn}}
+
+
 class Database:
-    def __init__(self):
+    def __init__(self, dedicated=False):
+        """
+        :param dedicated: Open a connection of its own instead of taking a pool slot,
+                          for long-held work such as streamed exports
+        """
         self.conn = None
         self.cur = None
+        self.pool = None
+        self.dedicated = dedicated
         self.connect()
-    
+
     def connect(self):
         try:
-            self.conn = psycopg2.connect(
-                dbname=os.getenv('DB_NAME'),
-                user=os.getenv('DB_USER'),
-                password=os.getenv('DB_PASSWORD'),
-                host=os.getenv('DB_HOST'),
-                port=os.getenv('DB_PORT')
-            )
-            self.cur = self.conn.cursor()
-            logger.info("Database connection successful")
+            if self.dedicated:
+                self.conn = psycopg2.connect(**connect_params())
+                self.cur = QmarkCursor(self.conn.cursor())
+                return
+            self.pool = get_pool()
+            if not _pool_slots.acquire(timeout=float(os.getenv('DB_POOL_TIMEOUT', '30'))):
+                raise psycopg2.OperationalError("Timed out waiting for a database connection")
+            try:
+                self.conn = self.pool.getconn()
+            except Exception:
+                _pool_slots.release()
+                raise
+            self.cur = QmarkCursor(self.conn.cursor())
         except psycopg2.Error as e:
             logger.error(f"Database connection failed: {e}")
             raise
-    
+
+    def stream_cursor(self, fetch_size):
+        """
+        Cursor for one large SELECT, read back fetch_size rows at a time.
+
+        A named (server-side) cursor: the server keeps the result and each
+        fetchmany pulls the next batch, where a client-side cursor would load
+        every row into memory on execute. It lives in the connection's open
+        transaction (withhold=False), so read the rows before the commit and
+        close the cursor afterwards.
+        """
+        cursor = self.conn.cursor(name=f"stream_{next(_stream_names)}", withhold=False)
+        cursor.itersize = fetch_size
+        return QmarkCursor(cursor)
+
+    def insert_returning_id(self, query, params, id_column):
+        """Run an INSERT and return the generated key"""
+        self.cur.execute(f"{query} RETURNING {id_column}", params)
+        return self.cur.fetchone()[0]
+
     def close(self):
+        """Return the connection to the pool (close it if dedicated)"""
         if self.cur:
             self.cur.close()
-        if self.conn:
+            self.cur = None
+        if self.conn and self.dedicated:
             self.conn.close()
-        logger.info("Database connection closed")
-    
+            self.conn = None
+        if self.conn:
+            self.pool.putconn(self.conn, close=bool(self.conn.closed))
+            self.conn = None
+            _pool_slots.release()
+
     def __enter__(self):
         return self
-    
-    def __exit__(self, exc_type, exc_val, exc_tb):
-        if exc_type:
-            self.conn.rollback()
-        else:
-            self.conn.commit()
-        self.close()
 
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        try:
+            if exc_type:
+                self.conn.rollback()
+            else:
+                self.conn.commit()
+        finally:
+            self.close()
\ No newline at end of file
@@ -1,126 +1,301 @@
 import sqlite3
 import os
+import time
+import threading
 import logging
 from dotenv import load_dotenv
+from migrations import migrate_database, prepare_archive
 
 load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# PRAGMA settings applied to every new connection. "default" keeps SQLite's own
+# defaults; "production" lets readers run alongside the single writer (WAL) and
+# keeps hot pages in memory.
+PROFILES = {
+    "default": {},
+    "production": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "busy_timeout": 5000,
+        "cache_size": -64000,       # KiB when negative, i.e. 64 MB
+        "mmap_size": 268435456,     # 256 MB
+        "temp_store": "MEMORY",
+    },
+}
+
+PRAGMA_CHOICES = {
+    "journal_mode": {"DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF"},
+    "synchronous": {"OFF", "NORMAL", "FULL", "EXTRA"},
+    "temp_store": {"DEFAULT", "FILE", "MEMORY"},
+}
+INTEGER_PRAGMAS = {"busy_timeout", "cache_size", "mmap_size"}
+
+
+def get_profile_settings():
+    """Resolve DB_PROFILE plus per-setting overrides (DB_JOURNAL_MODE, DB_CACHE_SIZE, ...)"""
+    profile = os.getenv('DB_PROFILE', 'default').lower()
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown DB_PROFILE '{profile}'. Must be one of: {list(PROFILES.keys())}")
+
+    settings = dict(PROFILES[profile])
+    for name in list(PRAGMA_CHOICES) + sorted(INTEGER_PRAGMAS):
+        override = os.getenv(f'DB_{name.upper()}')
+        if override:
+            settings[name] = override
+
+    # PRAGMA values cannot be bound as parameters, so validate them here
+    for name, value in settings.items():
+        if name in INTEGER_PRAGMAS:
+            settings[name] = int(value)
+        elif str(value).upper() not in PRAGMA_CHOICES[name]:
+            raise ValueError(f"Invalid value '{value}' for {name}")
+        else:
+            settings[name] = str(value).upper()
+    return settings
+
+
+def apply_profile(conn, settings):
+    # journal_mode goes first: it cannot change inside a transaction
+    for name in sorted(settings, key=lambda n: n != "journal_mode"):
+        conn.execute(f"PRAGMA {name} = {settings[name]}")
+
+
+class ConnectionPool:
+    """Bounded, thread-safe pool of warm SQLite connections for one database file.
+
+    Connections are handed out LIFO so the most recently used one (and its page
+    cache) is reused first. Idle connections older than ``health_check_interval``
+    seconds are pinged before reuse and replaced if the ping fails.
+    """
+
+    def __init__(self, db_path, max_size=5, timeout=30.0, health_check_interval=30.0, on_connect=None):
+        self.db_path = db_path
+        self.max_size = max_size
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+        self.on_connect = on_connect
+        self._idle = []
+        self._size = 0
+        self._cond = threading.Condition()
+        self._stats = {"hits": 0, "misses": 0, "waits": 0, "wait_time": 0.0, "discarded": 0}
+
+    def _connect(self):
+        # check_same_thread=False: a released connection may be checked out by another thread
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        if self.on_connect:
+            self.on_connect(conn)
+        logger.info(f"Database connection opened: {self.db_path}")
+        return conn
+
+    def connect_dedicated(self):
+        """A connection set up like the pooled ones but not counted in the pool; the caller closes it"""
+        return self._connect()
+
+    def _is_healthy(self, conn):
+        try:
+            conn.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error as e:
+            logger.warning(f"Discarding unhealthy pooled connection: {e}")
+            return False
+
+    def acquire(self):
+        start = time.monotonic()
+        deadline = start + self.timeout
+        conn, last_used = None, None
+        waited = False
+
+        with self._cond:
+            while True:
+                if self._idle:
+                    conn, last_used = self._idle.pop()
+                    self._stats["hits"] += 1
+                    break
+                if self._size < self.max_size:
+                    self._size += 1
+                    self._stats["misses"] += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise sqlite3.OperationalError(
+                        f"Timed out after {self.timeout}s waiting for a database connection")
+                waited = True
+                self._cond.wait(remaining)
+
+            if waited:
+                self._stats["waits"] += 1
+                self._stats["wait_time"] += time.monotonic() - start
+
+        if conn is not None and time.monotonic() - last_used > self.health_check_interval:
+            if not self._is_healthy(conn):
+                self._close_quietly(conn)
+                with self._cond:
+                    self._stats["discarded"] += 1
+                conn = None
+
+        if conn is None:
+            try:
+                conn = self._connect()
+            except Exception:
+                with self._cond:
+                    self._size -= 1
+                    self._cond.notify()
+                raise
+        return conn
+
+    def release(self, conn):
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error as e:
+            logger.warning(f"Discarding pooled connection after failed rollback: {e}")
+            self.discard(conn)
+            return
+
+        with self._cond:
+            self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    def discard(self, conn):
+        self._close_quietly(conn)
+        with self._cond:
+            self._size -= 1
+            self._stats["discarded"] += 1
+            self._cond.notify()
+
+    def close_all(self):
+        with self._cond:
+            idle, self._idle = self._idle, []
+            self._size -= len(idle)
+        for conn, _ in idle:
+            self._close_quietly(conn)
+
+    def stats(self):
+        with self._cond:
+            stats = dict(self._stats)
+            stats.update(size=self._size, idle=len(self._idle), max_size=self.max_size)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_ratio"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+    @staticmethod
+    def _close_quietly(conn):
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+_pools_pid = os.getpid()
+
+
+def get_pool(db_path=None):
+    """Return the process-wide pool for db_path, creating it on first use."""
+    global _pools_pid
+    db_path = db_path or os.getenv('DB_PATH', 'splitwise.db')
+    with _pools_lock:
+        if _pools_pid != os.getpid():
+            # Connections must never cross a fork; start over in the child
+            _pools.clear()
+            _pools_pid = os.getpid()
+        pool = _pools.get(db_path)
+        if pool is None:
+            # Schema changes run once per process here (or via `python migrations.py`),
+            # never on individual connections
+            if os.getenv('DB_AUTO_MIGRATE', '1') != '0':
+                migrate_database(db_path)
+            settings = get_profile_settings()
+            archive_path = os.getenv('DB_ARCHIVE_PATH')
+            if archive_path:
+                prepare_archive(archive_path)
+
+            def on_connect(conn):
+                apply_profile(conn, settings)
+                if archive_path:
+                    conn.execute("ATTACH DATABASE ? AS archive", (archive_path,))
+
+            pool = ConnectionPool(
+                db_path,
+                max_size=int(os.getenv('DB_POOL_SIZE', '5')),
+                timeout=float(os.getenv('DB_POOL_TIMEOUT', '30')),
+                health_check_interval=float(os.getenv('DB_POOL_HEALTH_CHECK_INTERVAL', '30')),
+                on_connect=on_connect
+            )
+            _pools[db_path] = pool
+        return pool
+
+
+def get_pool_stats():
+    """Pool metrics (hits, misses, waits, wait time) keyed by database path."""
+    with _pools_lock:
+        pools = dict(_pools)
+    return {path: pool.stats() for path, pool in pools.items()}
+
+
+def close_all_pools():
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close_all()
+
+
 class Database:
-    def __init__(self):
+    def __init__(self, dedicated=False):
+        """
+        :param dedicated: Open a connection of its own instead of taking a pool slot,
+                          for long-held work such as streamed exports
+        """
         self.conn = None
         self.cur = None
+        self.pool = None
+        self.dedicated = dedicated
         self.connect()
-    
+
     def connect(self):
         try:
-            db_path = os.getenv('DB_PATH', 'splitwise.db')
-            self.conn = sqlite3.connect(db_path)
+            self.pool = get_pool()
+            self.conn = self.pool.connect_dedicated() if self.dedicated else self.pool.acquire()
             self.cur = self.conn.cursor()
-            self.setup_tables()
-            logger.info("Database connection successful")
         except sqlite3.Error as e:
             logger.error(f"Database connection failed: {e}")
             raise
-    
-    def setup_tables(self):
-        """Create tables if they don't exist"""
-        tables = [
-            '''CREATE TABLE IF NOT EXISTS users (
-                user_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_name TEXT NOT NULL UNIQUE,
-                email TEXT UNIQUE,
-                password_hash TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )''',
-            '''CREATE TABLE IF NOT EXISTS groups (
-                group_id TEXT PRIMARY KEY,
-                group_name TEXT NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )''',
-            '''CREATE TABLE IF NOT EXISTS group_members (
-                group_id TEXT,
-                user_id INTEGER,
-                joined_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                PRIMARY KEY (group_id, user_id),
-                FOREIGN KEY (group_id) REFERENCES groups(group_id),
-                FOREIGN KEY (user_id) REFERENCES users(user_id)
-            )''',
-            '''CREATE TABLE IF NOT EXISTS expense (
-                expense_id TEXT PRIMARY KEY,
-                name TEXT NOT NULL,
-                paid_by INTEGER,
-                total_amount REAL NOT NULL,
-                split_type TEXT NOT NULL CHECK (split_type IN ('equal', 'unequal', 'percentage')),
-                group_id TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (paid_by) REFERENCES users(user_id),
-                FOREIGN KEY (group_id) REFERENCES groups(group_id)
-            )''',
-            '''CREATE TABLE IF NOT EXISTS expense_share (
-                expense_id TEXT,
-                borrower_id INTEGER,
-                paid_by_id INTEGER,
-                amount REAL NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                PRIMARY KEY (expense_id, borrower_id),
-                FOREIGN KEY (expense_id) REFERENCES expense(expense_id),
-                FOREIGN KEY (borrower_id) REFERENCES users(user_id),
-                FOREIGN KEY (paid_by_id) REFERENCES users(user_id)
-            )''',
-            '''CREATE TABLE IF NOT EXISTS balance_sheet (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                group_id TEXT,
-                borrower_id INTEGER,
-                receiver_id INTEGER,
-                amount REAL NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (group_id) REFERENCES groups(group_id),
-                FOREIGN KEY (borrower_id) REFERENCES users(user_id),
-                FOREIGN KEY (receiver_id) REFERENCES users(user_id)
-            )'''
-        ]
-        
-        for table in tables:
-            self.cur.execute(table)
-        
-        # Add migration for existing users table
-        self.migrate_users_table()
-        self.conn.commit()
-    
-    def migrate_users_table(self):
-        """Add email and password_hash columns if they don't exist"""
-        try:
-            # Check if email column exists
-            self.cur.execute("PRAGMA table_info(users)")
-            columns = [column[1] for column in self.cur.fetchall()]
-            
-            if 'email' not in columns:
-                self.cur.execute("ALTER TABLE users ADD COLUMN email TEXT")
-                logger.info("Added email column to users table")
-            
-            if 'password_hash' not in columns:
-                self.cur.execute("ALTER TABLE users ADD COLUMN password_hash TEXT")
-                logger.info("Added password_hash column to users table")
-                
-        except sqlite3.Error as e:
-            logger.error(f"Migration error: {e}")
-            # Continue anyway - table might already be correct
-    
+
+    def stream_cursor(self, fetch_size):
+        """Cursor for one large SELECT, read back fetch_size rows at a time (SQLite steps through rows lazily)"""
+        cursor = self.conn.cursor()
+        cursor.arraysize = fetch_size
+        return cursor
+
+    def insert_returning_id(self, query, params, id_column):
+        """Run an INSERT and return the generated key"""
+        self.cur.execute(query, params)
+        return self.cur.lastrowid
+
     def close(self):
+        """Return the connection to the pool (close it if dedicated)"""
         if self.cur:
             self.cur.close()
+            self.cur = None
         if self.conn:
-            self.conn.close()
-        logger.info("Database connection closed")
-    
+            if self.dedicated:
+                self.conn.close()
+            else:
+                self.pool.release(self.conn)
+            self.conn = None
+
     def __enter__(self):
         return self
-    
+
     def __exit__(self, exc_type, exc_val, exc_tb):
-        if exc_type:
-            self.conn.rollback()
-        else:
-            self.conn.commit()
-        self.close()
\ No newline at end of file
+        try:
+            if exc_type:
+                self.conn.rollback()
+            else:
+                self.conn.commit()
+        finally:
+            self.close()
\ No newline at end of file
@@ -0,0 +1,46 @@
+"""
+Backend selection for the data layer.
+
+Controllers import Database and the exception types from here instead of from a
+specific driver module. DB_BACKEND picks the implementation:
+    sqlite   - connection_sqlite (default, DB_PATH)
+    postgres - connection (psycopg2, DB_NAME/DB_USER/DB_PASSWORD/DB_HOST/DB_PORT)
+
+Both backends accept the same qmark (?) SQL and use INTEGER user ids.
+"""
+
+import os
+import sqlite3
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DB_BACKEND = os.getenv('DB_BACKEND', 'sqlite').lower()
+
+if DB_BACKEND == 'postgres':
+    import psycopg2
+    from connection import Database, get_pool_stats
+    DatabaseError = psycopg2.Error
+    IntegrityError = psycopg2.IntegrityError
+elif DB_BACKEND == 'sqlite':
+    from connection_sqlite import Database, get_pool_stats
+    DatabaseError = sqlite3.Error
+    IntegrityError = sqlite3.IntegrityError
+else:
+    raise ValueError(f"Unknown DB_BACKEND '{DB_BACKEND}'. Must be 'sqlite' or 'postgres'")
+
+
+def archive_prefix():
+    """
+    Table prefix of the archived_* tables: "archive." when DB_ARCHIVE_PATH names a
+    separate SQLite file (attached to every pooled connection), else the main database.
+    """
+    return "archive." if DB_BACKEND == 'sqlite' and os.getenv('DB_ARCHIVE_PATH') else ""
+
+
+def normalize_user_id(value):
+    """Coerce a user id from a form, session or URL to the INTEGER stored in the database"""
+    if value is None or isinstance(value, int):
+        return value
+    value = str(value).strip()
+    return int(value) if value.lstrip('-').isdigit() else value
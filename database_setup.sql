@@ -1,14 +1,18 @@
 -- Database setup for Splitwise application
 -- Run this script in PostgreSQL to create the required tables
+-- It creates missing tables only: a database created from an earlier version
+-- of this file (VARCHAR user ids) is not upgraded and must be recreated
 
 CREATE DATABASE IF NOT EXISTS splitwise_db;
 
 \c splitwise_db;
 
--- Users table
+-- Users table (INTEGER ids, same as the SQLite schema)
 CREATE TABLE IF NOT EXISTS users (
-    user_id VARCHAR(32) PRIMARY KEY,
+    user_id SERIAL PRIMARY KEY,
     user_name VARCHAR(100) NOT NULL UNIQUE,
+    email VARCHAR(255) UNIQUE,
+    password_hash VARCHAR(64),
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
@@ -16,13 +20,16 @@ CREATE TABLE IF NOT EXISTS users (
 CREATE TABLE IF NOT EXISTS groups (
     group_id VARCHAR(32) PRIMARY KEY,
     group_name VARCHAR(100) NOT NULL,
+    ledger_version INTEGER NOT NULL DEFAULT 0,
+    settled_version INTEGER,
+    checkpoint_version INTEGER,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
 -- Group members table
 CREATE TABLE IF NOT EXISTS group_members (
     group_id VARCHAR(32) REFERENCES groups(group_id) ON DELETE CASCADE,
-    user_id VARCHAR(32) REFERENCES users(user_id) ON DELETE CASCADE,
+    user_id INTEGER REFERENCES users(user_id) ON DELETE CASCADE,
     joined_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     PRIMARY KEY (group_id, user_id)
 );
@@ -31,19 +38,22 @@ CREATE TABLE IF NOT EXISTS group_members (
 CREATE TABLE IF NOT EXISTS expense (
     expense_id VARCHAR(32) PRIMARY KEY,
     name VARCHAR(200) NOT NULL,
-    paid_by VARCHAR(32) REFERENCES users(user_id),
+    paid_by INTEGER REFERENCES users(user_id),
     total_amount DECIMAL(10,2) NOT NULL,
+    total_cents BIGINT NOT NULL,
     split_type VARCHAR(20) NOT NULL CHECK (split_type IN ('equal', 'unequal', 'percentage')),
     group_id VARCHAR(32) REFERENCES groups(group_id) ON DELETE CASCADE,
+    ledger_version INTEGER NOT NULL DEFAULT 0,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
 -- Expense shares table
 CREATE TABLE IF NOT EXISTS expense_share (
     expense_id VARCHAR(32) REFERENCES expense(expense_id) ON DELETE CASCADE,
-    borrower_id VARCHAR(32) REFERENCES users(user_id),
-    paid_by_id VARCHAR(32) REFERENCES users(user_id),
+    borrower_id INTEGER REFERENCES users(user_id),
+    paid_by_id INTEGER REFERENCES users(user_id),
     amount DECIMAL(10,2) NOT NULL,
+    amount_cents BIGINT NOT NULL,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     PRIMARY KEY (expense_id, borrower_id)
 );
@@ -52,14 +62,110 @@ CREATE TABLE IF NOT EXISTS expense_share (
 CREATE TABLE IF NOT EXISTS balance_sheet (
     id SERIAL PRIMARY KEY,
     group_id VARCHAR(32) REFERENCES groups(group_id) ON DELETE CASCADE,
-    borrower_id VARCHAR(32) REFERENCES users(user_id),
-    receiver_id VARCHAR(32) REFERENCES users(user_id),
+    borrower_id INTEGER REFERENCES users(user_id),
+    receiver_id INTEGER REFERENCES users(user_id),
     amount DECIMAL(10,2) NOT NULL,
+    amount_cents BIGINT NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Per-member net balance ledger, maintained with every expense write
+CREATE TABLE IF NOT EXISTS group_balance (
+    group_id VARCHAR(32) REFERENCES groups(group_id) ON DELETE CASCADE,
+    user_id INTEGER REFERENCES users(user_id),
+    net_amount DECIMAL(12,2) NOT NULL DEFAULT 0,
+    net_cents BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (group_id, user_id)
+);
+
+-- Settle-up payments between members
+CREATE TABLE IF NOT EXISTS payments (
+    payment_id SERIAL PRIMARY KEY,
+    group_id VARCHAR(32) NOT NULL REFERENCES groups(group_id) ON DELETE CASCADE,
+    payer_id INTEGER NOT NULL REFERENCES users(user_id),
+    receiver_id INTEGER NOT NULL REFERENCES users(user_id),
+    amount_cents BIGINT NOT NULL,
+    ledger_version INTEGER NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Ledger versions at which a group was fully settled
+CREATE TABLE IF NOT EXISTS group_checkpoints (
+    checkpoint_id SERIAL PRIMARY KEY,
+    group_id VARCHAR(32) NOT NULL REFERENCES groups(group_id) ON DELETE CASCADE,
+    ledger_version INTEGER NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Net amounts of archived history that was not yet settled
+CREATE TABLE IF NOT EXISTS opening_balances (
+    group_id VARCHAR(32) NOT NULL REFERENCES groups(group_id) ON DELETE CASCADE,
+    payer_id INTEGER NOT NULL REFERENCES users(user_id),
+    borrower_id INTEGER NOT NULL REFERENCES users(user_id),
+    amount_cents BIGINT NOT NULL,
+    ledger_version INTEGER NOT NULL,
+    PRIMARY KEY (group_id, payer_id, borrower_id)
+);
+
+-- Cold storage for history moved out by archive_history.py
+CREATE TABLE IF NOT EXISTS archived_expense (
+    expense_id VARCHAR(32) PRIMARY KEY,
+    name VARCHAR(255) NOT NULL,
+    paid_by INTEGER,
+    total_amount DECIMAL(10,2) NOT NULL,
+    total_cents BIGINT,
+    split_type VARCHAR(20) NOT NULL,
+    group_id VARCHAR(32),
+    created_at TIMESTAMP,
+    ledger_version INTEGER NOT NULL,
+    archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS archived_expense_share (
+    expense_id VARCHAR(32),
+    borrower_id INTEGER,
+    paid_by_id INTEGER,
+    amount DECIMAL(10,2) NOT NULL,
+    amount_cents BIGINT,
+    created_at TIMESTAMP,
+    PRIMARY KEY (expense_id, borrower_id)
+);
+
+CREATE TABLE IF NOT EXISTS archived_payments (
+    payment_id INTEGER PRIMARY KEY,
+    group_id VARCHAR(32) NOT NULL,
+    payer_id INTEGER NOT NULL,
+    receiver_id INTEGER NOT NULL,
+    amount_cents BIGINT NOT NULL,
+    ledger_version INTEGER NOT NULL,
+    created_at TIMESTAMP,
+    archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Records of each import source already committed by import_expenses.py
+CREATE TABLE IF NOT EXISTS import_progress (
+    source TEXT PRIMARY KEY,
+    records INTEGER NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Expense requests already handled, by client-supplied key (see idempotency.py)
+CREATE TABLE IF NOT EXISTS idempotency_keys (
+    idempotency_key TEXT PRIMARY KEY,
+    response TEXT,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
 -- Indexes for better performance
 CREATE INDEX IF NOT EXISTS idx_group_members_user ON group_members(user_id);
-CREATE INDEX IF NOT EXISTS idx_expense_group ON expense(group_id);
+CREATE INDEX IF NOT EXISTS idx_expense_group_created ON expense(group_id, created_at);
 CREATE INDEX IF NOT EXISTS idx_expense_share_borrower ON expense_share(borrower_id);
-CREATE INDEX IF NOT EXISTS idx_balance_sheet_group ON balance_sheet(group_id);
\ No newline at end of file
+CREATE INDEX IF NOT EXISTS idx_balance_sheet_group ON balance_sheet(group_id);
+CREATE INDEX IF NOT EXISTS idx_group_balance_user ON group_balance(user_id, group_id, net_cents);
+CREATE INDEX IF NOT EXISTS idx_expense_group_version ON expense(group_id, ledger_version);
+CREATE INDEX IF NOT EXISTS idx_payments_group_version ON payments(group_id, ledger_version);
+CREATE INDEX IF NOT EXISTS idx_group_checkpoints_group ON group_checkpoints(group_id, ledger_version);
+CREATE INDEX IF NOT EXISTS idx_opening_balances_group_version ON opening_balances(group_id, ledger_version);
+CREATE INDEX IF NOT EXISTS idx_archived_expense_group_created ON archived_expense(group_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_archived_payments_group ON archived_payments(group_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_idempotency_keys_created ON idempotency_keys(created_at);
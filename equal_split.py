@@ -1,8 +1,13 @@
+from money import to_cents, from_cents, allocate
+
 class EqualExpenseSplit:
     def process_split(self, paid_by, user_shares, total_amount):
         """
         Distributes the total_amount equally among users.
 
+        Shares are allocated in whole cents; leftover cents go to the first users,
+        so the shares always add up to total_amount exactly.
+
         :param paid_by: UUID of the user who paid the expense
         :param user_shares: List of dictionaries [{"userid": id}]
         :param total_amount: The total expense amount
@@ -13,17 +18,26 @@ class EqualExpenseSplit:
         if num_users == 0:
             raise ValueError("There must be at least one user to split the expense.")
 
-        split_amount = total_amount / num_users
+        split_amounts = allocate(to_cents(total_amount), [1] * num_users)
         split_transactions = []
 
         
-        for entry in user_shares:
+        for entry, split_cents in zip(user_shares, split_amounts):
             user = entry.get("borrower_id")  # Use .get() to avoid KeyError
             if user is None:
                 raise ValueError(f"Invalid entry format: {entry}")
             
             if user != paid_by:
-                split_transactions.append((user, paid_by, split_amount))
+                split_transactions.append((user, paid_by, from_cents(split_cents)))
 
 
         return split_transactions
+
+    def process_batch(self, expense_idx, borrower_ids, paid_by, total_cents):
+        """
+        Equal split of many expenses at once; see batch_split for the columnar inputs.
+
+        :return: batch_split.SplitBatch
+        """
+        from batch_split import split_equal  # NumPy is only needed for batch splits
+        return split_equal(expense_idx, borrower_ids, paid_by, total_cents)
@@ -1,11 +1,29 @@
-import uuid
 import logging
+from fractions import Fraction
+from money import to_cents, from_cents, allocate
+from ids import new_id
 from equal_split import EqualExpenseSplit  
 from unequal_split import UnequalExpenseSplit  
 from percentage_split import PercentageExpenseSplit
 
 logger = logging.getLogger(__name__)
 
+EXPENSE_INSERT = '''
+    INSERT INTO expense (expense_id, name, paid_by, total_amount, total_cents, split_type, group_id, ledger_version)
+    VALUES (?, ?, ?, ?, ?, ?, ?, COALESCE((SELECT ledger_version FROM groups WHERE group_id = ?), 0))
+'''
+SHARE_INSERT = '''
+    INSERT INTO expense_share (expense_id, borrower_id, paid_by_id, amount, amount_cents)
+    VALUES (?, ?, ?, ?, ?)
+'''
+BALANCE_UPSERT = '''
+    INSERT INTO group_balance (group_id, user_id, net_amount, net_cents)
+    VALUES (?, ?, ?, ?)
+    ON CONFLICT (group_id, user_id) DO UPDATE SET net_amount = group_balance.net_amount + excluded.net_amount,
+                                                  net_cents = group_balance.net_cents + excluded.net_cents
+'''
+LEDGER_VERSION_BUMP = "UPDATE groups SET ledger_version = ledger_version + 1 WHERE group_id = ?"
+
 class Expense:
     SPLIT_STRATEGIES = {
         "equal": EqualExpenseSplit,
@@ -21,7 +39,7 @@ class Expense:
         if split_type not in self.SPLIT_STRATEGIES:
             raise ValueError(f"Invalid split type. Must be one of: {list(self.SPLIT_STRATEGIES.keys())}")
             
-        self.expense_id = uuid.uuid4().hex
+        self.expense_id = new_id()
         self.name = name.strip()
         self.paid_by = paid_by
         self.total_amount = float(total_amount)
@@ -35,31 +53,69 @@ class Expense:
         transactions = split_strategy.process_split(self.paid_by, self.user_shares, self.total_amount)
         return {borrower_id: {"paid_by": paid_by, "amount": amount} for borrower_id, paid_by, amount in transactions}
  
+    def allocate_shares(self):
+        """
+        Validate the split and store every share's amount in cents-exact form, the
+        payer's own share included. Equal and percentage shares may come without
+        amounts; they are allocated here the same way the split strategies do.
+        """
+        self.split_transactions()  # runs the split strategy validation
+        if self.split_type == "equal":
+            weights = [1] * len(self.user_shares)
+        elif self.split_type == "percentage":
+            weights = [Fraction(str(share["percentage"])) for share in self.user_shares]
+        else:
+            return
+        amounts = allocate(to_cents(self.total_amount), weights)
+        self.user_shares = [dict(share, amount=from_cents(cents)) for share, cents in zip(self.user_shares, amounts)]
+
+    # The REAL amount columns are still written next to the cents columns so
+    # processes running pre-cents code keep reading correct values
+    def expense_row(self):
+        return (self.expense_id, self.name, self.paid_by, self.total_amount, to_cents(self.total_amount),
+                self.split_type, self.group_id, self.group_id)
+
+    def share_rows(self):
+        rows = []
+        for share in self.user_shares:
+            amount = float(share.get("amount", 0))
+            rows.append((self.expense_id, share["borrower_id"], self.paid_by, amount, to_cents(amount)))
+        return rows
+
+    def balance_deltas(self):
+        """Change of each member's net balance caused by this expense, in cents"""
+        deltas = {}
+        for _, borrower_id, paid_by, _, cents in self.share_rows():
+            if borrower_id == paid_by:
+                continue
+            deltas[paid_by] = deltas.get(paid_by, 0) + cents
+            deltas[borrower_id] = deltas.get(borrower_id, 0) - cents
+        return deltas
+
+    @classmethod
+    def save_many(cls, db, expenses):
+        """Insert expenses and their shares and update the group_balance ledger in the caller's transaction"""
+        # Invalidates cached settlements of the touched groups; bumped first so each
+        # expense is stamped with a ledger_version newer than the group's last checkpoint
+        db.cur.executemany(LEDGER_VERSION_BUMP, [(group_id,) for group_id in sorted({e.group_id for e in expenses})])
+        db.cur.executemany(EXPENSE_INSERT, [expense.expense_row() for expense in expenses])
+        db.cur.executemany(SHARE_INSERT, [row for expense in expenses for row in expense.share_rows()])
+
+        balance_changes = {}
+        for expense in expenses:
+            for user_id, delta in expense.balance_deltas().items():
+                key = (expense.group_id, user_id)
+                balance_changes[key] = balance_changes.get(key, 0) + delta
+        # Sorted so concurrent writers lock ledger rows in the same order
+        db.cur.executemany(BALANCE_UPSERT, [(group_id, user_id, from_cents(delta), delta)
+                                            for (group_id, user_id), delta in sorted(balance_changes.items())])
+
     def save_to_db(self, db):
         """Save expense and shares to database"""
         try:
-            # Save main expense
-            expense_query = '''
-                INSERT INTO expense (expense_id, name, paid_by, total_amount, split_type, group_id)
-                VALUES (?, ?, ?, ?, ?, ?)
-            '''
-            db.cur.execute(expense_query, (
-                self.expense_id, self.name, self.paid_by, 
-                self.total_amount, self.split_type, self.group_id
-            ))
-
-            # Save shares
-            share_query = '''
-                INSERT INTO expense_share (expense_id, borrower_id, paid_by_id, amount)
-                VALUES (?, ?, ?, ?)
-            '''
-            for share in self.user_shares:
-                borrower_id = share["borrower_id"]
-                amount = float(share.get("amount", 0))
-                db.cur.execute(share_query, (self.expense_id, borrower_id, self.paid_by, amount))
-
+            self.save_many(db, [self])
             logger.info(f"Expense {self.expense_id} saved successfully")
             
         except Exception as e:
             logger.error(f"Error saving expense: {e}")
-            raise
+            raise
\ No newline at end of file
@@ -1,7 +1,8 @@
-from connection_sqlite import Database 
+from database import Database, DatabaseError, archive_prefix
 from expense import Expense
+from money import to_cents, from_cents, allocate
+from idempotency import claim_key, store_result
 import logging
-import sqlite3
 
 logger = logging.getLogger(__name__)
 
@@ -29,72 +30,162 @@ class ExpenseController:
         except ValueError as e:
             logger.error(f"Validation error creating expense: {e}")
             raise
-        except sqlite3.Error as e:
+        except DatabaseError as e:
             logger.error(f"Database error creating expense: {e}")
             raise
         except Exception as e:
             logger.error(f"Unexpected error creating expense: {e}")
             raise
     
-    def create_expense(self, group_id, description, total_amount, paid_by, member_ids):
-        """Create equal split expense"""
+    def _save_expense(self, expense, idempotency_key=None):
+        """Save a new expense; with an idempotency key already used, return that request's result instead"""
+        with Database() as db:
+            if idempotency_key:
+                stored = claim_key(db, idempotency_key)
+                if stored is not None:
+                    logger.info(f"Expense request {idempotency_key} already handled, returning its result")
+                    return stored
+            expense.save_to_db(db)
+            result = {'success': True, 'expense_id': expense.expense_id}
+            if idempotency_key:
+                store_result(db, idempotency_key, result)
+        return result
+    
+    def create_expense(self, group_id, description, total_amount, paid_by, member_ids, idempotency_key=None):
+        """
+        Create equal split expense
+
+        :param idempotency_key: Optional client key; a retry with the same key returns the first result
+        """
         try:
-            # Calculate equal shares
-            share_amount = total_amount / len(member_ids)
-            user_shares = [{"borrower_id": member_id, "amount": share_amount} for member_id in member_ids]
+            # Calculate equal shares in whole cents that add up to the total
+            share_cents = allocate(to_cents(total_amount), [1] * len(member_ids))
+            user_shares = [{"borrower_id": member_id, "amount": from_cents(cents)}
+                           for member_id, cents in zip(member_ids, share_cents)]
             
             expense = Expense(description, paid_by, total_amount, 'equal', user_shares, group_id)
             
-            with Database() as db:
-                expense.save_to_db(db)
-                
-            return {'success': True, 'expense_id': expense.expense_id}
+            return self._save_expense(expense, idempotency_key)
         except Exception as e:
             logger.error(f"Error creating expense: {e}")
             return {'success': False, 'message': str(e)}
     
-    def create_custom_expense(self, group_id, description, total_amount, paid_by, member_amounts):
-        """Create custom split expense"""
+    def create_custom_expense(self, group_id, description, total_amount, paid_by, member_amounts,
+                              idempotency_key=None):
+        """
+        Create custom split expense
+
+        :param idempotency_key: Optional client key; a retry with the same key returns the first result
+        """
         try:
             # Validate amounts sum to total
-            if abs(sum(member_amounts.values()) - total_amount) > 0.01:
+            if sum(to_cents(amount) for amount in member_amounts.values()) != to_cents(total_amount):
                 return {'success': False, 'message': 'Individual amounts must sum to total amount'}
             
             user_shares = [{"borrower_id": member_id, "amount": amount} for member_id, amount in member_amounts.items()]
             expense = Expense(description, paid_by, total_amount, 'unequal', user_shares, group_id)
             
-            with Database() as db:
-                expense.save_to_db(db)
-                
-            return {'success': True, 'expense_id': expense.expense_id}
+            return self._save_expense(expense, idempotency_key)
         except Exception as e:
             logger.error(f"Error creating custom expense: {e}")
             return {'success': False, 'message': str(e)}
     
-    def get_group_expenses(self, group_id):
-        """Get all expenses for a group"""
+    def bulk_create_expenses(self, expenses, chunk_size=500):
+        """
+        Create many expenses, committing every chunk_size expenses.
+
+        :param expenses: Iterable of dicts with the Expense arguments
+                         (name, paid_by, total_amount, split_type, user_shares, group_id)
+        :param chunk_size: Number of expenses written per transaction
+        :return: Dict with created expense ids and per-row errors [{"index": i, "message": ...}]
+        """
+        created_ids = []
+        errors = []
+
+        def flush(db, chunk):
+            try:
+                Expense.save_many(db, [expense for _, expense in chunk])
+                db.conn.commit()
+                created_ids.extend(expense.expense_id for _, expense in chunk)
+            except DatabaseError as e:
+                db.conn.rollback()
+                logger.warning(f"Bulk chunk failed ({e}), retrying {len(chunk)} expenses one by one")
+                # Retry row by row so only the offending expenses are reported
+                for index, expense in chunk:
+                    try:
+                        Expense.save_many(db, [expense])
+                        db.conn.commit()
+                        created_ids.append(expense.expense_id)
+                    except DatabaseError as row_error:
+                        db.conn.rollback()
+                        errors.append({"index": index, "message": str(row_error)})
+
+        with Database() as db:
+            chunk = []
+            for index, data in enumerate(expenses):
+                try:
+                    expense = Expense(**data)
+                    expense.allocate_shares()  # validates the split and fills in equal/percentage amounts
+                except (ValueError, TypeError, KeyError) as e:
+                    errors.append({"index": index, "message": str(e)})
+                    continue
+
+                chunk.append((index, expense))
+                if len(chunk) >= chunk_size:
+                    flush(db, chunk)
+                    chunk = []
+            if chunk:
+                flush(db, chunk)
+
+        logger.info(f"Bulk created {len(created_ids)} expenses with {len(errors)} errors")
+        return {'success': not errors, 'created': len(created_ids), 'expense_ids': created_ids, 'errors': errors}
+
+    def get_group_expenses(self, group_id, include_archive=False, limit=None, offset=0):
+        """
+        Get expenses of a group, newest first.
+
+        :param include_archive: Also return expenses moved to the archive by archive_history.py
+        :param limit: Page size (all expenses when None)
+        :param offset: Expenses to skip before the page
+        """
         with Database() as db:
             try:
                 query = """
-                SELECT e.expense_id, e.name, e.total_amount, e.paid_by, u.user_name, e.created_at
+                SELECT e.expense_id, e.name, e.total_cents, e.paid_by, u.user_name, e.created_at AS created_at, 0 AS archived
                 FROM expense e
                 JOIN users u ON e.paid_by = u.user_id
                 WHERE e.group_id = ?
-                ORDER BY e.created_at DESC
                 """
-                db.cur.execute(query, (group_id,))
+                params = [group_id]
+                if include_archive:
+                    query += f"""
+                UNION ALL
+                SELECT a.expense_id, a.name, a.total_cents, a.paid_by, u.user_name, a.created_at, 1
+                FROM {archive_prefix()}archived_expense a
+                JOIN users u ON a.paid_by = u.user_id
+                WHERE a.group_id = ?
+                """
+                    params.append(group_id)
+                query += " ORDER BY created_at DESC"
+                if limit is not None:
+                    query += " LIMIT ? OFFSET ?"
+                    params += [limit, offset]
+                db.cur.execute(query, params)
                 results = db.cur.fetchall()
                 
                 class ExpenseObj:
-                    def __init__(self, expense_id, description, total_amount, paid_by, paid_by_name, created_at):
+                    def __init__(self, expense_id, description, total_amount, paid_by, paid_by_name, created_at,
+                                 archived=False):
                         self.expense_id = expense_id
                         self.description = description
                         self.total_amount = total_amount
                         self.paid_by = paid_by
                         self.paid_by_name = paid_by_name
                         self.created_at = created_at
+                        self.archived = archived
                 
-                return [ExpenseObj(row[0], row[1], row[2], row[3], row[4], row[5]) for row in results]
-            except sqlite3.Error as e:
+                return [ExpenseObj(row[0], row[1], from_cents(row[2]), row[3], row[4], row[5], bool(row[6]))
+                        for row in results]
+            except DatabaseError as e:
                 logger.error(f"Error fetching expenses: {e}")
-                return []
\ No newline at end of file
+                return []
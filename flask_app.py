@@ -1,8 +1,12 @@
-from flask import Flask, render_template, request, redirect, url_for, session, flash, jsonify
+from flask import Flask, Response, render_template, request, redirect, url_for, session, flash, jsonify
 from user_controller import UserController
 from group_controller import GroupController
 from expense_controller import ExpenseController
+from payment_controller import PaymentController
 from logic import BalanceCalculator
+from ledger_export import EXPORT_FORMATS, export_group
+from database import get_pool_stats, normalize_user_id
+from ids import new_id
 import logging
 
 app = Flask(__name__)
@@ -12,6 +16,7 @@ app.secret_key = 'splitwise_secret_key_2024'
 user_controller = UserController()
 group_controller = GroupController()
 expense_controller = ExpenseController()
+payment_controller = PaymentController()
 balance_calculator = BalanceCalculator()
 
 logging.basicConfig(level=logging.INFO)
@@ -64,7 +69,10 @@ def dashboard():
     
     user_id = session['user_id']
     groups = group_controller.get_user_groups(user_id)
-    return render_template('dashboard.html', groups=groups, username=session['username'])
+    balances = balance_calculator.get_user_balances(user_id)
+    group_balances = {row['group_id']: row['net_amount'] for row in balances['groups']}
+    return render_template('dashboard.html', groups=groups, username=session['username'],
+                           balances=balances, group_balances=group_balances)
 
 @app.route('/create_group', methods=['GET', 'POST'])
 def create_group():
@@ -92,14 +100,34 @@ def group_detail(group_id):
     
     group_info = group_controller.get_group_info(group_id)
     members = group_controller.get_group_members(group_id)
-    expenses = expense_controller.get_group_expenses(group_id)
+    # Archived (settled) history is only read when asked for
+    show_archived = request.args.get('archived') == '1'
+    expenses = expense_controller.get_group_expenses(group_id, include_archive=show_archived)
     
     return render_template('group_detail.html', 
                          group=group_info, 
                          members=members, 
                          expenses=expenses,
+                         show_archived=show_archived,
                          group_id=group_id)
 
+@app.route('/export/<group_id>')
+def export_group_ledger(group_id):
+    if 'user_id' not in session:
+        return redirect(url_for('login'))
+    
+    fmt = request.args.get('format', 'csv')
+    if fmt not in EXPORT_FORMATS:
+        flash(f"Unknown export format '{fmt}'", 'error')
+        return redirect(url_for('group_detail', group_id=group_id))
+    compress = request.args.get('gzip') == '1'
+    
+    # Streamed batch by batch straight from the cursor, never built in memory
+    chunks = export_group(group_id, fmt, compress=compress, include_archive=request.args.get('archived') == '1')
+    filename = f"{group_id}.{fmt}" + (".gz" if compress else "")
+    return Response(chunks, mimetype='application/gzip' if compress else EXPORT_FORMATS[fmt],
+                    headers={'Content-Disposition': f'attachment; filename={filename}'})
+
 @app.route('/add_member/<group_id>', methods=['GET', 'POST'])
 def add_member(group_id):
     if 'user_id' not in session:
@@ -129,14 +157,18 @@ def add_expense(group_id):
     if request.method == 'POST':
         description = request.form['description']
         total_amount = float(request.form['total_amount'])
-        paid_by = int(request.form['paid_by'])
+        paid_by = normalize_user_id(request.form['paid_by'])
         split_type = request.form['split_type']
+        # A resubmitted form carries the same key, so it returns the first result instead of adding a duplicate;
+        # scoped to the user so one user's key never replays another's request
+        form_key = request.form.get('idempotency_key')
+        idempotency_key = f"{session['user_id']}:{form_key}" if form_key else None
         
         if split_type == 'equal':
             # Equal split among all members
             member_ids = [m.user_id for m in members]
             result = expense_controller.create_expense(
-                group_id, description, total_amount, paid_by, member_ids
+                group_id, description, total_amount, paid_by, member_ids, idempotency_key
             )
         else:
             # Custom split - get individual amounts
@@ -147,7 +179,7 @@ def add_expense(group_id):
                     member_amounts[member.user_id] = float(request.form[amount_key])
             
             result = expense_controller.create_custom_expense(
-                group_id, description, total_amount, paid_by, member_amounts
+                group_id, description, total_amount, paid_by, member_amounts, idempotency_key
             )
         
         if result['success']:
@@ -160,23 +192,63 @@ def add_expense(group_id):
     return render_template('add_expense.html', 
                          group=group_info, 
                          members=members, 
-                         group_id=group_id)
+                         group_id=group_id,
+                         idempotency_key=new_id())
 
 @app.route('/settlements/<group_id>')
 def settlements(group_id):
     if 'user_id' not in session:
         return redirect(url_for('login'))
     
-    # Process settlements
-    settlements = balance_calculator.process_group_settlements(group_id)
-    settlement_data = balance_calculator.get_group_settlements(group_id)
+    # Recomputed only when an expense changed the group's ledger since the last view
+    settlement_data = balance_calculator.get_settlements(group_id)
     
     group_info = group_controller.get_group_info(group_id)
     
     return render_template('settlements.html', 
                          settlements=settlement_data, 
                          group=group_info,
-                         group_id=group_id)
+                         group_id=group_id,
+                         idempotency_keys=[new_id() for _ in settlement_data])
+
+@app.route('/record_payment/<group_id>', methods=['POST'])
+def record_payment(group_id):
+    if 'user_id' not in session:
+        return redirect(url_for('login'))
+    
+    payer_id = normalize_user_id(request.form['payer_id'])
+    receiver_id = normalize_user_id(request.form['receiver_id'])
+    # A double-clicked or resubmitted Mark as Paid records the payment once
+    form_key = request.form.get('idempotency_key')
+    idempotency_key = f"{session['user_id']}:{form_key}" if form_key else None
+    
+    result = payment_controller.record_payment(group_id, payer_id, receiver_id, request.form['amount'],
+                                            recorded_by=session['user_id'], idempotency_key=idempotency_key)
+    if result['success']:
+        flash('Group fully settled!' if result['checkpoint'] else 'Payment recorded!', 'success')
+    else:
+        flash(result['message'], 'error')
+    
+    return redirect(url_for('settlements', group_id=group_id))
+
+@app.route('/settlements')
+def cross_group_settlements():
+    if 'user_id' not in session:
+        return redirect(url_for('login'))
+    
+    # Debts netted across every group the user is in
+    settlement_data = balance_calculator.get_cross_group_settlements(session['user_id'])
+    
+    return render_template('cross_group_settlements.html', settlements=settlement_data,
+                           user_id=session['user_id'])
+
+@app.route('/metrics/db_pool')
+def db_pool_metrics():
+    # Pool internals and database paths are not for anonymous visitors
+    if 'user_id' not in session:
+        return redirect(url_for('login'))
+    
+    return jsonify(get_pool_stats())
 
 @app.route('/logout')
 def logout():
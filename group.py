@@ -1,8 +1,8 @@
-import uuid
+from ids import new_id
 
 class Group:
     def __init__(self, group_id=None, group_name=""):
-        self.group_id = group_id if group_id else uuid.uuid4().hex
+        self.group_id = group_id if group_id else new_id()
         self.group_name = group_name.strip() if group_name else ""
 
     def get_group_id(self):
@@ -1,8 +1,7 @@
-from connection_sqlite import Database
+from database import Database, DatabaseError, IntegrityError
 from group import Group
-import uuid
+from ids import new_id
 import logging
-import sqlite3
 
 logger = logging.getLogger(__name__)
 
@@ -13,7 +12,7 @@ class GroupController:
             
         with Database() as db:
             try:
-                group_id = uuid.uuid4().hex
+                group_id = new_id()
                 query = "INSERT INTO groups (group_id, group_name) VALUES (?, ?)"
                 db.cur.execute(query, (group_id, group_name.strip()))
                 
@@ -22,10 +21,10 @@ class GroupController:
                 
                 logger.info(f"Group created: {group_name}")
                 return {"success": True, "message": "Group created successfully!", "group_id": group_id}
-            except sqlite3.IntegrityError as e:
+            except IntegrityError as e:
                 logger.error(f"Group creation failed - duplicate: {e}")
                 return {"success": False, "message": "Group name already exists"}
-            except sqlite3.Error as e:
+            except DatabaseError as e:
                 logger.error(f"Database error creating group: {e}")
                 return {"success": False, "message": "Failed to create group"}
 
@@ -41,7 +40,7 @@ class GroupController:
                     return {"error": "Group not found"}
                 logger.info(f"Group deleted: {group_id}")
                 return {"message": "Group deleted successfully!"}
-            except sqlite3.Error as e:
+            except DatabaseError as e:
                 logger.error(f"Database error deleting group: {e}")
                 return {"error": "Failed to delete group"}
 
@@ -55,10 +54,10 @@ class GroupController:
                 db.cur.execute(query, (group_id, user_id))
                 logger.info(f"User {user_id} added to group {group_id}")
                 return {"message": "User added to group!"}
-            except sqlite3.IntegrityError as e:
+            except IntegrityError as e:
                 logger.error(f"User already in group: {e}")
                 return {"error": "User already in group or invalid IDs"}
-            except sqlite3.Error as e:
+            except DatabaseError as e:
                 logger.error(f"Database error adding user to group: {e}")
                 return {"error": "Failed to add user to group"}
 
@@ -79,7 +78,7 @@ class GroupController:
                         self.group_name = group_name
                 
                 return [GroupObj(row[0], row[1]) for row in results]
-            except sqlite3.Error as e:
+            except DatabaseError as e:
                 logger.error(f"Database error fetching user groups: {e}")
                 return []
 
@@ -105,7 +104,7 @@ class GroupController:
                 group_name = results[0][0]
                 members = [{"user_id": row[1], "user_name": row[2]} for row in results]
                 return {"group_id": group_id, "group_name": group_name, "members": members}
-            except sqlite3.Error as e:
+            except DatabaseError as e:
                 logger.error(f"Database error fetching group members: {e}")
                 return {"error": "Failed to fetch group members"}
         
@@ -124,7 +123,7 @@ class GroupController:
                 db.cur.execute(query, (group_id, user_id))
                 logger.info(f"User {user_id} removed from group {group_id}")
                 return {"message": f"User removed from group successfully"}
-            except sqlite3.Error as e:
+            except DatabaseError as e:
                 logger.error(f"Database error removing user from group: {e}")
                 return {"error": "Failed to remove user from group"}
     
@@ -141,7 +140,7 @@ class GroupController:
                             self.group_name = group_name
                     return GroupInfo(result[0], result[1])
                 return None
-            except sqlite3.Error as e:
+            except DatabaseError as e:
                 logger.error(f"Error fetching group info: {e}")
                 return None
     
@@ -165,7 +164,7 @@ class GroupController:
                         self.email = email or 'N/A'
                 
                 return [MemberObj(row[0], row[1], row[2]) for row in results]
-            except sqlite3.Error as e:
+            except DatabaseError as e:
                 logger.error(f"Error fetching group members: {e}")
                 return []
     
@@ -191,6 +190,6 @@ class GroupController:
                 db.cur.execute("INSERT INTO group_members (group_id, user_id) VALUES (?, ?)", (group_id, user_id))
                 return {'success': True, 'message': 'Member added successfully'}
                 
-            except sqlite3.Error as e:
+            except DatabaseError as e:
                 logger.error(f"Error adding member: {e}")
                 return {'success': False, 'message': 'Failed to add member'}
\ No newline at end of file
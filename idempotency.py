@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Idempotency keys for expense creation and settle-up payments
+
+A client sends the same key with every retry of one request (the add expense
+and Mark as Paid forms carry it in a hidden field). The first request claims the key in the
+same transaction as its write and stores its result there; a retry finds the
+claim and gets that result back without writing again. A request that fails
+rolls its claim back, so it can be retried with the same key.
+
+Keys are kept for IDEMPOTENCY_KEY_TTL_HOURS (default 24); run this script
+periodically (e.g. from cron) to remove older ones.
+
+Usage:
+    python idempotency.py [--ttl-hours 24]
+"""
+
+import argparse
+import json
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+from dotenv import load_dotenv
+from database import Database
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+KEY_CLAIM = """
+    INSERT INTO idempotency_keys (idempotency_key) VALUES (?)
+    ON CONFLICT (idempotency_key) DO NOTHING
+"""
+KEY_LOOKUP = "SELECT response FROM idempotency_keys WHERE idempotency_key = ?"
+KEY_RESULT = "UPDATE idempotency_keys SET response = ? WHERE idempotency_key = ?"
+
+
+def claim_key(db, key):
+    """
+    Claim key in db's open transaction.
+
+    The claim takes the write lock (SQLite) or waits for a concurrent claimer
+    of the same key to finish (Postgres), so a retry racing the first request
+    sees its committed result.
+
+    :return: None when the key is new (call store_result before committing),
+             else the result stored by the request that claimed it
+    """
+    db.cur.execute(KEY_CLAIM, (key,))
+    if db.cur.rowcount == 1:
+        return None
+    db.cur.execute(KEY_LOOKUP, (key,))
+    return json.loads(db.cur.fetchone()[0])
+
+
+def store_result(db, key, result):
+    """Store the result of the request that claimed key, in the same transaction as its write"""
+    db.cur.execute(KEY_RESULT, (json.dumps(result), key))
+
+
+def purge_expired_keys(ttl_hours=None):
+    """Delete keys older than ttl_hours (IDEMPOTENCY_KEY_TTL_HOURS, default 24); returns the number deleted"""
+    if ttl_hours is None:
+        ttl_hours = float(os.getenv('IDEMPOTENCY_KEY_TTL_HOURS', '24'))
+    # Same format as CURRENT_TIMESTAMP (UTC), so the comparison also works on SQLite's text timestamps
+    cutoff = (datetime.now(timezone.utc) - timedelta(hours=ttl_hours)).strftime('%Y-%m-%d %H:%M:%S')
+    with Database() as db:
+        db.cur.execute("DELETE FROM idempotency_keys WHERE created_at < ?", (cutoff,))
+        deleted = db.cur.rowcount
+    logger.info(f"Purged {deleted} idempotency keys created before {cutoff}")
+    return deleted
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Remove expired idempotency keys")
+    parser.add_argument("--ttl-hours", type=float, default=None,
+                        help="Keep keys this long (defaults to IDEMPOTENCY_KEY_TTL_HOURS or 24)")
+    args = parser.parse_args()
+    print(f"Purged {purge_expired_keys(args.ttl_hours)} expired idempotency keys")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
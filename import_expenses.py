@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+"""
+Stream expenses from a CSV or JSONL file into the database
+
+Records are read lazily, user names are resolved to ids through a cached
+lookup (one query per chunk for the names not cached yet), every expense is
+validated by its split strategy, and expenses are committed chunk_size at a
+time. The number of records consumed is stored in import_progress in the same
+transaction as each chunk, so a rerun of an interrupted import continues right
+after the last committed record.
+
+CSV columns: group_id, name, paid_by, total_amount, split_type, shares
+JSONL keys:  the same, one JSON object per line
+
+shares lists the borrowers by user name: "alice;bob" for equal splits,
+"alice:12.50;bob:7.50" (amounts) or "alice:60;bob:40" (percentages). In JSONL
+it may also be a list of names or a {name: value} object. paid_by is a user
+name too; group_id can be left out when --group is given.
+
+Usage:
+    python import_expenses.py FILE [--format csv|jsonl] [--group GROUP_ID] [--chunk-size 1000]
+                                   [--create-users] [--restart]
+"""
+
+import argparse
+import csv
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from itertools import islice
+from database import Database, DatabaseError
+from expense import Expense
+from money import to_cents, from_cents, allocate
+
+logger = logging.getLogger(__name__)
+
+PROGRESS_UPSERT = """
+    INSERT INTO import_progress (source, records, updated_at) VALUES (?, ?, CURRENT_TIMESTAMP)
+    ON CONFLICT (source) DO UPDATE SET records = excluded.records, updated_at = excluded.updated_at
+"""
+
+# Errors kept in the result; all of them are logged
+MAX_REPORTED_ERRORS = 100
+
+
+def read_csv(path, skip=0):
+    """Yield (record number, record dict) for each CSV row after the first skip rows"""
+    with open(path, newline='', encoding='utf-8') as f:
+        yield from islice(enumerate(csv.DictReader(f)), skip, None)
+
+
+def read_jsonl(path, skip=0):
+    """Yield (record number, record dict) for each non-empty line after the first skip records"""
+    with open(path, encoding='utf-8') as f:
+        lines = (line for line in f if line.strip())
+        for number, line in islice(enumerate(lines), skip, None):
+            try:
+                yield number, json.loads(line)
+            except json.JSONDecodeError as e:
+                yield number, {"_error": f"Invalid JSON: {e}"}
+
+
+READERS = {"csv": read_csv, "jsonl": read_jsonl}
+
+
+def parse_shares(value):
+    """Borrowers of a record as [(user name, value or None)]"""
+    if isinstance(value, dict):
+        return [(str(name), share) for name, share in value.items()]
+    if isinstance(value, list):
+        return [(str(name), None) for name in value]
+    shares = []
+    for part in str(value or "").split(";"):
+        if not part.strip():
+            continue
+        name, _, share = part.partition(":")
+        shares.append((name.strip(), share.strip() or None))
+    return shares
+
+
+class UserLookup:
+    """
+    Bounded LRU of user name -> user_id, filled with one query per batch of unknown names.
+
+    Users created by resolve() stay pending until commit(): if their transaction
+    rolls back instead, rollback() forgets them, so no id of a row that was never
+    committed is handed out again.
+    """
+    def __init__(self, max_size=100000, create_users=False):
+        self.max_size = max_size
+        self.create_users = create_users
+        self._ids = OrderedDict()
+        self._pending = {}
+
+    def resolve(self, db, names):
+        """Return {name: user_id} for the names that exist (or were created)"""
+        missing = [name for name in dict.fromkeys(names) if name not in self._ids and name not in self._pending]
+        for start in range(0, len(missing), 500):
+            chunk = missing[start:start + 500]
+            placeholders = ", ".join("?" * len(chunk))
+            db.cur.execute(f"SELECT user_name, user_id FROM users WHERE user_name IN ({placeholders})", chunk)
+            found = dict(db.cur.fetchall())
+            self._ids.update(found)
+            if self.create_users:
+                for name in chunk:
+                    if name not in found:
+                        self._pending[name] = db.insert_returning_id("INSERT INTO users (user_name) VALUES (?)",
+                                                                     (name,), 'user_id')
+
+        result = {}
+        for name in names:
+            if name in self._ids:
+                self._ids.move_to_end(name)
+                result[name] = self._ids[name]
+            elif name in self._pending:
+                result[name] = self._pending[name]
+        self._trim()
+        return result
+
+    def commit(self):
+        """Keep the users created since the last commit or rollback (call after the transaction commits)"""
+        self._ids.update(self._pending)
+        self._pending.clear()
+        self._trim()
+
+    def rollback(self):
+        """Forget the users created since the last commit (call after the transaction rolls back)"""
+        self._pending.clear()
+
+    def _trim(self):
+        while len(self._ids) > self.max_size:
+            self._ids.popitem(last=False)
+
+
+def record_names(record, shares):
+    """User names a record refers to: its payer and the borrowers of its parsed shares"""
+    return [str(record.get("paid_by", ""))] + [name for name, _ in shares]
+
+
+def build_expense(record, user_ids, default_group=None, shares=None):
+    """
+    Turn one record into a validated Expense.
+
+    :param user_ids: {user name: user_id} covering the record's names
+    :param shares: The record's parsed shares, if already parsed
+    :raises ValueError: with a message for the error report
+    """
+    if "_error" in record:
+        raise ValueError(record["_error"])
+    split_type = (record.get("split_type") or "").strip().lower()
+    paid_by = user_ids.get(str(record.get("paid_by", "")))
+    if paid_by is None:
+        raise ValueError(f"Unknown user '{record.get('paid_by')}'")
+    try:
+        total_amount = float(record.get("total_amount"))
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid total_amount '{record.get('total_amount')}'")
+
+    shares = parse_shares(record.get("shares")) if shares is None else shares
+    for name, _ in shares:
+        if name not in user_ids:
+            raise ValueError(f"Unknown user '{name}'")
+    try:
+        if split_type == "equal":
+            amounts = allocate(to_cents(total_amount), [1] * len(shares)) if shares else []
+            user_shares = [{"borrower_id": user_ids[name], "amount": from_cents(cents)}
+                           for (name, _), cents in zip(shares, amounts)]
+        elif split_type == "percentage":
+            percentages = [share for _, share in shares]
+            amounts = allocate(to_cents(total_amount), percentages) if shares else []
+            user_shares = [{"borrower_id": user_ids[name], "percentage": float(share), "amount": from_cents(cents)}
+                           for (name, share), cents in zip(shares, amounts)]
+        else:
+            user_shares = [{"borrower_id": user_ids[name], "amount": float(share)} for name, share in shares]
+    except (TypeError, ValueError, ArithmeticError) as e:
+        raise ValueError(f"Invalid shares: {e}")
+
+    expense = Expense(record.get("name") or "", paid_by, total_amount, split_type, user_shares,
+                      record.get("group_id") or default_group)
+    expense.split_transactions()  # runs the split strategy validation
+    return expense
+
+
+def import_expenses(path, fmt=None, group_id=None, chunk_size=1000, create_users=False, restart=False,
+                    progress=None):
+    """
+    Import every record of a CSV or JSONL file, resuming after the last committed record.
+
+    :param fmt: "csv" or "jsonl" (from the file extension when None)
+    :param group_id: Group of records without a group_id
+    :param restart: Ignore the stored progress and start from the first record
+    :param progress: Optional callback(records done, elapsed seconds) after each chunk
+    :return: {"imported", "failed", "resumed_from", "records", "seconds", "errors"}
+    """
+    fmt = fmt or os.path.splitext(path)[1].lstrip(".").lower()
+    if fmt not in READERS:
+        raise ValueError(f"Unknown import format '{fmt}'. Must be one of: {list(READERS)}")
+    source = os.path.abspath(path)
+    lookup = UserLookup(create_users=create_users)
+    stats = {"imported": 0, "failed": 0, "resumed_from": 0, "records": 0, "seconds": 0.0, "errors": []}
+    start = time.perf_counter()
+
+    def fail(number, message):
+        # Reported 1-based, as the position of the record in the file
+        stats["failed"] += 1
+        logger.info(f"Record {number + 1}: {message}")
+        if len(stats["errors"]) < MAX_REPORTED_ERRORS:
+            stats["errors"].append({"record": number + 1, "message": message})
+
+    def commit(db):
+        db.conn.commit()
+        lookup.commit()
+
+    def rollback(db):
+        db.conn.rollback()
+        lookup.rollback()
+
+    def save(db, expenses, records_done):
+        Expense.save_many(db, expenses)
+        db.cur.execute(PROGRESS_UPSERT, (source, records_done))
+        commit(db)
+
+    def flush(db, chunk):
+        shares = [parse_shares(record.get("shares")) for _, record in chunk]
+        names = [name for (_, record), record_shares in zip(chunk, shares)
+                 for name in record_names(record, record_shares)]
+        user_ids = lookup.resolve(db, names)
+        valid = []
+        for (number, record), record_shares in zip(chunk, shares):
+            try:
+                valid.append((number, record, record_shares,
+                              build_expense(record, user_ids, group_id, record_shares)))
+            except (ValueError, TypeError, KeyError) as e:
+                fail(number, str(e))
+        records_done = chunk[-1][0] + 1
+        try:
+            save(db, [expense for *_, expense in valid], records_done)
+            stats["imported"] += len(valid)
+        except DatabaseError as e:
+            rollback(db)
+            logger.warning(f"Import chunk failed ({e}), retrying {len(valid)} expenses one by one")
+            # Progress moves with every row, so a crash here still resumes at the right record
+            for number, record, record_shares, _ in valid:
+                try:
+                    # Users created for the chunk went with its rollback, so look them up (or create them) again
+                    row_ids = lookup.resolve(db, record_names(record, record_shares))
+                    save(db, [build_expense(record, row_ids, group_id, record_shares)], number + 1)
+                    stats["imported"] += 1
+                except DatabaseError as row_error:
+                    rollback(db)
+                    fail(number, str(row_error))
+            db.cur.execute(PROGRESS_UPSERT, (source, records_done))
+            commit(db)
+        stats["records"] = records_done
+        if progress:
+            progress(records_done, time.perf_counter() - start)
+
+    with Database() as db:
+        skip = 0
+        if restart:
+            db.cur.execute("DELETE FROM import_progress WHERE source = ?", (source,))
+            commit(db)
+        else:
+            db.cur.execute("SELECT records FROM import_progress WHERE source = ?", (source,))
+            row = db.cur.fetchone()
+            skip = row[0] if row else 0
+        stats["resumed_from"] = stats["records"] = skip
+        if skip:
+            logger.info(f"Resuming import of {source} after record {skip}")
+
+        chunk = []
+        for number, record in READERS[fmt](path, skip):
+            chunk.append((number, record))
+            if len(chunk) >= chunk_size:
+                flush(db, chunk)
+                chunk = []
+        if chunk:
+            flush(db, chunk)
+
+    stats["seconds"] = time.perf_counter() - start
+    logger.info(f"Imported {stats['imported']} expenses from {source} with {stats['failed']} errors")
+    return stats
+
+
+def print_progress(done, elapsed):
+    print(f"  {done} records ({done / elapsed if elapsed else 0:.0f} records/s)", flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import expenses from a CSV or JSONL file")
+    parser.add_argument("file", help="CSV or JSONL file")
+    parser.add_argument("--format", choices=sorted(READERS), default=None, help="Defaults to the file extension")
+    parser.add_argument("--group", default=None, help="Group of records without a group_id")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="Expenses per transaction")
+    parser.add_argument("--create-users", action="store_true", help="Create users that do not exist yet")
+    parser.add_argument("--restart", action="store_true", help="Start over instead of resuming")
+    args = parser.parse_args()
+
+    stats = import_expenses(args.file, args.format, args.group, args.chunk_size, args.create_users, args.restart,
+                            progress=print_progress)
+    if stats["resumed_from"]:
+        print(f"Resumed after record {stats['resumed_from']}")
+    for error in stats["errors"]:
+        print(f"  record {error['record']}: {error['message']}")
+    seconds = stats["seconds"]
+    print(f"\nImported {stats['imported']} expenses ({stats['failed']} failed) in {seconds:.2f}s"
+          f" - {stats['imported'] / seconds if seconds else 0:.0f} expenses/s")
+
+
+if __name__ == "__main__":
+    logging.disable(logging.INFO)
+    main()
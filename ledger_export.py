@@ -0,0 +1,123 @@
+"""
+Streaming export of a group's ledger.
+
+Rows are read with cursor.fetchmany (from a server-side cursor on Postgres)
+and encoded batch by batch, so an export
+of any size uses constant memory and its first bytes are ready as soon as the
+first batch is read. Both queries follow an index order (expense by
+(group_id, created_at), payments by (group_id, ledger_version)), so no sort
+has to finish before rows come out.
+
+One row per expense share, then one per settle-up payment:
+    type, id, created_at, name, paid_by, borrower, amount, total_amount, split_type
+For a payment, paid_by is the payer and borrower the receiver.
+"""
+
+import csv
+import io
+import json
+import zlib
+from database import Database, archive_prefix
+from money import from_cents
+
+EXPORT_COLUMNS = ["type", "id", "created_at", "name", "paid_by", "borrower", "amount", "total_amount", "split_type"]
+
+EXPORT_FORMATS = {"csv": "text/csv", "jsonl": "application/x-ndjson"}
+
+FETCH_SIZE = 1000
+
+EXPENSE_ROWS_SQL = """
+    SELECT 'expense', e.expense_id, e.created_at, e.name, payer.user_name, borrower.user_name, es.amount_cents,
+           e.total_cents, e.split_type
+    FROM {prefix}{expense_table} e
+    JOIN {prefix}{share_table} es ON es.expense_id = e.expense_id
+    JOIN users payer ON payer.user_id = e.paid_by
+    JOIN users borrower ON borrower.user_id = es.borrower_id
+    WHERE e.group_id = ?
+    ORDER BY e.created_at
+"""
+PAYMENT_ROWS_SQL = """
+    SELECT 'payment', p.payment_id, p.created_at, 'Payment', payer.user_name, receiver.user_name, p.amount_cents,
+           p.amount_cents, NULL
+    FROM {prefix}{payment_table} p
+    JOIN users payer ON payer.user_id = p.payer_id
+    JOIN users receiver ON receiver.user_id = p.receiver_id
+    WHERE p.group_id = ?
+    ORDER BY {order}
+"""
+
+
+def iter_ledger_batches(group_id, include_archive=False, fetch_size=FETCH_SIZE):
+    """
+    Yield the group's ledger rows in lists of up to fetch_size tuples (archived history first).
+
+    A dedicated connection (not a pool slot) is held until the generator is
+    exhausted or closed, so slow downloads never starve other requests of pooled connections.
+    """
+    queries = []
+    if include_archive:
+        prefix = archive_prefix()
+        queries.append(EXPENSE_ROWS_SQL.format(prefix=prefix, expense_table="archived_expense",
+                                               share_table="archived_expense_share"))
+        queries.append(PAYMENT_ROWS_SQL.format(prefix=prefix, payment_table="archived_payments",
+                                               order="p.created_at"))
+    queries.append(EXPENSE_ROWS_SQL.format(prefix="", expense_table="expense", share_table="expense_share"))
+    queries.append(PAYMENT_ROWS_SQL.format(prefix="", payment_table="payments", order="p.ledger_version"))
+
+    # One transaction for the whole export; on Postgres each query streams through a server-side cursor in it
+    with Database(dedicated=True) as db:
+        for query in queries:
+            cursor = db.stream_cursor(fetch_size)
+            try:
+                cursor.execute(query, (group_id,))
+                while True:
+                    rows = cursor.fetchmany(fetch_size)
+                    if not rows:
+                        break
+                    yield [row[:6] + (from_cents(row[6]), from_cents(row[7]), row[8]) for row in rows]
+            finally:
+                cursor.close()
+
+
+def csv_chunks(batches):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for batch in batches:
+        writer.writerows(batch)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def jsonl_chunks(batches):
+    for batch in batches:
+        yield "".join(json.dumps(dict(zip(EXPORT_COLUMNS, row))) + "\n" for row in batch).encode()
+
+
+def gzip_chunks(chunks, level=6):
+    """Compress a stream of byte chunks into one gzip stream, chunk by chunk"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)  # 16+: gzip header and trailer
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def export_group(group_id, fmt="csv", compress=False, include_archive=False, fetch_size=FETCH_SIZE):
+    """
+    Byte chunks of a group's ledger export.
+
+    :param fmt: "csv" or "jsonl"
+    :param compress: gzip the stream
+    :return: Generator of bytes
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format '{fmt}'. Must be one of: {list(EXPORT_FORMATS)}")
+    batches = iter_ledger_batches(group_id, include_archive, fetch_size)
+    chunks = csv_chunks(batches) if fmt == "csv" else jsonl_chunks(batches)
+    return gzip_chunks(chunks) if compress else chunks
+
@@ -1,25 +1,253 @@
 import heapq
-from connection_sqlite import Database
+import os
+import threading
+from collections import OrderedDict
+from database import Database, DatabaseError
+from money import to_cents, from_cents
 import logging
-import sqlite3
 
 logger = logging.getLogger(__name__)
 
+# Balance-changing history of groups since their latest checkpoint, as
+# (group_id, payer, borrower, cents): the payer of an expense share is owed its
+# amount by the borrower, and a settle-up payment leaves the payer owed by the
+# receiver. Every balance is zero at a checkpoint, so older rows are never read.
+# Opening balances stand in for unsettled history moved out by archive_history.py.
+HISTORY_SQL = """
+    SELECT e.group_id, es.paid_by_id AS payer, es.borrower_id AS borrower, es.amount_cents AS amount
+    FROM expense e
+    JOIN expense_share es ON es.expense_id = e.expense_id
+    LEFT JOIN groups g ON g.group_id = e.group_id
+    WHERE es.paid_by_id != es.borrower_id
+      AND e.ledger_version > COALESCE(g.checkpoint_version, -1) {expense_filter}
+    UNION ALL
+    SELECT p.group_id, p.payer_id, p.receiver_id, p.amount_cents
+    FROM payments p
+    LEFT JOIN groups g ON g.group_id = p.group_id
+    WHERE p.ledger_version > COALESCE(g.checkpoint_version, -1) {payment_filter}
+    UNION ALL
+    SELECT o.group_id, o.payer_id, o.borrower_id, o.amount_cents
+    FROM opening_balances o
+    LEFT JOIN groups g ON g.group_id = o.group_id
+    WHERE o.ledger_version > COALESCE(g.checkpoint_version, -1) {opening_filter}
+"""
+
+# Net balance of every (group, member) recomputed from the history. Rows are
+# first summed per (payer, borrower) pair so the history is read only once.
+SHARE_NET_BALANCES_SQL = """
+    WITH pairs AS (
+        SELECT group_id, payer, borrower, SUM(amount) AS amount
+        FROM (""" + HISTORY_SQL + """) AS history
+        GROUP BY group_id, payer, borrower
+    )
+    SELECT group_id, user_id, SUM(delta) FROM (
+        SELECT group_id, payer AS user_id, amount AS delta FROM pairs
+        UNION ALL
+        SELECT group_id, borrower, -amount FROM pairs
+    ) AS deltas
+    GROUP BY group_id, user_id
+"""
+
+
+def history_filters(group_ids=None, checkpoint=None):
+    """
+    Restrict HISTORY_SQL (or SHARE_NET_BALANCES_SQL) to some groups.
+
+    :param group_ids: Groups to include (all groups when None)
+    :param checkpoint: The checkpoint_version of a single group, if already known;
+                       lets the (group_id, ledger_version) indexes skip settled history
+    :return: ({"expense_filter", "payment_filter", "opening_filter"} format arguments, query params)
+    """
+    aliases = {"expense_filter": "e", "payment_filter": "p", "opening_filter": "o"}
+    if group_ids is None:
+        return {key: "" for key in aliases}, ()
+    group_ids = list(group_ids)
+    placeholders = ", ".join("?" * len(group_ids))
+    params = group_ids
+    filters = {key: f"AND {alias}.group_id IN ({placeholders})" for key, alias in aliases.items()}
+    if checkpoint is not None:
+        filters = {key: f"{filters[key]} AND {alias}.ledger_version > ?" for key, alias in aliases.items()}
+        params = group_ids + [checkpoint]
+    return filters, tuple(params) * len(aliases)
+
+
+# Members' net balances in every group of one user, from the per-group ledger
+# rows (no expense_share scan).
+CROSS_GROUP_BALANCES_SQL = """
+    SELECT gb.group_id, gb.user_id, gb.net_cents
+    FROM group_members gm
+    JOIN group_balance gb ON gb.group_id = gm.group_id
+    WHERE gm.user_id = ? AND gb.net_cents != 0
+"""
+
 class MaxHeap:
+    """Max-heap of [amount, user] items backed by heapq.
+
+    Equal amounts pop in insertion order, matching the previous sorted-list
+    implementation, so settlements stay identical.
+    """
     def __init__(self):
         self.data = []
+        self._counter = 0
     
     def push(self, item):
-        self.data.append(item)
-        self.data.sort(key=lambda x: x[0], reverse=True)
+        heapq.heappush(self.data, (-item[0], self._counter, item))
+        self._counter += 1
     
     def pop(self):
-        return self.data.pop(0) if self.data else None
+        return heapq.heappop(self.data)[2] if self.data else None
     
     def is_empty(self):
         return len(self.data) == 0
 
+def match_settlements(net_balances, group_id):
+    """
+    Greedy settlement matching: repeatedly settle the largest debt against the
+    largest credit. Shared by BalanceCalculator and batch_settlement.
+
+    :param net_balances: Dict of user -> net balance in integer cents
+    :return: List of (group_id, debtor, creditor, amount) with amount in currency units
+    """
+    if not net_balances or not group_id:
+        return []
+    
+    # Prepare MaxHeaps for creditors and debtors
+    creditors = MaxHeap()  # [amount, userId] - people who are owed money
+    debtors = MaxHeap()    # [amount, userId] - people who owe money (stored as positive)
+    
+    for user, amount in net_balances.items():
+        if amount > 0:  # Creditor (owed money)
+            creditors.push([amount, user])
+        elif amount < 0:  # Debtor (owes money)
+            debtors.push([-amount, user])  # Store as positive for max heap
+    
+    # Settle debts
+    settlements = []
+    while not creditors.is_empty() and not debtors.is_empty():
+        credit_amt, credit_user = creditors.pop()
+        debt_amt, debt_user = debtors.pop()
+        
+        settle_amt = min(credit_amt, debt_amt)
+        
+        # Avoid self-transactions
+        if credit_user != debt_user and settle_amt > 0:
+            settlements.append((group_id, debt_user, credit_user, from_cents(settle_amt)))
+        
+        # Put back remaining amounts
+        if credit_amt > settle_amt:
+            creditors.push([credit_amt - settle_amt, credit_user])
+        if debt_amt > settle_amt:
+            debtors.push([debt_amt - settle_amt, debt_user])
+
+    return settlements
+
+
+def diff_settlements(stored_rows, settlements):
+    """
+    Changes turning a group's stored balance_sheet rows into new settlements.
+
+    :param stored_rows: [(id, borrower_id, receiver_id, amount_cents)] currently stored
+    :param settlements: [(group_id, debtor, creditor, amount)] to store
+    :return: {"inserted": [settlement], "updated": [(id, settlement)], "deleted": [(id, old row)]};
+             every list is empty when nothing moved
+    """
+    # str(): ids from the python balance source are strings, stored ones are integers
+    stored = {}
+    diff = {"inserted": [], "updated": [], "deleted": []}
+    for row in stored_rows:
+        key = (str(row[1]), str(row[2]))
+        if key in stored:
+            diff["deleted"].append((row[0], row[1:]))  # duplicate pair left by older code
+        else:
+            stored[key] = row
+    for settlement in settlements:
+        row = stored.pop((str(settlement[1]), str(settlement[2])), None)
+        if row is None:
+            diff["inserted"].append(settlement)
+        elif row[3] != to_cents(settlement[3]):
+            diff["updated"].append((row[0], settlement))
+    diff["deleted"].extend((row[0], row[1:]) for row in stored.values())
+    return diff
+
+
+def write_settlement_diff(cur, diffs):
+    """Apply diffs from diff_settlements (of one or more groups) to balance_sheet"""
+    deleted = [(row_id,) for diff in diffs for row_id, _ in diff["deleted"]]
+    updated = [(settlement[3], to_cents(settlement[3]), row_id)
+               for diff in diffs for row_id, settlement in diff["updated"]]
+    inserted = [(*settlement, to_cents(settlement[3])) for diff in diffs for settlement in diff["inserted"]]
+    if deleted:
+        cur.executemany("DELETE FROM balance_sheet WHERE id = ?", deleted)
+    if updated:
+        cur.executemany("UPDATE balance_sheet SET amount = ?, amount_cents = ? WHERE id = ?", updated)
+    if inserted:
+        cur.executemany("""
+            INSERT INTO balance_sheet (group_id, borrower_id, receiver_id, amount, amount_cents)
+            VALUES (?, ?, ?, ?, ?)
+        """, inserted)
+
+
+class SettlementCache:
+    """In-process LRU of settlement results, valid for one ledger version of a group"""
+    def __init__(self, max_size=1024):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, group_id, version):
+        with self._lock:
+            entry = self._entries.get(group_id)
+            if entry is None or entry[0] != version:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(group_id)
+            self.hits += 1
+            return [dict(row) for row in entry[1]]
+
+    def put(self, group_id, version, settlements):
+        with self._lock:
+            self._entries[group_id] = (version, [dict(row) for row in settlements])
+            self._entries.move_to_end(group_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def revalidate(self, group_id, old_version, new_version):
+        """Carry an entry over to a new version whose settlements did not change"""
+        with self._lock:
+            entry = self._entries.get(group_id)
+            if entry is not None and old_version is not None and entry[0] == old_version:
+                self._entries[group_id] = (new_version, entry[1])
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+settlement_cache = SettlementCache(int(os.getenv('SETTLEMENT_CACHE_SIZE', '1024')))
+
 class BalanceCalculator:
+    # Where process_group_settlements gets net balances from:
+    #   ledger - group_balance table, one row per member (default)
+    #   sql    - aggregated from expense_share by the database, one row per member
+    #   python - every share fetched and summed in calculate_net_balances
+    BALANCE_SOURCES = ("ledger", "sql", "python")
+    # How settle_transactions matches debtors with creditors:
+    #   greedy  - largest debt against largest credit (default)
+    #   optimal - fewest transfers via settlement_solver, greedy for large groups
+    SOLVERS = ("greedy", "optimal")
+    # Stands in for the group id of settlements spanning several groups
+    CROSS_GROUP_ID = "*"
+
+    def __init__(self, balance_source=None, solver=None):
+        self.balance_source = balance_source or os.getenv('SETTLEMENT_BALANCE_SOURCE', 'ledger')
+        if self.balance_source not in self.BALANCE_SOURCES:
+            raise ValueError(f"Invalid balance source. Must be one of: {list(self.BALANCE_SOURCES)}")
+        self.solver = solver or os.getenv('SETTLEMENT_SOLVER', 'greedy')
+        if self.solver not in self.SOLVERS:
+            raise ValueError(f"Invalid settlement solver. Must be one of: {list(self.SOLVERS)}")
+
     def extract_id(self, val):
         """Extract clean ID from various formats"""
         if not val:
@@ -29,7 +257,7 @@ class BalanceCalculator:
         return str(val)
     
     def calculate_net_balances(self, transactions):
-        """Compute net balances for each user."""
+        """Compute net balances for each user from [payer, borrower, cents] transactions, in integer cents."""
         if not transactions:
             return {}
             
@@ -42,93 +270,247 @@ class BalanceCalculator:
                 continue
                 
             # Payer gets positive balance (they are owed money)
-            net[payer_id] = net.get(payer_id, 0) + float(amount)
+            net[payer_id] = net.get(payer_id, 0) + amount
             # Borrower gets negative balance (they owe money)
-            net[borrower_id] = net.get(borrower_id, 0) - float(amount)
+            net[borrower_id] = net.get(borrower_id, 0) - amount
         
         # Remove users with zero balance
-        return {user: amt for user, amt in net.items() if abs(amt) >= 0.01}
+        return {user: amt for user, amt in net.items() if amt != 0}
 
     def settle_transactions(self, net_balances, group_id):
-        """Use MaxHeap to minimize the number of transactions (like JavaScript version)"""
+        """
+        Use MaxHeap to minimize the number of transactions (like JavaScript version)
+
+        :param net_balances: Dict of user -> net balance in integer cents
+        :return: List of (group_id, debtor, creditor, amount) with amount in currency units
+        """
         if not net_balances or not group_id:
             return []
         
-        logger.info(f"Net balances: {net_balances}")
-        
-        # Prepare MaxHeaps for creditors and debtors
-        creditors = MaxHeap()  # [amount, userId] - people who are owed money
-        debtors = MaxHeap()    # [amount, userId] - people who owe money (stored as positive)
-        
-        for user, amount in net_balances.items():
-            if amount > 0.01:  # Creditor (owed money)
-                creditors.push([amount, user])
-            elif amount < -0.01:  # Debtor (owes money)
-                debtors.push([-amount, user])  # Store as positive for max heap
-        
-        # Settle debts
-        settlements = []
-        while not creditors.is_empty() and not debtors.is_empty():
-            credit_amt, credit_user = creditors.pop()
-            debt_amt, debt_user = debtors.pop()
-            
-            settle_amt = min(credit_amt, debt_amt)
-            
-            # Avoid self-transactions
-            if credit_user != debt_user and settle_amt > 0:
-                settlements.append((group_id, debt_user, credit_user, round(settle_amt, 2)))
-            
-            # Put back remaining amounts
-            if credit_amt > settle_amt:
-                creditors.push([credit_amt - settle_amt, credit_user])
-            if debt_amt > settle_amt:
-                debtors.push([debt_amt - settle_amt, debt_user])
-        
+        logger.debug("Net balances: %s", net_balances)
+        if self.solver == "optimal":
+            # Imported here so the default greedy path does not need NumPy
+            from settlement_solver import optimal_settlements
+            settlements = optimal_settlements(net_balances, group_id)
+        else:
+            settlements = match_settlements(net_balances, group_id)
         logger.info(f"Generated {len(settlements)} optimized settlements")
         return settlements
     
+    def get_checkpoint(self, db, group_id):
+        """ledger_version of the group's latest checkpoint, -1 if it has none"""
+        db.cur.execute("SELECT checkpoint_version FROM groups WHERE group_id = ?", (group_id,))
+        row = db.cur.fetchone()
+        return row[0] if row and row[0] is not None else -1
+
     def fetch_unsettled_transactions(self, group_id):
-        """Fetch all unsettled expense transactions for a group"""
+        """Fetch expense shares and payments since the group's last checkpoint as [payer, borrower, cents]"""
         with Database() as db:
             try:
-                # Get all expense shares for the group
-                db.cur.execute("""
-                    SELECT es.paid_by_id, es.borrower_id, es.amount
-                    FROM expense_share es
-                    JOIN expense e ON es.expense_id = e.expense_id
-                    WHERE e.group_id = ?
-                """, (group_id,))
-                
-                transactions = []
-                for row in db.cur.fetchall():
-                    paid_by, borrower, amount = row
-                    if paid_by != borrower:  # Skip self-payments
-                        transactions.append([paid_by, borrower, float(amount)])
-                
-                return transactions
-            except sqlite3.Error as e:
+                filters, params = history_filters([group_id], self.get_checkpoint(db, group_id))
+                db.cur.execute(HISTORY_SQL.format(**filters), params)
+                return [[payer, borrower, amount] for _, payer, borrower, amount in db.cur.fetchall()]
+            except DatabaseError as e:
                 logger.error(f"Error fetching transactions: {e}")
                 return []
     
-    def process_group_settlements(self, group_id):
+    def fetch_net_balances(self, group_id):
+        """
+        Read each member's net balance in cents from the group_balance ledger (one row per member).
+
+        Members come in user_id order (the primary key order, so no sort), which
+        fixes how settle_transactions breaks ties on every backend.
+        """
+        with Database() as db:
+            try:
+                db.cur.execute("SELECT user_id, net_cents FROM group_balance "
+                               "WHERE group_id = ? AND net_cents != 0 ORDER BY user_id", (group_id,))
+                return dict(db.cur.fetchall())
+            except DatabaseError as e:
+                logger.error(f"Error fetching net balances: {e}")
+                return {}
+
+    def fetch_net_balances_sql(self, group_id):
+        """Aggregate net balances in cents from expense_share in the database (one row per member)"""
+        with Database() as db:
+            try:
+                filters, params = history_filters([group_id], self.get_checkpoint(db, group_id))
+                db.cur.execute(SHARE_NET_BALANCES_SQL.format(**filters), params)
+                # int(): Postgres returns SUM(bigint) as a Decimal; user_id order as in fetch_net_balances
+                return {user_id: int(cents) for _, user_id, cents in sorted(db.cur.fetchall(), key=lambda row: row[1])
+                        if cents != 0}
+            except DatabaseError as e:
+                logger.error(f"Error aggregating net balances: {e}")
+                return {}
+
+    def get_net_balances(self, group_id):
+        if self.balance_source == "ledger":
+            return self.fetch_net_balances(group_id)
+        if self.balance_source == "sql":
+            return self.fetch_net_balances_sql(group_id)
+        return self.calculate_net_balances(self.fetch_unsettled_transactions(group_id))
+
+    def get_user_balances(self, user_id):
+        """
+        A user's net position in every group and overall, from the group_balance ledger in one query.
+
+        :return: {"groups": [{"group_id", "group_name", "net_amount"}], "owed", "owes", "total"};
+                 net_amount > 0 means the user is owed money in that group
+        """
+        with Database() as db:
+            try:
+                db.cur.execute("""
+                    SELECT gb.group_id, g.group_name, gb.net_cents
+                    FROM group_balance gb
+                    JOIN groups g ON g.group_id = gb.group_id
+                    WHERE gb.user_id = ? AND gb.net_cents != 0
+                    ORDER BY g.group_name
+                """, (user_id,))
+                rows = db.cur.fetchall()
+            except DatabaseError as e:
+                logger.error(f"Error fetching user balances: {e}")
+                rows = []
+
+        owed = sum(cents for _, _, cents in rows if cents > 0)
+        owes = -sum(cents for _, _, cents in rows if cents < 0)
+        return {
+            "groups": [{"group_id": group_id, "group_name": group_name, "net_amount": from_cents(cents)}
+                       for group_id, group_name, cents in rows],
+            "owed": from_cents(owed),
+            "owes": from_cents(owes),
+            "total": from_cents(owed - owes),
+        }
+
+    def get_cross_group_settlements(self, user_id):
+        """
+        The user's own transfers, netted over all groups the user belongs to.
+
+        Each group is settled on its own (the same transfers its settlements page
+        shows); the transfers between the user and each counterparty are then
+        summed across groups, so two friends who owe each other in several groups
+        get a single transfer. Only pairs that share a group are ever matched,
+        and every member sees the same net amount for a pair. The result is
+        cached until any of the groups' ledger versions changes.
+
+        :return: List of {"borrower_id", "borrower_name", "receiver_id", "receiver_name", "amount"}
+        """
+        with Database() as db:
+            try:
+                db.cur.execute("""
+                    SELECT g.group_id, g.ledger_version
+                    FROM group_members gm JOIN groups g ON g.group_id = gm.group_id
+                    WHERE gm.user_id = ?
+                    ORDER BY g.group_id
+                """, (user_id,))
+                versions = tuple(db.cur.fetchall())
+                cache_key = (self.CROSS_GROUP_ID, user_id)
+                cached = settlement_cache.get(cache_key, versions)
+                if cached is not None:
+                    return cached
+
+                db.cur.execute(CROSS_GROUP_BALANCES_SQL, (user_id,))
+                group_balances = {}
+                for group_id, member, cents in db.cur.fetchall():
+                    # int(): Postgres may return BIGINT sums as Decimal
+                    group_balances.setdefault(group_id, {})[member] = int(cents)
+
+                # Counterparty -> cents they owe the user (negative: the user owes them)
+                positions = {}
+                for group_id in sorted(group_balances):
+                    # Sorted by member like fetch_net_balances, so every viewer gets the group's own transfers
+                    net_balances = dict(sorted(group_balances[group_id].items()))
+                    for _, debtor, creditor, amount in self.settle_transactions(net_balances, group_id):
+                        if creditor == user_id:
+                            positions[debtor] = positions.get(debtor, 0) + to_cents(amount)
+                        elif debtor == user_id:
+                            positions[creditor] = positions.get(creditor, 0) - to_cents(amount)
+                positions = {member: cents for member, cents in positions.items() if cents}
+
+                names = {}
+                members = [user_id] + list(positions)
+                for start in range(0, len(members), 500):
+                    chunk = members[start:start + 500]
+                    placeholders = ", ".join("?" * len(chunk))
+                    db.cur.execute(f"SELECT user_id, user_name FROM users WHERE user_id IN ({placeholders})", chunk)
+                    names.update(db.cur.fetchall())
+            except DatabaseError as e:
+                logger.error(f"Error computing cross-group settlements: {e}")
+                return []
+
+        result = []
+        for member, cents in sorted(positions.items(), key=lambda item: (-abs(item[1]), item[0])):
+            debtor, creditor = (member, user_id) if cents > 0 else (user_id, member)
+            result.append({
+                "borrower_id": debtor,
+                "borrower_name": names.get(debtor),
+                "receiver_id": creditor,
+                "receiver_name": names.get(creditor),
+                "amount": from_cents(abs(cents))
+            })
+        settlement_cache.put(cache_key, versions, result)
+        return result
+
+    def reconcile_group_balances(self, group_id=None, rebuild=True):
+        """
+        Compare the group_balance ledger with the history since the last checkpoint and optionally rebuild it.
+
+        :param group_id: Limit the check to one group (all groups when None)
+        :param rebuild: Replace the ledger rows with the recomputed balances
+        :return: List of drifted rows {"group_id", "user_id", "expected", "actual"}
+        """
+        with Database() as db:
+            if group_id:
+                filters, params = history_filters([group_id], self.get_checkpoint(db, group_id))
+            else:
+                filters, params = history_filters()
+            db.cur.execute(SHARE_NET_BALANCES_SQL.format(**filters), params)
+            expected = {(row[0], row[1]): int(row[2]) for row in db.cur.fetchall()}
+
+            if group_id:
+                db.cur.execute("SELECT group_id, user_id, net_cents FROM group_balance WHERE group_id = ?", (group_id,))
+            else:
+                db.cur.execute("SELECT group_id, user_id, net_cents FROM group_balance")
+            actual = {(row[0], row[1]): row[2] for row in db.cur.fetchall()}
+
+            drift = []
+            for key in sorted(set(expected) | set(actual), key=str):
+                expected_cents = expected.get(key) or 0
+                actual_cents = actual.get(key) or 0
+                if expected_cents != actual_cents:
+                    drift.append({"group_id": key[0], "user_id": key[1],
+                                  "expected": from_cents(expected_cents), "actual": from_cents(actual_cents)})
+
+            if rebuild:
+                if group_id:
+                    db.cur.execute("DELETE FROM group_balance WHERE group_id = ?", (group_id,))
+                else:
+                    db.cur.execute("DELETE FROM group_balance")
+                db.cur.executemany(
+                    "INSERT INTO group_balance (group_id, user_id, net_amount, net_cents) VALUES (?, ?, ?, ?)",
+                    [(key[0], key[1], from_cents(cents), cents) for key, cents in expected.items()]
+                )
+                # Cached settlements were computed from the old ledger
+                if group_id:
+                    db.cur.execute("UPDATE groups SET ledger_version = ledger_version + 1 WHERE group_id = ?", (group_id,))
+                else:
+                    db.cur.execute("UPDATE groups SET ledger_version = ledger_version + 1")
+
+        logger.info(f"Reconciled group balances: {len(drift)} drifted rows")
+        return drift
+
+    def process_group_settlements(self, group_id, version=None):
         """Main function to process and optimize group settlements"""
         try:
-            # Fetch all transactions
-            transactions = self.fetch_unsettled_transactions(group_id)
-            
-            if not transactions:
-                logger.info("No transactions found for group")
-                return []
+            net_balances = self.get_net_balances(group_id)
             
-            # Calculate net balances
-            net_balances = self.calculate_net_balances(transactions)
+            if not net_balances:
+                logger.info("No outstanding balances found for group")
             
-            # Generate optimized settlements
+            # Generate optimized settlements (none once the group is settled up)
             settlements = self.settle_transactions(net_balances, group_id)
             
-            # Clear old settlements and store new ones
-            if settlements:
-                self.store_settlements(settlements)
+            # Replace the stored settlements, clearing them if nothing is owed any more
+            self.store_settlements(settlements, group_id, version)
             
             return settlements
             
@@ -136,38 +518,91 @@ class BalanceCalculator:
             logger.error(f"Error processing settlements: {e}")
             return []
 
-    def store_settlements(self, transactions):
-        """Store settlement transactions in database."""
-        if not transactions:
+    def store_settlements(self, transactions, group_id=None, version=None):
+        """
+        Store settlement transactions in database, stamped with the ledger version they were computed from.
+
+        Only rows that changed are written: unchanged transfers keep their row,
+        changed amounts are updated in place.
+
+        :return: The applied diff (see diff_settlements), or None without a group
+        """
+        group_id = group_id or (transactions[0][0] if transactions else None)
+        if not group_id:
             logger.info("No transactions to store")
-            return
+            return None
             
         with Database() as db:
             try:
-                group_id = transactions[0][0]
-                db.cur.execute("DELETE FROM balance_sheet WHERE group_id = ?", (group_id,))
+                # Take the write lock before reading, so concurrent recomputes of the
+                # group cannot both diff against the same rows
+                db.cur.execute("UPDATE groups SET settled_version = settled_version WHERE group_id = ?", (group_id,))
+                db.cur.execute("SELECT settled_version FROM groups WHERE group_id = ?", (group_id,))
+                row = db.cur.fetchone()
+                previous_version = row[0] if row else None
+                db.cur.execute("SELECT id, borrower_id, receiver_id, amount_cents FROM balance_sheet WHERE group_id = ?",
+                               (group_id,))
+                diff = diff_settlements(db.cur.fetchall(), transactions)
+                write_settlement_diff(db.cur, [diff])
                 
-                db.cur.executemany("""
-                    INSERT INTO balance_sheet (group_id, borrower_id, receiver_id, amount) 
-                    VALUES (?, ?, ?, ?)
-                """, transactions)
+                if version is not None:
+                    db.cur.execute("UPDATE groups SET settled_version = ? WHERE group_id = ?", (version, group_id))
                 
-                logger.info(f"Stored {len(transactions)} settlement transactions")
-            except sqlite3.Error as e:
+                logger.info(f"Stored {len(transactions)} settlement transactions "
+                            f"({len(diff['inserted'])} inserted, {len(diff['updated'])} updated, "
+                            f"{len(diff['deleted'])} deleted)")
+            except DatabaseError as e:
                 logger.error(f"Error storing settlements: {e}")
                 raise
 
+        if version is not None and not any(diff.values()):
+            # Same rows as before, so a cached result for the previous version still holds
+            settlement_cache.revalidate(group_id, previous_version, version)
+        return diff
+
+    def get_settlements(self, group_id):
+        """
+        Settlements for display, recomputed only when the group's ledger version changed.
+
+        Lookup order: in-process LRU, then balance_sheet if it was stored for the
+        current version, otherwise recompute and store.
+        """
+        with Database() as db:
+            try:
+                db.cur.execute("SELECT ledger_version, settled_version FROM groups WHERE group_id = ?", (group_id,))
+                row = db.cur.fetchone()
+            except DatabaseError as e:
+                logger.error(f"Error fetching ledger version: {e}")
+                return []
+        if row is None:
+            return []
+
+        version, settled_version = row
+        cached = settlement_cache.get(group_id, version)
+        if cached is not None:
+            return cached
+
+        if settled_version != version:
+            self.process_group_settlements(group_id, version)
+            # Still cached if the recompute moved nothing
+            cached = settlement_cache.get(group_id, version)
+            if cached is not None:
+                return cached
+        settlements = self.get_group_settlements(group_id)
+        settlement_cache.put(group_id, version, settlements)
+        return settlements
+
     def get_group_settlements(self, group_id):
         """Retrieve settlement transactions for a group."""
         with Database() as db:
             try:
                 db.cur.execute("""
-                    SELECT bs.borrower_id, u1.user_name, bs.receiver_id, u2.user_name, bs.amount
+                    SELECT bs.borrower_id, u1.user_name, bs.receiver_id, u2.user_name, bs.amount_cents
                     FROM balance_sheet bs
                     JOIN users u1 ON bs.borrower_id = u1.user_id
                     JOIN users u2 ON bs.receiver_id = u2.user_id
                     WHERE bs.group_id = ?
-                    ORDER BY bs.amount DESC
+                    ORDER BY bs.amount_cents DESC
                 """, (group_id,))
                 
                 results = db.cur.fetchall()
@@ -176,8 +611,8 @@ class BalanceCalculator:
                     "borrower_name": row[1],
                     "receiver_id": row[2],
                     "receiver_name": row[3],
-                    "amount": float(row[4])
+                    "amount": from_cents(row[4])
                 } for row in results]
-            except sqlite3.Error as e:
+            except DatabaseError as e:
                 logger.error(f"Error fetching settlements: {e}")
                 return []
\ No newline at end of file
@@ -0,0 +1,514 @@
+#!/usr/bin/env python3
+"""
+Versioned schema migrations for the SplitWise SQLite database.
+
+The applied version is stored in PRAGMA user_version. Each migration runs in its
+own write transaction together with the version bump, so a crash leaves the
+database at the last fully applied version.
+
+Migrations registered with online=True manage their own short transactions
+(e.g. chunked backfills) and must be safe to resume; the version is bumped
+only after they finish.
+
+Usage:
+    python migrations.py            # apply pending migrations
+    python migrations.py --status   # show current and latest version
+
+Online backfills take MIGRATION_CHUNK_SIZE rows per transaction (default 2000)
+and sleep MIGRATION_CHUNK_PAUSE seconds between chunks (default 0.005) so other writers get the lock.
+"""
+
+import argparse
+import logging
+import os
+import sqlite3
+import time
+from dotenv import load_dotenv
+from money import SCALE
+from ids import new_id, TIME_ORDERED_SQL
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+MIGRATIONS = []
+
+
+def migration(version, description, online=False):
+    """Register a migration step; steps must be declared in version order"""
+    def register(func):
+        if MIGRATIONS and MIGRATIONS[-1][0] >= version:
+            raise ValueError(f"Migration {version} declared out of order")
+        MIGRATIONS.append((version, description, func, online))
+        return func
+    return register
+
+
+@migration(1, "Base schema")
+def create_base_schema(cur):
+    cur.execute('''CREATE TABLE IF NOT EXISTS users (
+        user_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_name TEXT NOT NULL UNIQUE,
+        email TEXT UNIQUE,
+        password_hash TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )''')
+    cur.execute('''CREATE TABLE IF NOT EXISTS groups (
+        group_id TEXT PRIMARY KEY,
+        group_name TEXT NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )''')
+    cur.execute('''CREATE TABLE IF NOT EXISTS group_members (
+        group_id TEXT,
+        user_id INTEGER,
+        joined_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (group_id, user_id),
+        FOREIGN KEY (group_id) REFERENCES groups(group_id),
+        FOREIGN KEY (user_id) REFERENCES users(user_id)
+    )''')
+    cur.execute('''CREATE TABLE IF NOT EXISTS expense (
+        expense_id TEXT PRIMARY KEY,
+        name TEXT NOT NULL,
+        paid_by INTEGER,
+        total_amount REAL NOT NULL,
+        split_type TEXT NOT NULL CHECK (split_type IN ('equal', 'unequal', 'percentage')),
+        group_id TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (paid_by) REFERENCES users(user_id),
+        FOREIGN KEY (group_id) REFERENCES groups(group_id)
+    )''')
+    cur.execute('''CREATE TABLE IF NOT EXISTS expense_share (
+        expense_id TEXT,
+        borrower_id INTEGER,
+        paid_by_id INTEGER,
+        amount REAL NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (expense_id, borrower_id),
+        FOREIGN KEY (expense_id) REFERENCES expense(expense_id),
+        FOREIGN KEY (borrower_id) REFERENCES users(user_id),
+        FOREIGN KEY (paid_by_id) REFERENCES users(user_id)
+    )''')
+    cur.execute('''CREATE TABLE IF NOT EXISTS balance_sheet (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        group_id TEXT,
+        borrower_id INTEGER,
+        receiver_id INTEGER,
+        amount REAL NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (group_id) REFERENCES groups(group_id),
+        FOREIGN KEY (borrower_id) REFERENCES users(user_id),
+        FOREIGN KEY (receiver_id) REFERENCES users(user_id)
+    )''')
+
+
+@migration(2, "Add email and password_hash to users")
+def add_user_credentials(cur):
+    # Databases created before registration existed have a users table without these columns
+    cur.execute("PRAGMA table_info(users)")
+    columns = [column[1] for column in cur.fetchall()]
+
+    if 'email' not in columns:
+        cur.execute("ALTER TABLE users ADD COLUMN email TEXT")
+    if 'password_hash' not in columns:
+        cur.execute("ALTER TABLE users ADD COLUMN password_hash TEXT")
+
+
+@migration(3, "Secondary indexes for group, member and share lookups")
+def add_lookup_indexes(cur):
+    # Mirrors the indexes in database_setup.sql; (group_id, created_at) also serves
+    # plain group_id lookups, so it replaces idx_expense_group
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_expense_group_created ON expense(group_id, created_at)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_group_members_user ON group_members(user_id)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_expense_share_borrower ON expense_share(borrower_id)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_balance_sheet_group ON balance_sheet(group_id)")
+
+
+@migration(4, "Per-member net balance ledger")
+def add_group_balance(cur):
+    cur.execute('''CREATE TABLE IF NOT EXISTS group_balance (
+        group_id TEXT,
+        user_id INTEGER,
+        net_amount REAL NOT NULL DEFAULT 0,
+        PRIMARY KEY (group_id, user_id),
+        FOREIGN KEY (group_id) REFERENCES groups(group_id),
+        FOREIGN KEY (user_id) REFERENCES users(user_id)
+    )''')
+    # Backfill from the share history; the payer of a share is owed, the borrower owes
+    cur.execute('''
+        INSERT INTO group_balance (group_id, user_id, net_amount)
+        SELECT group_id, user_id, SUM(delta) FROM (
+            SELECT e.group_id, es.paid_by_id AS user_id, es.amount AS delta
+            FROM expense_share es JOIN expense e ON es.expense_id = e.expense_id
+            WHERE es.paid_by_id != es.borrower_id
+            UNION ALL
+            SELECT e.group_id, es.borrower_id, -es.amount
+            FROM expense_share es JOIN expense e ON es.expense_id = e.expense_id
+            WHERE es.paid_by_id != es.borrower_id
+        )
+        GROUP BY group_id, user_id
+    ''')
+
+
+@migration(5, "Ledger version stamps for settlement caching")
+def add_ledger_versions(cur):
+    # ledger_version is bumped by every expense write; settled_version records the
+    # ledger_version the group's balance_sheet rows were computed from
+    cur.execute("ALTER TABLE groups ADD COLUMN ledger_version INTEGER NOT NULL DEFAULT 0")
+    cur.execute("ALTER TABLE groups ADD COLUMN settled_version INTEGER")
+
+
+# (table, legacy REAL column, INTEGER minor-unit column)
+CENTS_COLUMNS = [
+    ("expense", "total_amount", "total_cents"),
+    ("expense_share", "amount", "amount_cents"),
+    ("balance_sheet", "amount", "amount_cents"),
+    ("group_balance", "net_amount", "net_cents"),
+]
+
+# Net balances of some groups from the share cents, summed as logic.py's
+# SHARE_NET_BALANCES_SQL does (payments and opening balances only arrive in
+# migrations 8 and 9, so at this version shares are the whole history)
+SHARE_NET_CENTS_SQL = """
+    WITH pairs AS (
+        SELECT e.group_id, es.paid_by_id AS payer, es.borrower_id AS borrower, SUM(es.amount_cents) AS amount
+        FROM expense e
+        JOIN expense_share es ON es.expense_id = e.expense_id
+        WHERE es.paid_by_id != es.borrower_id AND e.group_id IN ({placeholders})
+        GROUP BY e.group_id, es.paid_by_id, es.borrower_id
+    )
+    SELECT group_id, user_id, SUM(delta) FROM (
+        SELECT group_id, payer AS user_id, amount AS delta FROM pairs
+        UNION ALL
+        SELECT group_id, borrower, -amount FROM pairs
+    ) AS deltas
+    GROUP BY group_id, user_id
+"""
+
+
+@migration(6, "Store amounts as INTEGER minor units", online=True)
+def add_cents_columns(conn):
+    """
+    Add an INTEGER cents column next to every REAL amount and backfill it in
+    rowid chunks, each in its own short write transaction, so a live database
+    keeps serving writers in between. The REAL columns stay and are still
+    written, so processes running older code keep working during the rollout;
+    triggers fill the cents column for any row such a process writes.
+    """
+    chunk_size = int(os.getenv('MIGRATION_CHUNK_SIZE', '2000'))
+    pause = float(os.getenv('MIGRATION_CHUNK_PAUSE', '0.005'))
+    cur = conn.cursor()
+    try:
+        for table, real_column, cents_column in CENTS_COLUMNS:
+            to_cents_sql = f"CAST(ROUND(NEW.{real_column} * {SCALE}) AS INTEGER)"
+            cur.execute("BEGIN IMMEDIATE")
+            cur.execute(f"PRAGMA table_info({table})")
+            if cents_column not in [column[1] for column in cur.fetchall()]:
+                cur.execute(f"ALTER TABLE {table} ADD COLUMN {cents_column} INTEGER")
+            cur.execute(f'''CREATE TRIGGER IF NOT EXISTS {table}_{cents_column}_insert
+                AFTER INSERT ON {table} WHEN NEW.{cents_column} IS NULL
+                BEGIN
+                    UPDATE {table} SET {cents_column} = {to_cents_sql} WHERE rowid = NEW.rowid;
+                END''')
+            cur.execute(f'''CREATE TRIGGER IF NOT EXISTS {table}_{cents_column}_update
+                AFTER UPDATE OF {real_column} ON {table} WHEN NEW.{cents_column} IS OLD.{cents_column}
+                BEGIN
+                    UPDATE {table} SET {cents_column} = {to_cents_sql} WHERE rowid = NEW.rowid;
+                END''')
+            if table == "group_balance":
+                cur.execute("COMMIT")
+                backfill_net_cents(cur, chunk_size, pause)
+                continue
+            cur.execute(f"SELECT MAX(rowid) FROM {table}")
+            max_rowid = cur.fetchone()[0] or 0
+            cur.execute("COMMIT")
+
+            for start in range(0, max_rowid, chunk_size):
+                cur.execute("BEGIN IMMEDIATE")
+                cur.execute(f'''UPDATE {table} SET {cents_column} = CAST(ROUND({real_column} * {SCALE}) AS INTEGER)
+                               WHERE rowid > ? AND rowid <= ? AND {cents_column} IS NULL''',
+                            (start, start + chunk_size))
+                cur.execute("COMMIT")
+                if pause:
+                    time.sleep(pause)
+            logger.info(f"Backfilled {table}.{cents_column} ({max_rowid} rows)")
+    except Exception:
+        if conn.in_transaction:
+            cur.execute("ROLLBACK")
+        raise
+    finally:
+        cur.close()
+
+
+def backfill_net_cents(cur, chunk_size, pause):
+    """
+    Recompute group_balance.net_cents from the share cents backfilled before it,
+    a chunk of groups per write transaction. Rounding each REAL net_amount on its
+    own would leave a group's balances off by a cent where the float sums were
+    (e.g. 61.67 / -23.33 / -38.33 after a three-way split of 115), so nothing
+    here reads net_amount.
+    """
+    cur.execute("SELECT DISTINCT group_id FROM group_balance ORDER BY group_id")
+    group_ids = [row[0] for row in cur.fetchall()]
+    for start in range(0, len(group_ids), chunk_size):
+        chunk = group_ids[start:start + chunk_size]
+        placeholders = ", ".join("?" * len(chunk))
+        cur.execute("BEGIN IMMEDIATE")
+        cur.execute(f"UPDATE group_balance SET net_cents = 0 WHERE group_id IN ({placeholders})", chunk)
+        cur.execute(SHARE_NET_CENTS_SQL.format(placeholders=placeholders), chunk)
+        cur.executemany("UPDATE group_balance SET net_cents = ? WHERE group_id = ? AND user_id = ?",
+                        [(net, group_id, user_id) for group_id, user_id, net in cur.fetchall()])
+        cur.execute("COMMIT")
+        if pause:
+            time.sleep(pause)
+    logger.info(f"Recomputed group_balance.net_cents ({len(group_ids)} groups)")
+
+
+@migration(7, "Index group_balance by user for cross-group balances")
+def add_group_balance_user_index(cur):
+    # Covers the dashboard query: all of a user's ledger rows without table lookups
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_group_balance_user ON group_balance(user_id, group_id, net_cents)")
+
+
+@migration(8, "Settle-up payments and balance checkpoints")
+def add_payments_and_checkpoints(cur):
+    # ledger_version of the group right after the write that added the row;
+    # rows written before this migration count as version 0
+    cur.execute("ALTER TABLE expense ADD COLUMN ledger_version INTEGER NOT NULL DEFAULT 0")
+    # ledger_version at which every member's balance was last zero (NULL: never)
+    cur.execute("ALTER TABLE groups ADD COLUMN checkpoint_version INTEGER")
+    cur.execute('''CREATE TABLE IF NOT EXISTS payments (
+        payment_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        group_id TEXT NOT NULL,
+        payer_id INTEGER NOT NULL,
+        receiver_id INTEGER NOT NULL,
+        amount_cents INTEGER NOT NULL,
+        ledger_version INTEGER NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (group_id) REFERENCES groups(group_id),
+        FOREIGN KEY (payer_id) REFERENCES users(user_id),
+        FOREIGN KEY (receiver_id) REFERENCES users(user_id)
+    )''')
+    cur.execute('''CREATE TABLE IF NOT EXISTS group_checkpoints (
+        checkpoint_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        group_id TEXT NOT NULL,
+        ledger_version INTEGER NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (group_id) REFERENCES groups(group_id)
+    )''')
+    # History reads only touch rows after the group's checkpoint
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_expense_group_version ON expense(group_id, ledger_version)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_payments_group_version ON payments(group_id, ledger_version)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_group_checkpoints_group ON group_checkpoints(group_id, ledger_version)")
+
+
+# Cold storage for history moved out of the hot tables by archive_history.py.
+# {prefix} is "" for the main database or "archive." for an attached archive file.
+ARCHIVE_TABLES = [
+    '''CREATE TABLE IF NOT EXISTS {prefix}archived_expense (
+        expense_id TEXT PRIMARY KEY,
+        name TEXT NOT NULL,
+        paid_by INTEGER,
+        total_amount REAL NOT NULL,
+        total_cents INTEGER,
+        split_type TEXT NOT NULL,
+        group_id TEXT,
+        created_at TIMESTAMP,
+        ledger_version INTEGER NOT NULL,
+        archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )''',
+    '''CREATE TABLE IF NOT EXISTS {prefix}archived_expense_share (
+        expense_id TEXT,
+        borrower_id INTEGER,
+        paid_by_id INTEGER,
+        amount REAL NOT NULL,
+        amount_cents INTEGER,
+        created_at TIMESTAMP,
+        PRIMARY KEY (expense_id, borrower_id)
+    )''',
+    '''CREATE TABLE IF NOT EXISTS {prefix}archived_payments (
+        payment_id INTEGER PRIMARY KEY,
+        group_id TEXT NOT NULL,
+        payer_id INTEGER NOT NULL,
+        receiver_id INTEGER NOT NULL,
+        amount_cents INTEGER NOT NULL,
+        ledger_version INTEGER NOT NULL,
+        created_at TIMESTAMP,
+        archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )''',
+    "CREATE INDEX IF NOT EXISTS {prefix}idx_archived_expense_group_created ON archived_expense(group_id, created_at)",
+    "CREATE INDEX IF NOT EXISTS {prefix}idx_archived_payments_group ON archived_payments(group_id, created_at)",
+]
+
+
+def create_archive_tables(cur, prefix=""):
+    for statement in ARCHIVE_TABLES:
+        cur.execute(statement.format(prefix=prefix))
+
+
+@migration(9, "Opening balances and archive tables")
+def add_archive_tables(cur):
+    # Net (payer, borrower) amounts of archived history that was not yet settled;
+    # read as part of the group's history like shares and payments
+    cur.execute('''CREATE TABLE IF NOT EXISTS opening_balances (
+        group_id TEXT NOT NULL,
+        payer_id INTEGER NOT NULL,
+        borrower_id INTEGER NOT NULL,
+        amount_cents INTEGER NOT NULL,
+        ledger_version INTEGER NOT NULL,
+        PRIMARY KEY (group_id, payer_id, borrower_id),
+        FOREIGN KEY (group_id) REFERENCES groups(group_id)
+    )''')
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_opening_balances_group_version "
+                "ON opening_balances(group_id, ledger_version)")
+    create_archive_tables(cur)
+
+
+@migration(10, "Import progress")
+def add_import_progress(cur):
+    # Records of an import source already committed, written in the same
+    # transaction as the expenses so an interrupted import resumes exactly there
+    cur.execute('''CREATE TABLE IF NOT EXISTS import_progress (
+        source TEXT PRIMARY KEY,
+        records INTEGER NOT NULL,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )''')
+
+
+@migration(11, "Rekey expenses with time-ordered ids", online=True)
+def rekey_expense_ids(conn):
+    """
+    Give every expense with a random uuid4 id a time-ordered one (ids.new_id,
+    built from its created_at), updating its expense_share rows in the same
+    transaction. Runs in rowid chunks like migration 6; ids already
+    time-ordered are skipped, so an interrupted run just continues. Archived
+    history keeps its ids.
+    """
+    chunk_size = int(os.getenv('MIGRATION_CHUNK_SIZE', '2000'))
+    pause = float(os.getenv('MIGRATION_CHUNK_PAUSE', '0.005'))
+    time_ordered = TIME_ORDERED_SQL.format(column="expense_id")
+    cur = conn.cursor()
+    try:
+        cur.execute("SELECT MAX(rowid) FROM expense")
+        max_rowid = cur.fetchone()[0] or 0
+        rekeyed = 0
+        for start in range(0, max_rowid, chunk_size):
+            cur.execute("BEGIN IMMEDIATE")
+            cur.execute(f'''SELECT expense_id, CAST(strftime('%s', created_at) AS INTEGER) FROM expense
+                           WHERE rowid > ? AND rowid <= ? AND NOT {time_ordered}''', (start, start + chunk_size))
+            rekeys = [(new_id(seconds * 1000 if seconds is not None else None), expense_id)
+                      for expense_id, seconds in cur.fetchall()]
+            cur.executemany("UPDATE expense SET expense_id = ? WHERE expense_id = ?", rekeys)
+            cur.executemany("UPDATE expense_share SET expense_id = ? WHERE expense_id = ?", rekeys)
+            cur.execute("COMMIT")
+            rekeyed += len(rekeys)
+            if pause:
+                time.sleep(pause)
+        logger.info(f"Rekeyed {rekeyed} expenses")
+    except Exception:
+        if conn.in_transaction:
+            cur.execute("ROLLBACK")
+        raise
+    finally:
+        cur.close()
+
+
+@migration(12, "Idempotency keys for expense creation")
+def add_idempotency_keys(cur):
+    # response is written in the same transaction as the claim, so a committed
+    # key always has one; created_at drives the TTL cleanup in idempotency.py
+    cur.execute('''CREATE TABLE IF NOT EXISTS idempotency_keys (
+        idempotency_key TEXT PRIMARY KEY,
+        response TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )''')
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_idempotency_keys_created ON idempotency_keys(created_at)")
+
+
+def latest_version():
+    return MIGRATIONS[-1][0] if MIGRATIONS else 0
+
+
+def get_schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn, target=None):
+    """Apply pending migrations on an open connection; returns the resulting version"""
+    target = latest_version() if target is None else target
+    current = get_schema_version(conn)
+    if current >= target:
+        return current
+
+    previous_isolation = conn.isolation_level
+    conn.isolation_level = None  # explicit transaction control below
+    cur = conn.cursor()
+    try:
+        for version, description, apply, online in MIGRATIONS:
+            if version <= current:
+                continue
+            if version > target:
+                break
+            if online:
+                apply(conn)
+            # BEGIN IMMEDIATE takes the write lock before re-reading the version, so
+            # two processes starting at once cannot both apply the same step
+            cur.execute("BEGIN IMMEDIATE")
+            try:
+                if get_schema_version(conn) >= version:
+                    cur.execute("COMMIT")
+                    continue
+                if not online:
+                    apply(cur)
+                cur.execute(f"PRAGMA user_version = {int(version)}")
+                cur.execute("COMMIT")
+                logger.info(f"Applied migration {version}: {description}")
+            except Exception:
+                cur.execute("ROLLBACK")
+                raise
+        return get_schema_version(conn)
+    finally:
+        cur.close()
+        conn.isolation_level = previous_isolation
+
+
+def migrate_database(db_path=None, target=None):
+    db_path = db_path or os.getenv('DB_PATH', 'splitwise.db')
+    conn = sqlite3.connect(db_path)
+    try:
+        return migrate(conn, target)
+    finally:
+        conn.close()
+
+
+def prepare_archive(archive_path):
+    """Create the archive tables in a separate archive file (DB_ARCHIVE_PATH)"""
+    conn = sqlite3.connect(archive_path)
+    try:
+        with conn:
+            create_archive_tables(conn.cursor())
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply SplitWise schema migrations")
+    parser.add_argument("--db", default=None, help="Database path (defaults to DB_PATH)")
+    parser.add_argument("--status", action="store_true", help="Only show the schema version")
+    parser.add_argument("--target", type=int, default=None, help="Migrate up to this version")
+    args = parser.parse_args()
+
+    db_path = args.db or os.getenv('DB_PATH', 'splitwise.db')
+    if args.status:
+        conn = sqlite3.connect(db_path)
+        try:
+            print(f"{db_path}: schema version {get_schema_version(conn)} (latest {latest_version()})")
+        finally:
+            conn.close()
+        return
+
+    version = migrate_database(db_path, args.target)
+    print(f"{db_path}: schema version {version}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
\ No newline at end of file
@@ -0,0 +1,54 @@
+"""
+Fixed-point money helpers.
+
+Amounts are handled as integers in the currency's minor unit (cents for an
+exponent of 2) so that splits and settlements add up exactly.
+"""
+
+import os
+from decimal import Decimal, ROUND_HALF_UP
+from fractions import Fraction
+
+CURRENCY_EXPONENT = int(os.getenv('CURRENCY_EXPONENT', '2'))
+SCALE = 10 ** CURRENCY_EXPONENT
+
+
+def to_cents(amount):
+    """Convert an amount in currency units (int, float, str or Decimal) to integer minor units"""
+    if isinstance(amount, int):
+        return amount * SCALE
+    # str() gives the shortest float repr, so 1.005 rounds half-up to 101 cents
+    return int((Decimal(str(amount)) * SCALE).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def from_cents(cents):
+    """Convert integer minor units back to currency units"""
+    return cents / SCALE
+
+
+def allocate(total_cents, weights):
+    """
+    Split total_cents proportionally to weights using the largest-remainder method.
+
+    :param total_cents: Integer amount to distribute
+    :param weights: Non-negative weights (int, Fraction or numeric string)
+    :return: List of integers, one per weight, summing exactly to total_cents.
+             Leftover cents go to the largest remainders, earlier positions first on ties.
+    """
+    weights = [Fraction(weight) for weight in weights]
+    weight_sum = sum(weights)
+    if weight_sum <= 0:
+        raise ValueError("Weights must add up to a positive number")
+
+    shares = []
+    remainders = []
+    for index, weight in enumerate(weights):
+        exact = total_cents * weight / weight_sum
+        share = exact.numerator // exact.denominator
+        shares.append(share)
+        remainders.append((share - exact, index))
+
+    leftover = total_cents - sum(shares)
+    for _, index in sorted(remainders)[:leftover]:
+        shares[index] += 1
+    return shares
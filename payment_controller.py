@@ -0,0 +1,111 @@
+from database import Database, DatabaseError
+from expense import BALANCE_UPSERT, LEDGER_VERSION_BUMP
+from idempotency import claim_key, store_result
+from money import to_cents, from_cents
+import logging
+
+logger = logging.getLogger(__name__)
+
+PAYMENT_INSERT = '''
+    INSERT INTO payments (group_id, payer_id, receiver_id, amount_cents, ledger_version)
+    VALUES (?, ?, ?, ?, ?)
+'''
+
+class PaymentController:
+    def record_payment(self, group_id, payer_id, receiver_id, amount, recorded_by=None, idempotency_key=None):
+        """
+        Record a settle-up payment and update the group_balance ledger.
+
+        When the payment leaves every member of the group settled, a checkpoint is
+        written: balance computation then only reads shares and payments newer than it.
+
+        :param payer_id: Member who paid (their debt goes down)
+        :param receiver_id: Member who received the money
+        :param amount: Amount in currency units
+        :param recorded_by: User recording the payment (e.g. the session user), who must be a member too
+        :param idempotency_key: Optional client key; a retry with the same key returns the first result
+        :return: {"success", "payment_id", "checkpoint"} or {"success": False, "message"}
+        """
+        if payer_id == receiver_id:
+            return {"success": False, "message": "Payer and receiver must be different members"}
+        try:
+            cents = to_cents(amount)
+        except (TypeError, ValueError, ArithmeticError):
+            return {"success": False, "message": "Invalid amount"}
+        if cents <= 0:
+            return {"success": False, "message": "Amount must be positive"}
+
+        with Database() as db:
+            try:
+                if idempotency_key:
+                    stored = claim_key(db, idempotency_key)
+                    if stored is not None:
+                        logger.info(f"Payment request {idempotency_key} already handled, returning its result")
+                        return stored
+                # Takes the write lock and invalidates cached settlements of the group
+                db.cur.execute(LEDGER_VERSION_BUMP, (group_id,))
+                if db.cur.rowcount == 0:
+                    db.conn.rollback()
+                    return {"success": False, "message": "Group not found"}
+                # Checked under the write lock, so a member removed meanwhile cannot slip through
+                required = {payer_id, receiver_id} | ({recorded_by} if recorded_by is not None else set())
+                placeholders = ", ".join("?" * len(required))
+                db.cur.execute(f"SELECT COUNT(*) FROM group_members WHERE group_id = ? AND user_id IN ({placeholders})",
+                               (group_id, *required))
+                if db.cur.fetchone()[0] != len(required):
+                    db.conn.rollback()
+                    return {"success": False, "message": "Payer, receiver and recorder must be members of the group"}
+                db.cur.execute("SELECT ledger_version FROM groups WHERE group_id = ?", (group_id,))
+                version = db.cur.fetchone()[0]
+
+                payment_id = db.insert_returning_id(PAYMENT_INSERT,
+                                                    (group_id, payer_id, receiver_id, cents, version), 'payment_id')
+                # Sorted so concurrent writers lock ledger rows in the same order
+                db.cur.executemany(BALANCE_UPSERT, sorted([(group_id, payer_id, from_cents(cents), cents),
+                                                           (group_id, receiver_id, -from_cents(cents), -cents)],
+                                                          key=lambda row: row[1]))
+
+                db.cur.execute("SELECT 1 FROM group_balance WHERE group_id = ? AND net_cents != 0 LIMIT 1",
+                               (group_id,))
+                checkpoint = db.cur.fetchone() is None
+                if checkpoint:
+                    db.cur.execute("INSERT INTO group_checkpoints (group_id, ledger_version) VALUES (?, ?)",
+                                   (group_id, version))
+                    db.cur.execute("UPDATE groups SET checkpoint_version = ? WHERE group_id = ?", (version, group_id))
+                    logger.info(f"Group {group_id} fully settled, checkpoint at version {version}")
+
+                logger.info(f"Payment {payment_id} recorded in group {group_id}")
+                result = {"success": True, "payment_id": payment_id, "checkpoint": checkpoint}
+                if idempotency_key:
+                    store_result(db, idempotency_key, result)
+                return result
+            except DatabaseError as e:
+                db.conn.rollback()
+                logger.error(f"Database error recording payment: {e}")
+                return {"success": False, "message": "Failed to record payment"}
+
+    def get_group_payments(self, group_id):
+        """Payments of a group, newest first"""
+        with Database() as db:
+            try:
+                db.cur.execute("""
+                    SELECT p.payment_id, p.payer_id, u1.user_name, p.receiver_id, u2.user_name, p.amount_cents,
+                           p.created_at
+                    FROM payments p
+                    JOIN users u1 ON p.payer_id = u1.user_id
+                    JOIN users u2 ON p.receiver_id = u2.user_id
+                    WHERE p.group_id = ?
+                    ORDER BY p.payment_id DESC
+                """, (group_id,))
+                return [{
+                    "payment_id": row[0],
+                    "payer_id": row[1],
+                    "payer_name": row[2],
+                    "receiver_id": row[3],
+                    "receiver_name": row[4],
+                    "amount": from_cents(row[5]),
+                    "created_at": row[6]
+                } for row in db.cur.fetchall()]
+            except DatabaseError as e:
+                logger.error(f"Error fetching payments: {e}")
+                return []
@@ -1,30 +1,45 @@
+from fractions import Fraction
+from money import to_cents, from_cents, allocate
+
 class PercentageExpenseSplit:
     def process_split(self, paid_by, user_shares, total_amount):
         """
         Distributes an expense based on percentage shares.
 
+        Shares are allocated in whole cents with the largest-remainder method,
+        so they always add up to total_amount exactly.
+
         :param paid_by: UUID of the user who paid the expense
         :param user_shares: List of dictionaries [{"userid": id, "percentage": percentage}]
         :param total_amount: The total amount paid
         :return: List of tuples in format (borrower_id, paid_by_id, amount)
         """
-    
-        total_percentage = sum(entry.get("percentage", 0) for entry in user_shares)
-        if total_percentage != 100:
-            raise ValueError("Sum of percentage shares must be exactly 100%.")
-
-        split_transactions = []
 
         for entry in user_shares:
-            user = entry.get("borrower_id")
-            percentage = entry.get("percentage")
-
-            if user is None or percentage is None:
+            if entry.get("borrower_id") is None or entry.get("percentage") is None:
                 raise ValueError(f"Invalid entry format: {entry}")
 
-            split_amount = (percentage / 100) * total_amount  
+        percentages = [Fraction(str(entry["percentage"])) for entry in user_shares]
+        if sum(percentages) != 100:
+            raise ValueError("Sum of percentage shares must be exactly 100%.")
+
+        split_amounts = allocate(to_cents(total_amount), percentages)
+        split_transactions = []
+
+        for entry, split_cents in zip(user_shares, split_amounts):
+            user = entry["borrower_id"]
 
             if user != paid_by:  
-                split_transactions.append((user, paid_by, split_amount))
+                split_transactions.append((user, paid_by, from_cents(split_cents)))
 
         return split_transactions
+
+    def process_batch(self, expense_idx, borrower_ids, paid_by, total_cents, percentages):
+        """
+        Percentage split of many expenses at once; see batch_split for the columnar inputs.
+
+        :param percentages: Percentage of each row
+        :return: batch_split.SplitBatch
+        """
+        from batch_split import split_percentage  # NumPy is only needed for batch splits
+        return split_percentage(expense_idx, borrower_ids, paid_by, total_cents, percentages)
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Recompute balance_sheet for every group
+
+Worker processes load shares and compute settlements for chunks of groups, each
+with its own pooled connection; the parent is the only writer and stores each
+finished chunk in one transaction.
+
+Usage:
+    python recompute_settlements.py [--workers N] [--chunk-size 1000] [--solver greedy|optimal]
+"""
+
+import argparse
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from database import Database
+from batch_settlement import BatchSettlement
+
+
+def settle_chunk(group_ids, solver):
+    """Worker: compute (not store) settlements for one chunk of groups"""
+    return BatchSettlement(solver).settle(group_ids)
+
+
+def recompute_all(workers=None, chunk_size=1000, solver=None, progress=None):
+    """
+    Recompute and store settlements of all groups.
+
+    :param progress: Optional callback(done_groups, total_groups, elapsed_seconds)
+    :return: {"groups", "settlements", "seconds"}
+    """
+    with Database() as db:
+        db.cur.execute("SELECT group_id FROM groups ORDER BY group_id")
+        group_ids = [row[0] for row in db.cur.fetchall()]
+    chunks = [group_ids[start:start + chunk_size] for start in range(0, len(group_ids), chunk_size)]
+
+    writer = BatchSettlement(solver)
+    start = time.perf_counter()
+    done = settlements = 0
+
+    def store(results, versions):
+        nonlocal done, settlements
+        writer.store(results, versions)
+        done += len(results)
+        settlements += sum(len(rows) for rows in results.values())
+        if progress:
+            progress(done, len(group_ids), time.perf_counter() - start)
+
+    if workers == 1:
+        for chunk in chunks:
+            store(*settle_chunk(chunk, writer.solver))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(settle_chunk, chunk, writer.solver) for chunk in chunks]
+            for future in as_completed(futures):
+                store(*future.result())
+
+    return {"groups": done, "settlements": settlements, "seconds": time.perf_counter() - start}
+
+
+def print_progress(done, total, elapsed):
+    print(f"  {done}/{total} groups ({done / elapsed if elapsed else 0:.0f} groups/s)", flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recompute settlements for every group")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Worker processes (1 runs in-process)")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="Groups per worker task and write transaction")
+    parser.add_argument("--solver", choices=["greedy", "optimal"], default=None,
+                        help="Settlement solver (defaults to SETTLEMENT_SOLVER)")
+    args = parser.parse_args()
+
+    print(f"Recomputing settlements with {args.workers} workers, {args.chunk_size} groups per chunk")
+    stats = recompute_all(args.workers, args.chunk_size, args.solver, progress=print_progress)
+    seconds = stats["seconds"]
+    print(f"\nRecomputed {stats['groups']} groups ({stats['settlements']} settlements) in {seconds:.2f}s"
+          f" - {stats['groups'] / seconds if seconds else 0:.0f} groups/s")
+
+
+if __name__ == "__main__":
+    logging.disable(logging.INFO)
+    main()
@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+"""
+Rebuild the group_balance ledger from expense_share and payments and report any drift
+
+Usage:
+    python reconcile_balances.py [--group GROUP_ID] [--dry-run]
+"""
+
+import argparse
+import logging
+from logic import BalanceCalculator
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reconcile the group_balance ledger with expense_share and payments")
+    parser.add_argument("--group", default=None, help="Only reconcile this group")
+    parser.add_argument("--dry-run", action="store_true", help="Report drift without rebuilding")
+    args = parser.parse_args()
+
+    drift = BalanceCalculator().reconcile_group_balances(args.group, rebuild=not args.dry_run)
+
+    if not drift:
+        print("group_balance matches expense_share")
+    else:
+        print(f"{'Group':<34} {'User':>8} {'Expected':>12} {'Ledger':>12}")
+        print("-" * 70)
+        for row in drift:
+            print(f"{str(row['group_id']):<34} {row['user_id']:>8} {row['expected']:>12.2f} {row['actual']:>12.2f}")
+        print(f"\n{len(drift)} drifted rows" + (" (not rebuilt)" if args.dry_run else " rebuilt"))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
+    main()
@@ -0,0 +1,133 @@
+"""
+Minimum-transfer settlement solver.
+
+A group of n members with non-zero balances can always be settled with n - k
+transfers, where k is the largest number of disjoint zero-sum subgroups the
+members can be split into (each subgroup of size s needs s - 1 transfers).
+The greedy matcher in logic.py does not always find that split; this solver
+does, with a bitmask DP over member subsets, for groups small enough to search
+within a CPU time budget. Larger groups, or searches that run out of time,
+fall back to the greedy matcher.
+
+Settings (environment):
+    SETTLEMENT_SOLVER_MAX_MEMBERS  - largest member count searched (default 20)
+    SETTLEMENT_SOLVER_TIME_BUDGET  - CPU seconds per group before falling back (default 0.5)
+"""
+
+import logging
+import os
+import time
+import numpy as np
+from logic import match_settlements
+
+logger = logging.getLogger(__name__)
+
+
+def _pair_opposites(balances):
+    """
+    Split off members whose balances cancel exactly (x and -x). Some optimal
+    split always contains such a pair as its own subgroup, so this is safe and
+    shrinks the search.
+
+    :return: (list of paired subgroups, remaining {user: cents})
+    """
+    waiting = {}
+    pairs = []
+    remaining = {}
+    for user, cents in balances.items():
+        partner = waiting.get(-cents)
+        if partner:
+            pairs.append({partner.pop(): -cents, user: cents})
+            if not partner:
+                del waiting[-cents]
+        else:
+            waiting.setdefault(cents, []).append(user)
+    for cents, users in waiting.items():
+        for user in users:
+            remaining[user] = cents
+    # Keep the caller's member order for deterministic output
+    order = {user: i for i, user in enumerate(balances)}
+    return pairs, dict(sorted(remaining.items(), key=lambda item: order[item[0]]))
+
+
+def zero_sum_subgroups(balances, deadline=None):
+    """
+    Split members into the largest number of disjoint zero-sum subgroups.
+
+    dp[mask] is the most zero-sum "prefixes" an ordering of the members in mask
+    can have; it is filled layer by layer by subset size, vectorized over all
+    masks of a layer.
+
+    :param balances: {user: cents}, summing to zero, at most ~20 members
+    :param deadline: time.process_time() value after which to give up
+    :return: List of {user: cents} subgroups, or None if the deadline passed
+    """
+    users = list(balances)
+    n = len(users)
+    amounts = np.array([balances[user] for user in users], dtype=np.int64)
+    size = 1 << n
+
+    sums = np.zeros(size, dtype=np.int64)
+    popcount = np.zeros(size, dtype=np.int8)
+    for i in range(n):
+        sums[1 << i:1 << (i + 1)] = sums[:1 << i] + amounts[i]
+        popcount[1 << i:1 << (i + 1)] = popcount[:1 << i] + 1
+    is_zero = (sums == 0).astype(np.int8)
+
+    dp = np.zeros(size, dtype=np.int8)
+    order = np.argsort(popcount, kind="stable")
+    layer_ends = np.cumsum(np.bincount(popcount, minlength=n + 1))
+    for k in range(1, n + 1):
+        masks = order[layer_ends[k - 1]:layer_ends[k]]
+        best = np.zeros(len(masks), dtype=np.int8)
+        for i in range(n):
+            bit = 1 << i
+            has_bit = (masks & bit) != 0
+            np.maximum(best, np.where(has_bit, dp[masks ^ bit], 0), out=best)
+        dp[masks] = best + is_zero[masks]
+        if deadline is not None and time.process_time() > deadline:
+            return None
+
+    # Walk back from the full set; every zero-sum mask on the path closes a subgroup
+    subgroups = []
+    mask = closed = size - 1
+    while mask:
+        target = dp[mask] - is_zero[mask]
+        for i in range(n):
+            bit = 1 << i
+            if mask & bit and dp[mask ^ bit] == target:
+                mask ^= bit
+                break
+        if is_zero[mask]:
+            members = closed & ~mask
+            subgroups.append({users[i]: balances[users[i]] for i in range(n) if members >> i & 1})
+            closed = mask
+    return subgroups[::-1]
+
+
+def optimal_settlements(net_balances, group_id, max_members=None, time_budget=None):
+    """
+    Settle with the fewest transfers when the group is small enough, otherwise greedily.
+
+    :param net_balances: Dict of user -> net balance in integer cents
+    :return: List of (group_id, debtor, creditor, amount) with amount in currency units
+    """
+    max_members = max_members or int(os.getenv('SETTLEMENT_SOLVER_MAX_MEMBERS', '20'))
+    time_budget = time_budget if time_budget is not None else float(os.getenv('SETTLEMENT_SOLVER_TIME_BUDGET', '0.5'))
+
+    balances = {user: cents for user, cents in net_balances.items() if cents != 0}
+    pairs, remaining = _pair_opposites(balances)
+    if len(remaining) > max_members:
+        logger.debug("Group %s has %d members to search, using greedy settlement", group_id, len(remaining))
+        return match_settlements(net_balances, group_id)
+
+    subgroups = zero_sum_subgroups(remaining, time.process_time() + time_budget) if remaining else []
+    if subgroups is None:
+        logger.info(f"Settlement search for group {group_id} exceeded {time_budget}s, using greedy settlement")
+        return match_settlements(net_balances, group_id)
+
+    settlements = []
+    for subgroup in pairs + subgroups:
+        # Greedy needs exactly size - 1 transfers on a subgroup with no zero-sum split
+        settlements.extend(match_settlements(subgroup, group_id))
+    return settlements
@@ -39,7 +39,16 @@ def show_tables():
                 'group_members': 'Links users to groups (many-to-many)',
                 'expense': 'Main expense records',
                 'expense_share': 'Individual shares of each expense',
-                'balance_sheet': 'Optimized settlements (who pays whom)'
+                'balance_sheet': 'Optimized settlements (who pays whom)',
+                'group_balance': 'Net balance of each member per group (ledger)',
+                'payments': 'Settle-up payments between group members',
+                'group_checkpoints': 'Points at which a group was fully settled',
+                'opening_balances': 'Unsettled amounts of archived history',
+                'archived_expense': 'Archived expense records',
+                'archived_expense_share': 'Shares of archived expenses',
+                'archived_payments': 'Archived settle-up payments',
+                'import_progress': 'Records committed per import file',
+                'idempotency_keys': 'Results of expense requests by idempotency key'
             }
             
             if table in purpose:
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Test script for archiving old expense history
+"""
+
+import os
+import sqlite3
+import tempfile
+from connection_sqlite import Database
+from expense_controller import ExpenseController
+from payment_controller import PaymentController
+from logic import BalanceCalculator
+from archive_history import archive_history
+from test_support import temp_database
+
+
+def seed_history():
+    """Settled history (with a checkpoint), then old and new unsettled expenses"""
+    with Database() as db:
+        db.cur.executemany("INSERT INTO users (user_id, user_name) VALUES (?, ?)",
+                           [(1, 'arch_alice'), (2, 'arch_bob'), (3, 'arch_carol')])
+        db.cur.execute("INSERT INTO groups (group_id, group_name) VALUES ('arch_group', 'Archive')")
+        db.cur.executemany("INSERT INTO group_members (group_id, user_id) VALUES ('arch_group', ?)", [(1,), (2,), (3,)])
+    expenses = ExpenseController()
+    expenses.create_expense("arch_group", "Dinner", 90.0, 1, [1, 2, 3])
+    payments = PaymentController()
+    payments.record_payment("arch_group", 2, 1, 30)
+    assert payments.record_payment("arch_group", 3, 1, 30)['checkpoint']
+
+    expenses.create_custom_expense("arch_group", "Hotel", 100.0, 2, {1: 50.0, 3: 50.0})
+    expenses.create_custom_expense("arch_group", "Taxi", 20.0, 3, {1: 20.0})
+    expenses.create_expense("arch_group", "Lunch", 30.0, 1, [1, 2, 3])
+    payments.record_payment("arch_group", 1, 2, 10)
+    with Database() as db:
+        db.cur.executemany("UPDATE expense SET created_at = ? WHERE name = ?", [('2020-01-01 10:00:00', 'Dinner'),
+                                                                                ('2020-02-01 10:00:00', 'Hotel'),
+                                                                                ('2020-03-01 10:00:00', 'Taxi')])
+        db.cur.execute("UPDATE payments SET created_at = '2020-01-01 11:00:00' WHERE amount_cents = 3000")
+
+
+def balance_snapshot(calculator):
+    return (calculator.fetch_net_balances("arch_group"),
+            BalanceCalculator(balance_source="sql").get_net_balances("arch_group"),
+            {int(user): cents for user, cents in
+             BalanceCalculator(balance_source="python").get_net_balances("arch_group").items() if cents},
+            calculator.settle_transactions(calculator.fetch_net_balances("arch_group"), "arch_group"))
+
+
+def test_archive_keeps_balances():
+    print("Testing archiving into the main database...")
+    with temp_database('hot.db', DB_ARCHIVE_PATH=None):
+        seed_history()
+        calculator = BalanceCalculator()
+        expenses = ExpenseController()
+        before = balance_snapshot(calculator)
+
+        # Only the settled history (Dinner and both payments) qualifies without a date
+        assert archive_history() == {"groups": 1, "expenses": 1, "shares": 3, "payments": 2}
+        assert balance_snapshot(calculator) == before
+        assert [e.description for e in expenses.get_group_expenses("arch_group")] == ["Lunch", "Taxi", "Hotel"]
+
+        # Unsettled history before the date moves as well, leaving opening balances behind
+        moved = archive_history(before="2021-01-01")
+        assert moved == {"groups": 1, "expenses": 2, "shares": 3, "payments": 0}
+        assert balance_snapshot(calculator) == before
+        assert calculator.reconcile_group_balances("arch_group", rebuild=False) == []
+        assert archive_history(before="2021-01-01")["groups"] == 0
+
+        assert [e.description for e in expenses.get_group_expenses("arch_group")] == ["Lunch"]
+        history = expenses.get_group_expenses("arch_group", include_archive=True)
+        assert [e.description for e in history] == ["Lunch", "Taxi", "Hotel", "Dinner"]
+        assert [e.archived for e in history] == [False, True, True, True]
+        page = expenses.get_group_expenses("arch_group", include_archive=True, limit=2, offset=1)
+        assert [e.expense_id for e in page] == [e.expense_id for e in history[1:3]]
+
+        with Database() as db:
+            db.cur.execute("SELECT payer_id, borrower_id, amount_cents FROM opening_balances ORDER BY payer_id")
+            assert db.cur.fetchall() == [(2, 1, 5000), (2, 3, 5000), (3, 1, 2000)]
+
+
+def test_archive_into_attached_file():
+    print("Testing archiving into a separate archive file...")
+    with temp_database('hot.db', DB_ARCHIVE_PATH=os.path.join(tempfile.mkdtemp(), 'archive.db')):
+        seed_history()
+        calculator = BalanceCalculator()
+        before = balance_snapshot(calculator)
+
+        assert archive_history(before="2021-01-01")["expenses"] == 3
+        assert balance_snapshot(calculator) == before
+        assert len(ExpenseController().get_group_expenses("arch_group", include_archive=True)) == 4
+
+        conn = sqlite3.connect(os.environ['DB_ARCHIVE_PATH'])
+        try:
+            assert conn.execute("SELECT COUNT(*) FROM archived_expense").fetchone()[0] == 3
+            assert conn.execute("SELECT COUNT(*) FROM archived_payments").fetchone()[0] == 2
+        finally:
+            conn.close()
+        with Database() as db:
+            db.cur.execute("SELECT COUNT(*) FROM main.archived_expense")
+            assert db.cur.fetchone()[0] == 0
+
+
+if __name__ == "__main__":
+    test_archive_keeps_balances()
+    test_archive_into_attached_file()
+    print("\nArchive tests completed successfully!")
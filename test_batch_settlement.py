@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Test script for the vectorized batch settlement engine
+"""
+
+import random
+from connection_sqlite import Database
+from expense_controller import ExpenseController
+from logic import BalanceCalculator
+from batch_settlement import BatchSettlement
+from recompute_settlements import recompute_all
+from test_support import temp_database
+
+
+def seed_groups(num_groups, num_users, rng):
+    with Database() as db:
+        db.cur.executemany("INSERT INTO users (user_id, user_name) VALUES (?, ?)",
+                           [(i, f'batch_user_{i}') for i in range(1, num_users + 1)])
+        db.cur.executemany("INSERT INTO groups (group_id, group_name) VALUES (?, ?)",
+                           [(f'g{i}', f'Group {i}') for i in range(num_groups)])
+    expenses = []
+    for i in range(num_groups - 1):  # the last group stays empty
+        members = rng.sample(range(1, num_users + 1), rng.randint(2, 6))
+        for _ in range(rng.randint(1, 8)):
+            borrowers = rng.sample(members, rng.randint(1, len(members)))
+            shares = [{"borrower_id": user, "amount": rng.choice([5.0, 10.0, 12.5, 33.33])} for user in borrowers]
+            expenses.append({"name": "batch", "paid_by": rng.choice(members), "split_type": "unequal",
+                             "total_amount": round(sum(share["amount"] for share in shares), 2),
+                             "user_shares": shares, "group_id": f'g{i}'})
+    result = ExpenseController().bulk_create_expenses(expenses)
+    assert result['created'] == len(expenses), result['errors'][:3]
+
+
+def test_batch_matches_balance_calculator():
+    print("Comparing batch settlement with BalanceCalculator...")
+    with temp_database('batch.db'):
+        seed_groups(40, 12, random.Random(3))
+        calculator = BalanceCalculator()
+        batch = BatchSettlement()
+
+        results, versions = batch.settle()
+        assert len(results) == 40
+        for group_id, settlements in results.items():
+            expected = calculator.settle_transactions(calculator.fetch_net_balances(group_id), group_id)
+            assert settlements == expected, f"{group_id}: {settlements} != {expected}"
+
+        # Stale rows of the group without expenses must be cleared
+        with Database() as db:
+            db.cur.execute("INSERT INTO balance_sheet (group_id, borrower_id, receiver_id, amount, amount_cents) "
+                           "VALUES ('g39', 1, 2, 1.0, 100)")
+        assert batch.recompute() == 40
+        for group_id in versions:
+            stored = [(row["borrower_id"], row["receiver_id"], row["amount"])
+                      for row in calculator.get_group_settlements(group_id)]
+            assert sorted(stored) == sorted(row[1:] for row in results[group_id])
+        with Database() as db:
+            db.cur.execute("SELECT COUNT(*) FROM groups WHERE settled_version IS NOT ledger_version")
+            assert db.cur.fetchone()[0] == 0
+
+        subset, _ = batch.settle(['g1', 'g2'])
+        assert subset == {'g1': results['g1'], 'g2': results['g2']}
+
+
+def test_parallel_recompute_stores_every_group():
+    print("Testing the parallel recompute command...")
+    with temp_database('recompute.db'):
+        seed_groups(25, 10, random.Random(8))
+        expected, _ = BatchSettlement().settle()
+
+        progress = []
+        stats = recompute_all(workers=2, chunk_size=7, progress=lambda done, total, _: progress.append((done, total)))
+        assert stats["groups"] == 25
+        assert stats["settlements"] == sum(len(rows) for rows in expected.values())
+        assert len(progress) == 4 and progress[-1] == (25, 25)  # one report per stored chunk
+
+        with Database() as db:
+            db.cur.execute("SELECT group_id, borrower_id, receiver_id, amount FROM balance_sheet")
+            stored = sorted(db.cur.fetchall())
+            db.cur.execute("SELECT COUNT(*) FROM groups WHERE settled_version IS NOT ledger_version")
+            assert db.cur.fetchone()[0] == 0
+        assert stored == sorted(row for rows in expected.values() for row in rows)
+
+
+if __name__ == "__main__":
+    test_batch_matches_balance_calculator()
+    test_parallel_recompute_stores_every_group()
+    print("\nBatch settlement tests completed successfully!")
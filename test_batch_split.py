@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Test script for the vectorized batch split API of the split strategies
+"""
+
+import random
+from equal_split import EqualExpenseSplit
+from unequal_split import UnequalExpenseSplit
+from percentage_split import PercentageExpenseSplit
+from batch_split import share_columns
+
+
+def random_expenses(count, rng, split_type):
+    expenses = []
+    for _ in range(count):
+        members = rng.sample(range(1, 30), rng.randint(1, 7))
+        total = round(rng.uniform(0.01, 500), 2)
+        if split_type == "equal":
+            shares = [{"borrower_id": user} for user in members]
+        elif split_type == "unequal":
+            share_cents = [rng.randint(1, 20000) for _ in members]
+            total = sum(share_cents) / 100
+            shares = [{"borrower_id": user, "amount": cents / 100} for user, cents in zip(members, share_cents)]
+        else:
+            cuts = sorted(rng.sample(range(1, 10000), len(members) - 1))
+            bounds = [0] + cuts + [10000]
+            shares = [{"borrower_id": user, "percentage": (bounds[i + 1] - bounds[i]) / 100}
+                      for i, user in enumerate(members)]
+        expenses.append({"paid_by": rng.choice(members + [99]), "total_amount": total, "user_shares": shares})
+    return expenses
+
+
+def test_batch_matches_process_split():
+    print("Comparing process_batch with process_split...")
+    rng = random.Random(21)
+    for strategy, split_type, value_key in [(EqualExpenseSplit(), "equal", None),
+                                            (UnequalExpenseSplit(), "unequal", "amount"),
+                                            (PercentageExpenseSplit(), "percentage", "percentage")]:
+        expenses = random_expenses(500, rng, split_type)
+        expense_idx, borrower_ids, paid_by, total_cents, values = share_columns(expenses, value_key)
+        args = (expense_idx, borrower_ids, paid_by, total_cents) + ((values,) if value_key else ())
+        batch = strategy.process_batch(*args)
+
+        assert not batch.invalid.any(), split_type
+        transactions = batch.transactions()
+        for index, expense in enumerate(expenses):
+            expected = strategy.process_split(expense["paid_by"], expense["user_shares"], expense["total_amount"])
+            assert transactions[index] == expected, (split_type, index, transactions[index], expected)
+        print(f"  {split_type}: {len(expenses)} expenses match")
+
+
+def test_batch_flags_invalid_expenses():
+    print("Testing batch validation...")
+    # Expense 1 does not add up; expense 2 has no share rows to add up to its total
+    batch = UnequalExpenseSplit().process_batch([0, 0, 1, 1], [1, 2, 1, 2], [1, 2, 3], [1000, 1000, 500],
+                                                [400, 600, 300, 300])
+    assert batch.invalid.tolist() == [False, True, True]
+    assert batch.transactions() == {0: [(2, 1, 6.0)]}
+
+    batch = PercentageExpenseSplit().process_batch([0, 0, 1, 1], [1, 2, 1, 2], [1, 1], [1000, 1000],
+                                                   [33.33, 66.67, 50, 49.99])
+    assert batch.invalid.tolist() == [False, True]
+
+    batch = EqualExpenseSplit().process_batch([1, 1, 1], [1, 2, 3], [1, 1], [500, 100])
+    assert batch.invalid.tolist() == [True, False]
+    assert batch.transactions() == {1: [(2, 1, 0.33), (3, 1, 0.33)]}
+
+    try:
+        EqualExpenseSplit().process_batch([1, 0], [1, 2], [1, 1], [100, 100])
+        assert False, "unsorted expense_idx must be rejected"
+    except ValueError:
+        pass
+
+
+if __name__ == "__main__":
+    test_batch_matches_process_split()
+    test_batch_flags_invalid_expenses()
+    print("\nBatch split tests completed successfully!")
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Test script for bulk expense creation
+"""
+
+from connection_sqlite import Database
+from expense_controller import ExpenseController
+from logic import BalanceCalculator
+from test_support import temp_database
+
+
+def make_expense(name, paid_by, total_amount, shares, split_type='unequal'):
+    return {
+        "name": name,
+        "paid_by": paid_by,
+        "total_amount": total_amount,
+        "split_type": split_type,
+        "group_id": "bulk_group",
+        "user_shares": [{"borrower_id": user, "amount": amount} for user, amount in shares],
+    }
+
+
+def test_bulk_create_reports_row_errors():
+    print("Testing bulk expense creation...")
+    with temp_database('bulk.db'):
+        expenses = [
+            make_expense("Lunch", 1, 30.0, [(1, 10.0), (2, 10.0), (3, 10.0)]),
+            make_expense("Bad split", 1, 30.0, [(1, 10.0), (2, 10.0)]),          # shares don't add up
+            make_expense("Taxi", 2, 20.0, [(1, 10.0), (2, 10.0)]),
+            make_expense("Duplicate share", 3, 20.0, [(1, 10.0), (1, 10.0)]),    # violates the share primary key
+            make_expense("Hotel", 3, 90.0, [(1, 30.0), (2, 30.0), (3, 30.0)]),
+        ]
+
+        result = ExpenseController().bulk_create_expenses(iter(expenses), chunk_size=2)
+        print(f"Result: created={result['created']} errors={result['errors']}")
+
+        assert result['created'] == 3
+        assert [error['index'] for error in sorted(result['errors'], key=lambda e: e['index'])] == [1, 3]
+
+        with Database() as db:
+            db.cur.execute("SELECT name FROM expense ORDER BY name")
+            assert [row[0] for row in db.cur.fetchall()] == ["Hotel", "Lunch", "Taxi"]
+            db.cur.execute("SELECT COUNT(*) FROM expense_share")
+            assert db.cur.fetchone()[0] == 8
+
+
+def test_bulk_equal_and_percentage_shares_are_allocated():
+    print("Testing bulk equal and percentage expenses...")
+    with temp_database('bulk_split.db'):
+        expenses = [
+            {"name": "Dinner", "paid_by": 1, "total_amount": 100.0, "split_type": "equal", "group_id": "bulk_group",
+             "user_shares": [{"borrower_id": 1}, {"borrower_id": 2}, {"borrower_id": 3}]},
+            {"name": "Hotel", "paid_by": 2, "total_amount": 50.0, "split_type": "percentage", "group_id": "bulk_group",
+             "user_shares": [{"borrower_id": 1, "percentage": 33.33}, {"borrower_id": 2, "percentage": 66.67}]},
+        ]
+        result = ExpenseController().bulk_create_expenses(expenses)
+        assert result['created'] == 2 and not result['errors'], result
+
+        with Database() as db:
+            db.cur.execute("SELECT e.name, es.borrower_id, es.amount_cents FROM expense_share es "
+                           "JOIN expense e ON e.expense_id = es.expense_id ORDER BY e.name, es.borrower_id")
+            assert db.cur.fetchall() == [("Dinner", 1, 3334), ("Dinner", 2, 3333), ("Dinner", 3, 3333),
+                                         ("Hotel", 1, 1667), ("Hotel", 2, 3333)]
+        # The ledger matches the share history
+        assert BalanceCalculator().fetch_net_balances("bulk_group") == {1: 6666 - 1667, 2: -3333 + 1667, 3: -3333}
+        assert BalanceCalculator().reconcile_group_balances("bulk_group", rebuild=False) == []
+
+
+if __name__ == "__main__":
+    test_bulk_create_reports_row_errors()
+    test_bulk_equal_and_percentage_shares_are_allocated()
+    print("\nBulk expense tests completed successfully!")
\ No newline at end of file
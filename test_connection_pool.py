@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Test script for the pooled SQLite connection manager
+"""
+
+import os
+import tempfile
+import threading
+from connection_sqlite import Database, ConnectionPool, get_pool, get_profile_settings, apply_profile
+from test_support import environment, temp_database
+
+
+def test_connections_are_reused():
+    print("Testing connection reuse...")
+    with temp_database('pool_test.db') as db_path:
+        with Database() as db:
+            first_conn = db.conn
+        with Database() as db:
+            assert db.conn is first_conn, "Expected the warm connection to be reused"
+
+        stats = get_pool(db_path).stats()
+        print(f"Pool stats: {stats}")
+        assert stats["misses"] == 1
+        assert stats["hits"] == 1
+
+
+def test_pool_is_bounded_and_records_waits():
+    print("Testing bounded pool size...")
+    db_path = os.path.join(tempfile.mkdtemp(), 'bounded.db')
+    pool = ConnectionPool(db_path, max_size=1, timeout=5)
+
+    conn = pool.acquire()
+    acquired = []
+
+    def worker():
+        other = pool.acquire()
+        acquired.append(other)
+        pool.release(other)
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    thread.join(0.2)
+    assert not acquired, "Second checkout should block while the pool is exhausted"
+
+    pool.release(conn)
+    thread.join(5)
+    assert acquired == [conn]
+
+    stats = pool.stats()
+    print(f"Pool stats: {stats}")
+    assert stats["size"] == 1
+    assert stats["waits"] == 1
+    assert stats["wait_time"] > 0
+    pool.close_all()
+
+
+def test_uncommitted_work_is_rolled_back_on_release():
+    print("Testing rollback on release...")
+    db_path = os.path.join(tempfile.mkdtemp(), 'rollback.db')
+    pool = ConnectionPool(db_path, max_size=1)
+
+    conn = pool.acquire()
+    conn.execute("CREATE TABLE t (x INTEGER)")
+    conn.commit()
+    conn.execute("INSERT INTO t VALUES (1)")
+    pool.release(conn)
+
+    conn = pool.acquire()
+    assert conn.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 0
+    pool.release(conn)
+    pool.close_all()
+
+
+def test_unhealthy_connection_is_replaced():
+    print("Testing health check...")
+    db_path = os.path.join(tempfile.mkdtemp(), 'health.db')
+    pool = ConnectionPool(db_path, max_size=1, health_check_interval=0)
+
+    conn = pool.acquire()
+    pool.release(conn)
+    conn.close()  # simulate a connection that went bad while idle
+
+    fresh = pool.acquire()
+    assert fresh is not conn
+    assert fresh.execute("SELECT 1").fetchone() == (1,)
+    assert pool.stats()["discarded"] == 1
+    pool.release(fresh)
+    pool.close_all()
+
+
+def test_production_profile_enables_wal():
+    print("Testing production tuning profile...")
+    with environment(DB_PROFILE='production', DB_CACHE_SIZE='-2000'):
+        settings = get_profile_settings()
+    assert settings["cache_size"] == -2000
+
+    db_path = os.path.join(tempfile.mkdtemp(), 'profile.db')
+    pool = ConnectionPool(db_path, on_connect=lambda conn: apply_profile(conn, settings))
+    conn = pool.acquire()
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == 'wal'
+    assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+    assert conn.execute("PRAGMA cache_size").fetchone()[0] == -2000
+    pool.release(conn)
+    pool.close_all()
+
+
+def test_pool_metrics_require_login():
+    print("Testing that the pool metrics route needs a login...")
+    with temp_database('metrics.db'):
+        from flask_app import app
+        client = app.test_client()
+        response = client.get('/metrics/db_pool')
+        assert response.status_code == 302 and '/login' in response.headers['Location']
+
+        with client.session_transaction() as session:
+            session['user_id'] = 1
+        response = client.get('/metrics/db_pool')
+        assert response.status_code == 200 and isinstance(response.get_json(), dict)
+
+
+if __name__ == "__main__":
+    test_connections_are_reused()
+    test_pool_is_bounded_and_records_waits()
+    test_uncommitted_work_is_rolled_back_on_release()
+    test_unhealthy_connection_is_replaced()
+    test_production_profile_enables_wal()
+    test_pool_metrics_require_login()
+    print("\nConnection pool tests completed successfully!")
\ No newline at end of file
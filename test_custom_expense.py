@@ -8,6 +8,7 @@ from group_controller import GroupController
 from expense_controller import ExpenseController
 from logic import BalanceCalculator
 from user import User
+from money import from_cents
 import logging
 
 logging.basicConfig(level=logging.INFO)
@@ -108,9 +109,9 @@ def test_custom_expense():
             user = user_controller.get_user(user_id)
             username = user.get_user_name() if user else user_id[:8]
             if balance > 0:
-                print(f"  {username} is owed: ${balance:.2f}")
+                print(f"  {username} is owed: ${from_cents(balance):.2f}")
             elif balance < 0:
-                print(f"  {username} owes: ${abs(balance):.2f}")
+                print(f"  {username} owes: ${from_cents(abs(balance)):.2f}")
             else:
                 print(f"  {username} is settled")
         
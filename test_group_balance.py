@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Test script for the incrementally maintained group_balance ledger
+"""
+
+from connection_sqlite import Database
+from expense_controller import ExpenseController
+from logic import BalanceCalculator, settlement_cache
+from test_support import temp_database
+
+
+def create_sample_expenses():
+    controller = ExpenseController()
+    controller.create_expense("ledger_group", "Dinner", 90.0, 1, [1, 2, 3])
+    controller.create_custom_expense("ledger_group", "Taxi", 40.0, 2, {1: 25.0, 3: 15.0})
+    controller.bulk_create_expenses([{
+        "name": "Hotel", "paid_by": 3, "total_amount": 60.0, "split_type": "unequal",
+        "group_id": "ledger_group", "user_shares": [{"borrower_id": 1, "amount": 30.0},
+                                                    {"borrower_id": 3, "amount": 30.0}],
+    }])
+
+
+def test_ledger_matches_share_history():
+    print("Testing that the ledger follows every expense write...")
+    with temp_database('ledger.db'):
+        create_sample_expenses()
+        calculator = BalanceCalculator()
+
+        ledger = calculator.fetch_net_balances("ledger_group")
+        transactions = calculator.fetch_unsettled_transactions("ledger_group")
+        recomputed = {int(user): amount for user, amount in calculator.calculate_net_balances(transactions).items()}
+        print(f"Ledger: {ledger}")
+        assert ledger.keys() == recomputed.keys()
+        for user_id, amount in recomputed.items():
+            assert abs(ledger[user_id] - amount) < 0.01
+        # Both ledger readers hand members to the settlement in the same (user_id) order
+        assert list(ledger) == sorted(ledger) == list(calculator.fetch_net_balances_sql("ledger_group"))
+
+        assert calculator.reconcile_group_balances(rebuild=False) == []
+
+        aggregated = BalanceCalculator(balance_source="sql").get_net_balances("ledger_group")
+        assert aggregated.keys() == ledger.keys()
+        for user_id, amount in aggregated.items():
+            assert abs(ledger[user_id] - amount) < 0.01
+
+
+def test_reconcile_reports_and_repairs_drift():
+    print("Testing reconciliation of a corrupted ledger...")
+    with temp_database('ledger.db'):
+        create_sample_expenses()
+        calculator = BalanceCalculator()
+        expected = calculator.fetch_net_balances("ledger_group")
+
+        with Database() as db:
+            db.cur.execute("UPDATE group_balance SET net_amount = net_amount + 5 WHERE user_id = 1")
+            db.cur.execute("DELETE FROM group_balance WHERE user_id = 2")
+
+        drift = calculator.reconcile_group_balances("ledger_group")
+        print(f"Drift: {drift}")
+        assert sorted(row["user_id"] for row in drift) == [1, 2]
+
+        assert calculator.fetch_net_balances("ledger_group") == expected
+        assert calculator.reconcile_group_balances("ledger_group", rebuild=False) == []
+
+
+def test_user_balances_across_groups():
+    print("Testing a user's balance across groups...")
+    with temp_database('ledger.db'):
+        with Database() as db:
+            db.cur.executemany("INSERT INTO groups (group_id, group_name) VALUES (?, ?)",
+                               [("ledger_group", "Trip"), ("flat", "Flat")])
+        create_sample_expenses()
+        ExpenseController().create_expense("flat", "Rent", 100.0, 2, [1, 2])
+
+        calculator = BalanceCalculator()
+        ledger = calculator.fetch_net_balances("ledger_group")
+        balances = calculator.get_user_balances(1)
+        print(f"User 1: {balances}")
+        assert balances["groups"] == [
+            {"group_id": "flat", "group_name": "Flat", "net_amount": -50.0},
+            {"group_id": "ledger_group", "group_name": "Trip", "net_amount": ledger[1] / 100},
+        ]
+        assert balances["total"] == balances["owed"] - balances["owes"] == ledger[1] / 100 - 50.0
+
+        assert calculator.get_user_balances(999) == {"groups": [], "owed": 0.0, "owes": 0.0, "total": 0.0}
+
+
+def test_cross_group_settlements_net_user_pairs():
+    print("Testing settlements netted across groups...")
+    with temp_database('ledger.db'):
+        with Database() as db:
+            db.cur.executemany("INSERT INTO users (user_id, user_name) VALUES (?, ?)",
+                               [(1, "ann"), (2, "ben"), (3, "cat")])
+            db.cur.executemany("INSERT INTO groups (group_id, group_name) VALUES (?, ?)",
+                               [("trip", "Trip"), ("flat", "Flat"), ("club", "Club")])
+            db.cur.executemany("INSERT INTO group_members (group_id, user_id) VALUES (?, ?)",
+                               [("trip", 1), ("trip", 2), ("flat", 1), ("flat", 2), ("club", 2), ("club", 3)])
+        controller = ExpenseController()
+        controller.create_expense("trip", "Hotel", 100.0, 1, [1, 2])   # ben owes ann 50
+        controller.create_expense("flat", "Rent", 60.0, 2, [1, 2])     # ann owes ben 30
+        controller.create_expense("club", "Fees", 40.0, 3, [2, 3])     # ben owes cat 20, not ann's group
+
+        calculator = BalanceCalculator()
+        assert len(calculator.get_settlements("trip")) == len(calculator.get_settlements("flat")) == 1
+        settlements = calculator.get_cross_group_settlements(1)
+        print(f"Across ann's groups: {settlements}")
+        assert settlements == [{"borrower_id": 2, "borrower_name": "ben", "receiver_id": 1,
+                                "receiver_name": "ann", "amount": 20.0}]
+
+        hits = settlement_cache.hits
+        assert calculator.get_cross_group_settlements(1) == settlements
+        assert settlement_cache.hits == hits + 1
+
+        # A new expense in one of the groups invalidates the cached result
+        controller.create_expense("flat", "Internet", 40.0, 2, [1, 2])  # ann owes ben another 20
+        assert calculator.get_cross_group_settlements(1) == []
+
+
+def test_cross_group_settlements_only_pair_group_mates():
+    print("Testing that cross-group settlements agree between members...")
+    with temp_database('ledger.db'):
+        with Database() as db:
+            db.cur.executemany("INSERT INTO users (user_id, user_name) VALUES (?, ?)",
+                               [(1, "ann"), (2, "ben"), (3, "cat")])
+            db.cur.executemany("INSERT INTO groups (group_id, group_name) VALUES (?, ?)", [("g1", "G1"), ("g2", "G2")])
+            # ben and cat share no group
+            db.cur.executemany("INSERT INTO group_members (group_id, user_id) VALUES (?, ?)",
+                               [("g1", 1), ("g1", 2), ("g2", 1), ("g2", 3)])
+        controller = ExpenseController()
+        controller.create_expense("g1", "Hotel", 20.0, 1, [1, 2])   # ben owes ann 10
+        controller.create_expense("g2", "Taxi", 20.0, 3, [1, 3])    # ann owes cat 10
+
+        calculator = BalanceCalculator()
+        views = {user: {(s["borrower_id"], s["receiver_id"], s["amount"])
+                        for s in calculator.get_cross_group_settlements(user)} for user in (1, 2, 3)}
+        print(f"Views: {views}")
+        assert views[1] == {(2, 1, 10.0), (1, 3, 10.0)}
+        assert views[2] == {(2, 1, 10.0)}
+        assert views[3] == {(1, 3, 10.0)}
+        # Every transfer involves its viewer and is seen the same way by the other side
+        for user, transfers in views.items():
+            for borrower, receiver, amount in transfers:
+                assert user in (borrower, receiver)
+                assert (borrower, receiver, amount) in views[receiver if user == borrower else borrower]
+
+
+if __name__ == "__main__":
+    test_ledger_matches_share_history()
+    test_reconcile_reports_and_repairs_drift()
+    test_user_balances_across_groups()
+    test_cross_group_settlements_net_user_pairs()
+    test_cross_group_settlements_only_pair_group_mates()
+    print("\nGroup balance tests completed successfully!")
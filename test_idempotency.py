@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Test script for idempotency keys on expense creation and payments
+"""
+
+import re
+import threading
+from connection_sqlite import Database
+from expense_controller import ExpenseController
+from payment_controller import PaymentController
+from logic import BalanceCalculator
+from idempotency import purge_expired_keys
+from test_support import temp_database
+
+
+def seed_group():
+    with Database() as db:
+        db.cur.executemany("INSERT INTO users (user_id, user_name) VALUES (?, ?)",
+                           [(1, 'idem_alice'), (2, 'idem_bob'), (3, 'idem_carol')])
+        db.cur.execute("INSERT INTO groups (group_id, group_name) VALUES ('idem_group', 'Idempotency')")
+        db.cur.executemany("INSERT INTO group_members (group_id, user_id) VALUES ('idem_group', ?)", [(1,), (2,), (3,)])
+
+
+def count_expenses():
+    with Database() as db:
+        db.cur.execute("SELECT COUNT(*) FROM expense")
+        return db.cur.fetchone()[0]
+
+
+def test_retries_return_the_first_result():
+    print("Testing retried expense requests...")
+    with temp_database('idempotency.db'):
+        seed_group()
+        controller = ExpenseController()
+        first = controller.create_expense("idem_group", "Dinner", 90.0, 1, [1, 2, 3], idempotency_key="k1")
+        again = controller.create_expense("idem_group", "Dinner", 90.0, 1, [1, 2, 3], idempotency_key="k1")
+        assert first['success'] and again == first
+        custom = controller.create_custom_expense("idem_group", "Taxi", 30.0, 2, {1: 10.0, 3: 20.0},
+                                                  idempotency_key="k2")
+        assert controller.create_custom_expense("idem_group", "Taxi", 30.0, 2, {1: 10.0, 3: 20.0},
+                                                idempotency_key="k2") == custom
+        assert count_expenses() == 2
+
+        # Balances count each expense once
+        assert BalanceCalculator().fetch_net_balances("idem_group") == {1: 6000 - 1000, 3: -3000 - 2000}
+
+        # A failed request leaves no claim behind, so it can be retried with its key
+        failed = controller.create_custom_expense("idem_group", "Bad", 30.0, 2, {1: 10.0}, idempotency_key="k3")
+        assert not failed['success']
+        assert controller.create_custom_expense("idem_group", "Bad", 30.0, 2, {1: 30.0},
+                                                idempotency_key="k3")['success']
+
+        # Without a key every call writes
+        controller.create_expense("idem_group", "Lunch", 30.0, 1, [1, 2, 3])
+        controller.create_expense("idem_group", "Lunch", 30.0, 1, [1, 2, 3])
+        assert count_expenses() == 5
+
+
+def test_concurrent_retries_write_once():
+    print("Testing concurrent requests with one key...")
+    with temp_database('idempotency.db'):
+        seed_group()
+        controller = ExpenseController()
+        results = []
+
+        def submit():
+            results.append(controller.create_expense("idem_group", "Hotel", 120.0, 3, [1, 2, 3],
+                                                     idempotency_key="race"))
+
+        threads = [threading.Thread(target=submit) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert len(results) == 6 and all(result == results[0] for result in results), results
+        assert results[0]['success'] and count_expenses() == 1
+
+
+def test_expired_keys_are_purged():
+    print("Testing the idempotency key cleanup...")
+    with temp_database('idempotency.db'):
+        seed_group()
+        controller = ExpenseController()
+        controller.create_expense("idem_group", "Old", 30.0, 1, [1, 2], idempotency_key="old")
+        controller.create_expense("idem_group", "New", 30.0, 1, [1, 2], idempotency_key="new")
+        with Database() as db:
+            db.cur.execute("UPDATE idempotency_keys SET created_at = datetime('now', '-2 days') "
+                           "WHERE idempotency_key = 'old'")
+
+        assert purge_expired_keys(ttl_hours=24) == 1
+        with Database() as db:
+            db.cur.execute("SELECT idempotency_key FROM idempotency_keys")
+            assert [row[0] for row in db.cur.fetchall()] == ['new']
+        # Once purged, the key is new again
+        controller.create_expense("idem_group", "Old", 30.0, 1, [1, 2], idempotency_key="old")
+        assert count_expenses() == 3
+
+
+def test_resubmitted_form_adds_one_expense():
+    print("Testing a resubmitted add expense form...")
+    with temp_database('idempotency.db'):
+        seed_group()
+        from flask_app import app
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['user_id'] = 1
+
+        page = client.get('/add_expense/idem_group').get_data(as_text=True)
+        key = re.search(r'name="idempotency_key" value="([0-9a-f]{32})"', page).group(1)
+        form = {'description': 'Groceries', 'total_amount': '45', 'paid_by': '1', 'split_type': 'equal',
+                'idempotency_key': key}
+        for _ in range(3):
+            assert client.post('/add_expense/idem_group', data=form).status_code == 302
+        assert count_expenses() == 1
+
+        # A fresh form gets a fresh key
+        page = client.get('/add_expense/idem_group').get_data(as_text=True)
+        assert key not in page
+
+
+def test_resubmitted_payment_is_recorded_once():
+    print("Testing a resubmitted Mark as Paid form...")
+    with temp_database('idempotency.db'):
+        seed_group()
+        ExpenseController().create_expense("idem_group", "Dinner", 90.0, 1, [1, 2, 3])
+        from flask_app import app
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['user_id'] = 2
+
+        page = client.get('/settlements/idem_group').get_data(as_text=True)
+        keys = re.findall(r'name="idempotency_key" value="([0-9a-f]{32})"', page)
+        assert len(keys) == 2 and keys[0] != keys[1]
+        form = {'payer_id': '2', 'receiver_id': '1', 'amount': '30.00', 'idempotency_key': keys[0]}
+        for _ in range(3):
+            assert client.post('/record_payment/idem_group', data=form).status_code == 302
+        assert [payment['amount'] for payment in PaymentController().get_group_payments("idem_group")] == [30.0]
+        assert BalanceCalculator().fetch_net_balances("idem_group") == {1: 3000, 3: -3000}
+
+        # The same form key from another user is a different request
+        with client.session_transaction() as session:
+            session['user_id'] = 3
+        client.post('/record_payment/idem_group', data=dict(form, payer_id='3'))
+        assert len(PaymentController().get_group_payments("idem_group")) == 2
+
+        # A failed payment leaves no claim behind
+        payments = PaymentController()
+        assert not payments.record_payment("no_group", 2, 1, 5.0, idempotency_key="p1")['success']
+        assert payments.record_payment("idem_group", 2, 1, 5.0, idempotency_key="p1")['success']
+
+
+if __name__ == "__main__":
+    test_retries_return_the_first_result()
+    test_concurrent_retries_write_once()
+    test_expired_keys_are_purged()
+    test_resubmitted_form_adds_one_expense()
+    test_resubmitted_payment_is_recorded_once()
+    print("\nIdempotency tests completed successfully!")
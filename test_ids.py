@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Test script for the time-ordered ids
+"""
+
+import threading
+import time
+import uuid
+from ids import new_id, id_timestamp_ms
+
+
+def test_ids_are_uuid7_hex():
+    print("Testing the id format...")
+    before = time.time_ns() // 1_000_000
+    value = new_id()
+    after = time.time_ns() // 1_000_000
+    assert len(value) == 32 and value == value.lower()
+    parsed = uuid.UUID(value)
+    assert parsed.version == 7 and parsed.variant == uuid.RFC_4122
+    assert before <= id_timestamp_ms(value) <= after + 1
+
+    assert id_timestamp_ms(new_id(1700000000000)) == 1700000000000
+
+
+def test_ids_increase_across_threads():
+    print("Testing that ids from one process are strictly increasing...")
+    batches = [[] for _ in range(4)]
+
+    def generate(batch):
+        for _ in range(20000):
+            batch.append(new_id())
+
+    threads = [threading.Thread(target=generate, args=(batch,)) for batch in batches]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    for batch in batches:
+        assert batch == sorted(batch)
+    all_ids = [value for batch in batches for value in batch]
+    assert len(set(all_ids)) == len(all_ids)
+
+    # Far more ids than fit in one millisecond's counter still come out in order
+    burst = [new_id() for _ in range(50000)]
+    assert burst == sorted(burst) and len(set(burst)) == len(burst)
+
+
+if __name__ == "__main__":
+    test_ids_are_uuid7_hex()
+    test_ids_increase_across_threads()
+    print("\nId tests completed successfully!")
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Test script for the streaming CSV/JSONL expense import
+"""
+
+import csv
+import json
+import os
+import tempfile
+from connection_sqlite import Database
+from database import DatabaseError
+from logic import BalanceCalculator
+import import_expenses
+from import_expenses import import_expenses as run_import
+from test_support import temp_database
+
+
+def seed_users():
+    with Database() as db:
+        db.cur.executemany("INSERT INTO users (user_id, user_name) VALUES (?, ?)",
+                           [(1, 'imp_alice'), (2, 'imp_bob'), (3, 'imp_carol')])
+        db.cur.execute("INSERT INTO groups (group_id, group_name) VALUES ('imp_group', 'Import')")
+
+
+def count_expenses():
+    with Database() as db:
+        db.cur.execute("SELECT COUNT(*) FROM expense")
+        return db.cur.fetchone()[0]
+
+
+def test_csv_import_validates_and_resumes():
+    print("Testing CSV import with validation errors and resume...")
+    with temp_database('import.db'):
+        seed_users()
+        path = os.path.join(tempfile.mkdtemp(), 'expenses.csv')
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(["group_id", "name", "paid_by", "total_amount", "split_type", "shares"])
+            writer.writerow(["imp_group", "Dinner", "imp_alice", "90", "equal", "imp_alice;imp_bob;imp_carol"])
+            writer.writerow(["imp_group", "Taxi", "imp_bob", "40", "unequal", "imp_alice:25;imp_carol:15"])
+            writer.writerow(["imp_group", "Bad sum", "imp_bob", "40", "unequal", "imp_alice:25;imp_carol:10"])
+            writer.writerow(["imp_group", "Hotel", "imp_carol", "100.01", "percentage", "imp_alice:50;imp_carol:50"])
+            writer.writerow(["imp_group", "Ghost", "imp_nobody", "10", "equal", "imp_alice"])
+            writer.writerow(["imp_group", "Lunch", "imp_alice", "30", "equal", "imp_alice;imp_bob"])
+
+        stats = run_import(path, chunk_size=2)
+        assert stats["imported"] == 4 and stats["failed"] == 2 and stats["records"] == 6
+        assert [error["record"] for error in stats["errors"]] == [3, 5]
+        assert "Unknown user 'imp_nobody'" in stats["errors"][1]["message"]
+
+        # Balances follow the imported shares; the odd cent of the percentage split goes to the first borrower
+        assert BalanceCalculator().fetch_net_balances("imp_group") == {1: 6000 - 2500 - 5001 + 1500,
+                                                                       2: -3000 + 4000 - 1500,
+                                                                       3: -3000 - 1500 + 5001}
+
+        # Everything is committed: a rerun imports nothing more
+        again = run_import(path, chunk_size=2)
+        assert again["resumed_from"] == 6 and again["imported"] == 0
+        assert count_expenses() == 4
+
+
+def test_jsonl_import_resumes_after_interruption():
+    print("Testing JSONL import interrupted mid-way...")
+    with temp_database('import.db'):
+        seed_users()
+        path = os.path.join(tempfile.mkdtemp(), 'expenses.jsonl')
+        with open(path, 'w') as f:
+            for i in range(10):
+                f.write(json.dumps({"name": f"Expense {i}", "paid_by": "imp_alice", "total_amount": 20,
+                                    "split_type": "unequal", "shares": {"imp_bob": 10, "imp_dave": 10}}) + "\n")
+            f.write("\n{not json}\n")
+
+        # Fail while saving the third chunk, after two chunks are committed
+        original_save_many = import_expenses.Expense.save_many
+        calls = []
+
+        def failing_save_many(db, expenses):
+            calls.append(len(expenses))
+            if len(calls) == 3:
+                raise RuntimeError("interrupted")
+            return original_save_many(db, expenses)
+
+        import_expenses.Expense.save_many = failing_save_many
+        try:
+            run_import(path, group_id="imp_group", chunk_size=3, create_users=True)
+            assert False, "the import should have been interrupted"
+        except RuntimeError:
+            pass
+        finally:
+            import_expenses.Expense.save_many = original_save_many
+        assert count_expenses() == 6
+
+        stats = run_import(path, group_id="imp_group", chunk_size=3, create_users=True)
+        assert stats["resumed_from"] == 6 and stats["imported"] == 4
+        assert stats["failed"] == 1 and stats["errors"][0]["record"] == 11
+        assert count_expenses() == 10
+
+        with Database() as db:
+            db.cur.execute("SELECT user_id FROM users WHERE user_name = 'imp_dave'")
+            dave = db.cur.fetchone()[0]
+        assert BalanceCalculator().fetch_net_balances("imp_group") == {1: 20000, 2: -10000, dave: -10000}
+
+        assert run_import(path, group_id="imp_group", restart=True, create_users=True)["imported"] == 10
+        assert count_expenses() == 20
+
+
+def test_created_users_are_forgotten_on_rollback():
+    print("Testing user creation in a chunk that rolls back...")
+    with temp_database('import.db'):
+        seed_users()
+        path = os.path.join(tempfile.mkdtemp(), 'new_users.jsonl')
+        with open(path, 'w') as f:
+            for borrower in ('imp_erin', 'imp_dave'):
+                f.write(json.dumps({"name": f"Paid for {borrower}", "paid_by": "imp_alice", "total_amount": 10,
+                                    "split_type": "unequal", "shares": {borrower: 10}}) + "\n")
+
+        # The chunk fails after creating both users, then so does the retry of its first record
+        original_save_many = import_expenses.Expense.save_many
+        calls = []
+
+        def failing_save_many(db, expenses):
+            calls.append(len(expenses))
+            if len(calls) <= 2:
+                raise DatabaseError("disk I/O error")
+            return original_save_many(db, expenses)
+
+        import_expenses.Expense.save_many = failing_save_many
+        try:
+            stats = run_import(path, group_id="imp_group", chunk_size=2, create_users=True)
+        finally:
+            import_expenses.Expense.save_many = original_save_many
+        assert calls == [2, 1, 1]
+        assert stats["imported"] == 1 and stats["failed"] == 1 and stats["errors"][0]["record"] == 1
+
+        with Database() as db:
+            db.cur.execute("SELECT user_name FROM users WHERE user_name IN ('imp_dave', 'imp_erin')")
+            assert [row[0] for row in db.cur.fetchall()] == ['imp_dave']
+            db.cur.execute("SELECT COUNT(*) FROM expense_share es LEFT JOIN users u ON u.user_id = es.borrower_id "
+                           "WHERE u.user_id IS NULL")
+            assert db.cur.fetchone()[0] == 0
+
+
+if __name__ == "__main__":
+    test_csv_import_validates_and_resumes()
+    test_jsonl_import_resumes_after_interruption()
+    test_created_users_are_forgotten_on_rollback()
+    print("\nImport tests completed successfully!")
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Test script for the streaming ledger export
+"""
+
+import csv
+import gzip
+import io
+import json
+from connection_sqlite import Database, get_pool_stats
+from expense_controller import ExpenseController
+from payment_controller import PaymentController
+from archive_history import archive_history
+from ledger_export import EXPORT_COLUMNS, export_group
+from test_support import temp_database
+
+
+def seed_ledger():
+    with Database() as db:
+        db.cur.executemany("INSERT INTO users (user_id, user_name) VALUES (?, ?)",
+                           [(1, 'exp_alice'), (2, 'exp_bob'), (3, 'exp_carol')])
+        db.cur.execute("INSERT INTO groups (group_id, group_name) VALUES ('exp_group', 'Export')")
+        db.cur.executemany("INSERT INTO group_members (group_id, user_id) VALUES ('exp_group', ?)", [(1,), (2,), (3,)])
+    expenses = ExpenseController()
+    expenses.create_expense("exp_group", "Dinner", 90.0, 1, [1, 2, 3])
+    expenses.create_custom_expense("exp_group", "Hotel", 100.0, 2, {1: 60.0, 3: 40.0})
+    PaymentController().record_payment("exp_group", 3, 1, 12.5)
+    with Database() as db:
+        db.cur.executemany("UPDATE expense SET created_at = ? WHERE name = ?", [('2020-01-01 10:00:00', 'Dinner'),
+                                                                                ('2021-01-01 10:00:00', 'Hotel')])
+
+
+def test_export_formats():
+    print("Testing CSV, JSONL and gzip exports...")
+    with temp_database('export.db', DB_ARCHIVE_PATH=None):
+        seed_ledger()
+        # A small fetch size makes every query span several batches
+        rows = list(csv.reader(io.StringIO(b"".join(export_group("exp_group", fetch_size=2)).decode())))
+        assert rows[0] == EXPORT_COLUMNS
+        assert [(row[0], row[3], row[4], row[5], row[6]) for row in rows[1:]] == [
+            ('expense', 'Dinner', 'exp_alice', 'exp_alice', '30.0'),
+            ('expense', 'Dinner', 'exp_alice', 'exp_bob', '30.0'),
+            ('expense', 'Dinner', 'exp_alice', 'exp_carol', '30.0'),
+            ('expense', 'Hotel', 'exp_bob', 'exp_alice', '60.0'),
+            ('expense', 'Hotel', 'exp_bob', 'exp_carol', '40.0'),
+            ('payment', 'Payment', 'exp_carol', 'exp_alice', '12.5'),
+        ]
+
+        records = [json.loads(line) for line in b"".join(export_group("exp_group", "jsonl")).splitlines()]
+        assert len(records) == 6 and set(records[0]) == set(EXPORT_COLUMNS)
+        assert records[3]["amount"] == 60.0 and records[3]["total_amount"] == 100.0
+        assert records[5]["type"] == "payment" and records[5]["split_type"] is None
+
+        compressed = b"".join(export_group("exp_group", "csv", compress=True))
+        assert gzip.decompress(compressed) == b"".join(export_group("exp_group", "csv"))
+
+        # An empty group still gets its header
+        assert b"".join(export_group("no_such_group")).decode().strip() == ",".join(EXPORT_COLUMNS)
+        try:
+            export_group("exp_group", "xml")
+            assert False, "unknown formats must be rejected"
+        except ValueError:
+            pass
+
+
+def test_export_includes_archive():
+    print("Testing export of archived history...")
+    with temp_database('export.db', DB_ARCHIVE_PATH=None):
+        seed_ledger()
+        archive_history(["exp_group"], before="2020-06-01")
+        names = [record["name"] for record in
+                 map(json.loads, b"".join(export_group("exp_group", "jsonl")).splitlines())]
+        assert names == ['Hotel', 'Hotel', 'Payment']
+
+        names = [record["name"] for record in
+                 map(json.loads, b"".join(export_group("exp_group", "jsonl", include_archive=True)).splitlines())]
+        assert names == ['Dinner', 'Dinner', 'Dinner', 'Hotel', 'Hotel', 'Payment']
+
+
+def test_export_does_not_hold_a_pool_slot():
+    print("Testing that a running export leaves the pool alone...")
+    with temp_database('export.db', DB_ARCHIVE_PATH=None, DB_POOL_SIZE='1', DB_POOL_TIMEOUT='0.5') as db_path:
+        seed_ledger()
+        # Paused mid-download, like a slow client
+        downloads = [export_group("exp_group", fetch_size=1) for _ in range(3)]
+        for chunks in downloads:
+            next(chunks)
+        with Database() as db:
+            db.cur.execute("SELECT COUNT(*) FROM expense")
+            assert db.cur.fetchone()[0] == 2
+        assert get_pool_stats()[db_path]['size'] == 1
+        for chunks in downloads:
+            chunks.close()
+
+
+def test_export_route():
+    print("Testing the /export route...")
+    with temp_database('export.db', DB_ARCHIVE_PATH=None):
+        seed_ledger()
+        from flask_app import app
+        client = app.test_client()
+        assert client.get('/export/exp_group').status_code == 302
+
+        with client.session_transaction() as session:
+            session['user_id'] = 1
+        response = client.get('/export/exp_group?format=jsonl')
+        assert response.is_streamed and response.mimetype == 'application/x-ndjson'
+        assert 'exp_group.jsonl' in response.headers['Content-Disposition']
+        assert len(response.get_data().splitlines()) == 6
+
+        response = client.get('/export/exp_group?format=csv&gzip=1')
+        assert response.mimetype == 'application/gzip'
+        assert len(gzip.decompress(response.get_data()).decode().splitlines()) == 7
+
+        assert client.get('/export/exp_group?format=xml').status_code == 302
+
+
+if __name__ == "__main__":
+    test_export_formats()
+    test_export_includes_archive()
+    test_export_does_not_hold_a_pool_slot()
+    test_export_route()
+    print("\nLedger export tests completed successfully!")
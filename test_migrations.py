@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Test script for the versioned schema migrations
+"""
+
+import os
+import sqlite3
+import tempfile
+import uuid
+from migrations import migrate, migrate_database, get_schema_version, latest_version
+from ids import id_timestamp_ms
+from connection_sqlite import Database
+from logic import BalanceCalculator
+from test_support import environment, temp_database
+
+
+def test_fresh_database_reaches_latest_version():
+    print("Testing migration of a fresh database...")
+    db_path = os.path.join(tempfile.mkdtemp(), 'fresh.db')
+    assert migrate_database(db_path) == latest_version()
+
+    conn = sqlite3.connect(db_path)
+    tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+    conn.close()
+    for table in ['users', 'groups', 'group_members', 'expense', 'expense_share', 'balance_sheet']:
+        assert table in tables, f"Missing table {table}"
+
+
+def test_legacy_users_table_is_upgraded():
+    print("Testing upgrade of a pre-registration database...")
+    conn = sqlite3.connect(os.path.join(tempfile.mkdtemp(), 'legacy.db'))
+    conn.execute("CREATE TABLE users (user_id INTEGER PRIMARY KEY AUTOINCREMENT, user_name TEXT NOT NULL UNIQUE)")
+    conn.commit()
+
+    migrate(conn)
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(users)")]
+    assert 'email' in columns and 'password_hash' in columns
+    assert get_schema_version(conn) == latest_version()
+    conn.close()
+
+
+def test_migrated_database_runs_no_statements():
+    print("Testing that an up-to-date database is left alone...")
+    db_path = os.path.join(tempfile.mkdtemp(), 'current.db')
+    migrate_database(db_path)
+
+    conn = sqlite3.connect(db_path)
+    statements = []
+    conn.set_trace_callback(statements.append)
+    migrate(conn)
+    conn.close()
+    assert statements == ["PRAGMA user_version"], statements
+
+
+def test_amounts_are_backfilled_in_chunks_and_kept_in_sync():
+    print("Testing the online cents backfill...")
+    db_path = os.path.join(tempfile.mkdtemp(), 'cents.db')
+    migrate_database(db_path, target=5)
+
+    conn = sqlite3.connect(db_path)
+    conn.executemany("INSERT INTO expense_share (expense_id, borrower_id, paid_by_id, amount) VALUES (?, ?, ?, ?)",
+                     [(f'e{i}', 1, 2, i / 100 + 0.1) for i in range(25)])
+    conn.execute("INSERT INTO group_balance (group_id, user_id, net_amount) VALUES ('g', 1, 19.99)")
+    conn.commit()
+
+    with environment(MIGRATION_CHUNK_SIZE='10'):  # several chunks for 25 rows
+        migrate(conn)
+    assert get_schema_version(conn) == latest_version()
+    cents = [row[0] for row in conn.execute("SELECT amount_cents FROM expense_share ORDER BY rowid")]
+    assert cents == [i + 10 for i in range(25)], cents
+
+    # Writes from code that only knows the REAL columns still get cents
+    conn.execute("INSERT INTO expense_share (expense_id, borrower_id, paid_by_id, amount) VALUES ('old', 1, 2, 0.29)")
+    conn.execute("UPDATE group_balance SET net_amount = net_amount + 0.01 WHERE group_id = 'g'")
+    conn.commit()
+    assert conn.execute("SELECT amount_cents FROM expense_share WHERE expense_id = 'old'").fetchone()[0] == 29
+    assert conn.execute("SELECT net_cents FROM group_balance WHERE group_id = 'g'").fetchone()[0] == 2000
+    conn.close()
+
+
+def test_net_cents_sum_to_zero_after_upgrade():
+    print("Testing the cents ledger of an upgraded baseline database...")
+    with temp_database('baseline.db') as db_path:
+        migrate_database(db_path, target=3)
+
+        # Baseline shares kept the unrounded float of an equal split
+        conn = sqlite3.connect(db_path)
+        conn.executemany("INSERT INTO expense (expense_id, name, paid_by, total_amount, split_type, group_id) "
+                         "VALUES (?, 'Dinner', 1, 115.0, 'equal', ?)", [('e1', 'g1'), ('e2', 'g2')])
+        conn.executemany("INSERT INTO expense_share (expense_id, borrower_id, paid_by_id, amount) VALUES (?, ?, 1, ?)",
+                         [(expense_id, borrower, 115.0 / 3) for expense_id in ('e1', 'e2') for borrower in (1, 2, 3)])
+        conn.executemany("INSERT INTO expense_share (expense_id, borrower_id, paid_by_id, amount) "
+                         "VALUES ('e3', ?, 2, ?)", [(1, 20.0 / 3), (2, 20.0 / 3), (3, 20.0 / 3)])
+        conn.execute("INSERT INTO expense (expense_id, name, paid_by, total_amount, split_type, group_id) "
+                     "VALUES ('e3', 'Taxi', 2, 20.0, 'equal', 'g1')")
+        conn.commit()
+        conn.close()
+
+        assert migrate_database(db_path) == latest_version()
+        with Database() as db:
+            db.cur.execute("SELECT group_id, SUM(net_cents) FROM group_balance GROUP BY group_id")
+            assert dict(db.cur.fetchall()) == {'g1': 0, 'g2': 0}
+            db.cur.execute("SELECT user_id, net_cents FROM group_balance WHERE group_id = 'g2' ORDER BY user_id")
+            assert db.cur.fetchall() == [(1, 7666), (2, -3833), (3, -3833)]
+        assert BalanceCalculator().reconcile_group_balances(rebuild=False) == []
+
+
+def test_expense_ids_are_rekeyed_time_ordered():
+    print("Testing the time-ordered rekey of expense ids...")
+    db_path = os.path.join(tempfile.mkdtemp(), 'rekey.db')
+    migrate_database(db_path, target=10)
+
+    conn = sqlite3.connect(db_path)
+    old_ids = [uuid.uuid4().hex for _ in range(25)]
+    conn.executemany("INSERT INTO expense (expense_id, name, paid_by, total_amount, split_type, group_id, created_at) "
+                     "VALUES (?, ?, 1, 10.0, 'equal', 'g', ?)",
+                     [(expense_id, f'expense {i}', f'2024-01-{i + 1:02d} 12:00:00') for i, expense_id in enumerate(old_ids)])
+    conn.executemany("INSERT INTO expense_share (expense_id, borrower_id, paid_by_id, amount) VALUES (?, ?, 1, 5.0)",
+                     [(expense_id, borrower) for expense_id in old_ids for borrower in (1, 2)])
+    conn.commit()
+
+    with environment(MIGRATION_CHUNK_SIZE='10'):
+        migrate(conn)
+    assert get_schema_version(conn) == latest_version()
+
+    rows = conn.execute("SELECT expense_id, name, CAST(strftime('%s', created_at) AS INTEGER) FROM expense "
+                        "ORDER BY rowid").fetchall()
+    new_ids = [row[0] for row in rows]
+    assert not set(new_ids) & set(old_ids)
+    assert all(uuid.UUID(expense_id).version == 7 for expense_id in new_ids)
+    assert all(id_timestamp_ms(expense_id) == seconds * 1000 for expense_id, _, seconds in rows)
+    # Created one day apart, so key order is creation order
+    assert sorted(new_ids) == new_ids
+
+    # Every share follows its expense
+    orphans = conn.execute("SELECT COUNT(*) FROM expense_share es LEFT JOIN expense e "
+                           "ON e.expense_id = es.expense_id WHERE e.expense_id IS NULL").fetchone()[0]
+    assert orphans == 0
+    assert conn.execute("SELECT COUNT(*) FROM expense_share").fetchone()[0] == 50
+    conn.close()
+
+
+if __name__ == "__main__":
+    test_fresh_database_reaches_latest_version()
+    test_legacy_users_table_is_upgraded()
+    test_migrated_database_runs_no_statements()
+    test_amounts_are_backfilled_in_chunks_and_kept_in_sync()
+    test_net_cents_sum_to_zero_after_upgrade()
+    test_expense_ids_are_rekeyed_time_ordered()
+    print("\nMigration tests completed successfully!")
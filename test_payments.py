@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Test script for settle-up payments and balance checkpoints
+"""
+
+from connection_sqlite import Database
+from expense_controller import ExpenseController
+from payment_controller import PaymentController
+from batch_settlement import BatchSettlement
+from logic import BalanceCalculator
+from test_support import temp_database
+
+
+def seed_group():
+    with Database() as db:
+        db.cur.executemany("INSERT INTO users (user_id, user_name) VALUES (?, ?)",
+                           [(1, 'pay_alice'), (2, 'pay_bob'), (3, 'pay_carol')])
+        db.cur.execute("INSERT INTO groups (group_id, group_name) VALUES ('pay_group', 'Payments')")
+        db.cur.executemany("INSERT INTO group_members (group_id, user_id) VALUES ('pay_group', ?)", [(1,), (2,), (3,)])
+
+
+def assert_sources_agree(calculator, group_id):
+    ledger = calculator.fetch_net_balances(group_id)
+    for source in ("sql", "python"):
+        balances = BalanceCalculator(balance_source=source).get_net_balances(group_id)
+        assert {int(user): cents for user, cents in balances.items() if cents} == ledger, (source, balances, ledger)
+    assert calculator.reconcile_group_balances(group_id, rebuild=False) == []
+    return ledger
+
+
+def test_checkpoint_bounds_history():
+    print("Testing payments and balance checkpoints...")
+    with temp_database('payments.db'):
+        seed_group()
+        expenses = ExpenseController()
+        payments = PaymentController()
+        calculator = BalanceCalculator()
+
+        expenses.create_expense("pay_group", "Dinner", 90.0, 1, [1, 2, 3])
+        assert assert_sources_agree(calculator, "pay_group") == {1: 6000, 2: -3000, 3: -3000}
+
+        assert not payments.record_payment("pay_group", 2, 2, 10)['success']
+        assert not payments.record_payment("pay_group", 2, 1, -5)['success']
+        assert not payments.record_payment("missing_group", 2, 1, 5)['success']
+
+        # A partial payment changes balances but leaves the group unsettled
+        result = payments.record_payment("pay_group", 2, 1, 30)
+        assert result['success'] and not result['checkpoint']
+        assert assert_sources_agree(calculator, "pay_group") == {1: 3000, 3: -3000}
+        settlements = calculator.get_settlements("pay_group")
+        assert [(s['borrower_id'], s['receiver_id'], s['amount']) for s in settlements] == [(3, 1, 30.0)]
+
+        # Settling the last debt writes a checkpoint; the history before it is no longer read
+        result = payments.record_payment("pay_group", 3, 1, "30.00")
+        assert result['success'] and result['checkpoint']
+        assert calculator.fetch_unsettled_transactions("pay_group") == []
+        assert assert_sources_agree(calculator, "pay_group") == {}
+        assert calculator.get_settlements("pay_group") == []
+        assert [p['amount'] for p in payments.get_group_payments("pay_group")] == [30.0, 30.0]
+
+        expenses.create_custom_expense("pay_group", "Taxi", 40.0, 2, {1: 25.0, 3: 15.0})
+        assert calculator.fetch_unsettled_transactions("pay_group") == [[2, 1, 2500], [2, 3, 1500]]
+        assert assert_sources_agree(calculator, "pay_group") == {1: -2500, 2: 4000, 3: -1500}
+
+        results, _ = BatchSettlement().settle(["pay_group"])
+        assert results["pay_group"] == calculator.settle_transactions(calculator.fetch_net_balances("pay_group"),
+                                                                      "pay_group")
+
+        with Database() as db:
+            db.cur.execute("SELECT g.checkpoint_version, c.ledger_version FROM groups g "
+                           "JOIN group_checkpoints c ON c.group_id = g.group_id WHERE g.group_id = 'pay_group'")
+            assert db.cur.fetchall() == [(3, 3)]
+
+
+def test_non_member_payments_are_rejected():
+    print("Testing payments involving non-members...")
+    with temp_database('payments_members.db'):
+        seed_group()
+        with Database() as db:
+            db.cur.execute("INSERT INTO users (user_id, user_name) VALUES (4, 'pay_mallory')")
+        ExpenseController().create_expense("pay_group", "Dinner", 90.0, 1, [1, 2, 3])
+        payments = PaymentController()
+
+        assert not payments.record_payment("pay_group", 4, 1, 10)['success']
+        assert not payments.record_payment("pay_group", 2, 4, 10)['success']
+        assert not payments.record_payment("pay_group", 2, 1, 10, recorded_by=4)['success']
+        with Database() as db:
+            db.cur.execute("SELECT COUNT(*) FROM payments")
+            assert db.cur.fetchone()[0] == 0
+            db.cur.execute("SELECT ledger_version FROM groups WHERE group_id = 'pay_group'")
+            assert db.cur.fetchone()[0] == 1  # rejected payments do not bump the ledger
+        assert BalanceCalculator().fetch_net_balances("pay_group") == {1: 6000, 2: -3000, 3: -3000}
+
+        # The same forged post through the route
+        from flask_app import app
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['user_id'] = 4
+        client.post('/record_payment/pay_group', data={'payer_id': '2', 'receiver_id': '1', 'amount': '30'})
+        with Database() as db:
+            db.cur.execute("SELECT COUNT(*) FROM payments")
+            assert db.cur.fetchone()[0] == 0
+
+        assert payments.record_payment("pay_group", 2, 1, 30, recorded_by=3)['success']
+
+
+if __name__ == "__main__":
+    test_checkpoint_bounds_history()
+    test_non_member_payments_are_rejected()
+    print("\nPayment tests completed successfully!")
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Query-plan regression test: runs every controller code path against a fresh
+database, captures the SQL it executes and fails if EXPLAIN QUERY PLAN shows
+a full table SCAN for any of it.
+"""
+
+import sqlite3
+from connection_sqlite import get_pool
+from user_controller import UserController
+from group_controller import GroupController
+from expense_controller import ExpenseController
+from payment_controller import PaymentController
+from logic import BalanceCalculator
+from ledger_export import export_group
+from user import User
+from test_support import temp_database
+
+# Statements that are meant to read a whole table
+ALLOWED_FULL_SCANS = [
+    "SELECT user_id, user_name FROM users",  # UserController.get_all_users
+]
+
+
+def capture_controller_queries():
+    """Exercise the controllers on one pooled connection and return the traced SQL"""
+    statements = []
+    pool = get_pool()
+    conn = pool.acquire()
+    conn.set_trace_callback(statements.append)
+    pool.release(conn)
+
+    # Exports read through dedicated connections outside the pool; trace those too
+    connect_dedicated = pool.connect_dedicated
+
+    def traced_connect_dedicated():
+        dedicated = connect_dedicated()
+        dedicated.set_trace_callback(statements.append)
+        return dedicated
+    pool.connect_dedicated = traced_connect_dedicated
+
+    users = UserController()
+    groups = GroupController()
+    expenses = ExpenseController()
+    payments = PaymentController()
+    calculator = BalanceCalculator()
+
+    alice = users.register("plan_alice", "alice@example.com", "secret")['user_id']
+    bob = users.register("plan_bob", "bob@example.com", "secret")['user_id']
+    users.register("plan_carol", "carol@example.com", "secret")
+    users.add_user(User(9001, "plan_dave"))
+    users.login("plan_alice", "secret")
+    users.get_user(str(alice))
+    users.get_all_users()
+
+    group_id = groups.create_group("Plan Group", alice)['group_id']
+    groups.add_user_to_group(group_id, bob)
+    groups.add_member_by_username(group_id, "plan_carol")
+    groups.add_user_to_group(group_id, 9001)
+    groups.get_user_groups(alice)
+    groups.get_group_info(group_id)
+    groups.get_group_members(group_id)
+
+    expenses.create_expense(group_id, "Dinner", 90.0, alice, [alice, bob])
+    expenses.create_custom_expense(group_id, "Taxi", 30.0, bob, {alice: 10.0, bob: 20.0})
+    expenses.create_expense(group_id, "Snacks", 12.0, alice, [alice, bob], idempotency_key="plan-key")
+    expenses.create_expense(group_id, "Snacks", 12.0, alice, [alice, bob], idempotency_key="plan-key")
+    expenses.get_group_expenses(group_id)
+    expenses.get_group_expenses(group_id, include_archive=True, limit=10)
+
+    calculator.process_group_settlements(group_id)
+    BalanceCalculator(balance_source="sql").process_group_settlements(group_id)
+    BalanceCalculator(balance_source="python").process_group_settlements(group_id)
+    calculator.get_group_settlements(group_id)
+    calculator.get_settlements(group_id)
+    calculator.get_user_balances(alice)
+    calculator.get_cross_group_settlements(alice)
+
+    payments.record_payment(group_id, bob, alice, 25.0)
+    payments.record_payment(group_id, bob, alice, 10.0)  # settles the group and writes a checkpoint
+    payments.get_group_payments(group_id)
+    b"".join(export_group(group_id, include_archive=True))
+    calculator.process_group_settlements(group_id)
+    BalanceCalculator(balance_source="sql").process_group_settlements(group_id)
+
+    groups.remove_user_from_group(group_id, 9001)
+    groups.delete_group(group_id)
+
+    conn.set_trace_callback(None)
+    pool.connect_dedicated = connect_dedicated
+    return statements
+
+
+def find_full_scans(db_path, statements):
+    conn = sqlite3.connect(db_path)
+    violations = {}
+    try:
+        for sql in dict.fromkeys(statements):
+            normalized = " ".join(sql.split())
+            if not normalized.upper().startswith(("SELECT", "UPDATE", "DELETE", "WITH")):
+                continue
+            if any(normalized.startswith(allowed) for allowed in ALLOWED_FULL_SCANS):
+                continue
+            plan = [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}")]
+            # Scanning a CTE or subquery result reads rows already found through indexes
+            derived = {step.split()[1] for step in plan if step.startswith(("CO-ROUTINE", "MATERIALIZE"))}
+            scans = [step for step in plan if step.startswith("SCAN") and step.split()[1] not in derived]
+            if scans:
+                violations[normalized] = scans
+    finally:
+        conn.close()
+    return violations
+
+
+def test_controller_queries_use_indexes():
+    print("Checking query plans of controller queries...")
+    # A pool of one: every controller call shares the traced connection
+    with temp_database('plans.db', DB_POOL_SIZE='1') as db_path:
+        statements = capture_controller_queries()
+        assert statements, "No SQL was captured"
+        exports = [sql for sql in statements
+                   if " ".join(sql.split()).startswith(("SELECT 'expense'", "SELECT 'payment'"))]
+        assert len(exports) == 4, "The export queries on the dedicated connection were not captured"
+
+        violations = find_full_scans(db_path, statements)
+        for sql, scans in violations.items():
+            print(f"FULL SCAN {scans}: {sql}")
+        assert not violations, f"{len(violations)} queries fall back to a full table scan"
+        print(f"Checked {len(set(statements))} distinct statements")
+
+
+if __name__ == "__main__":
+    test_controller_queries_use_indexes()
+    print("\nQuery plan tests completed successfully!")
\ No newline at end of file
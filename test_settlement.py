@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Test script for the settlement engine in logic.py
+"""
+
+import random
+import logic
+from logic import BalanceCalculator
+from money import to_cents, allocate
+from equal_split import EqualExpenseSplit
+from percentage_split import PercentageExpenseSplit
+from settlement_solver import optimal_settlements
+
+
+class SortedListMaxHeap:
+    """The original list-based MaxHeap, kept as the reference implementation"""
+    def __init__(self):
+        self.data = []
+
+    def push(self, item):
+        self.data.append(item)
+        self.data.sort(key=lambda x: x[0], reverse=True)
+
+    def pop(self):
+        return self.data.pop(0) if self.data else None
+
+    def is_empty(self):
+        return len(self.data) == 0
+
+
+def random_transactions(rng, num_members, num_expenses):
+    transactions = []
+    for _ in range(num_expenses):
+        payer = rng.randint(1, num_members)
+        borrower = rng.randint(1, num_members)
+        if payer != borrower:
+            # Round amounts produce plenty of ties between balances
+            transactions.append([payer, borrower, rng.choice([500, 1000, 2000, 2500, 5000])])
+    return transactions
+
+
+def test_heap_settlements_match_reference():
+    print("Comparing heapq MaxHeap against the sorted-list reference...")
+    calculator = BalanceCalculator()
+    rng = random.Random(42)
+
+    for trial in range(200):
+        transactions = random_transactions(rng, rng.randint(2, 40), rng.randint(1, 200))
+        net_balances = calculator.calculate_net_balances(transactions)
+
+        expected_heap, logic.MaxHeap = logic.MaxHeap, SortedListMaxHeap
+        try:
+            expected = calculator.settle_transactions(net_balances, "group")
+        finally:
+            logic.MaxHeap = expected_heap
+
+        actual = calculator.settle_transactions(net_balances, "group")
+        assert actual == expected, f"Trial {trial}: {actual} != {expected}"
+
+
+def test_settlements_clear_all_balances():
+    print("Checking that settlements clear every balance...")
+    calculator = BalanceCalculator()
+    rng = random.Random(7)
+    transactions = random_transactions(rng, 30, 300)
+    net_balances = calculator.calculate_net_balances(transactions)
+
+    remaining = dict(net_balances)
+    for _, debtor, creditor, amount in calculator.settle_transactions(net_balances, "group"):
+        remaining[debtor] += to_cents(amount)
+        remaining[creditor] -= to_cents(amount)
+    assert all(cents == 0 for cents in remaining.values()), remaining
+
+
+def test_splits_add_up_to_the_total():
+    print("Checking that equal and percentage splits add up exactly...")
+    assert allocate(10000, [1, 1, 1]) == [3334, 3333, 3333]
+    assert allocate(1, [1, 1]) == [1, 0]
+
+    users = [{"borrower_id": user} for user in range(1, 4)]
+    equal = EqualExpenseSplit().process_split(0, users, 100.0)
+    assert [amount for _, _, amount in equal] == [33.34, 33.33, 33.33]
+
+    percentages = [{"borrower_id": 1, "percentage": 33.33}, {"borrower_id": 2, "percentage": 33.33},
+                   {"borrower_id": 3, "percentage": 33.34}]
+    split = PercentageExpenseSplit().process_split(0, percentages, 10.01)
+    assert sum(to_cents(amount) for _, _, amount in split) == 1001
+
+
+def test_optimal_solver_uses_fewest_transfers():
+    print("Checking the minimum-transfer solver...")
+    calculator = BalanceCalculator()
+    optimal = BalanceCalculator(solver="optimal")
+
+    # Greedy pays 8 from 2 to 5 first and then needs four transfers; {2, 4} and {1, 3, 5} need three
+    net_balances = {1: -400, 2: -800, 3: -700, 4: 800, 5: 1100}
+    assert len(calculator.settle_transactions(net_balances, "group")) == 4
+    assert sorted(optimal.settle_transactions(net_balances, "group")) == \
+        [("group", 1, 5, 4.0), ("group", 2, 4, 8.0), ("group", 3, 5, 7.0)]
+
+    rng = random.Random(11)
+    for trial in range(100):
+        net_balances = calculator.calculate_net_balances(random_transactions(rng, rng.randint(2, 14), 20))
+        greedy = calculator.settle_transactions(net_balances, "group")
+        settlements = optimal.settle_transactions(net_balances, "group")
+        assert len(settlements) <= len(greedy), f"Trial {trial}: {settlements} vs {greedy}"
+        remaining = dict(net_balances)
+        for _, debtor, creditor, amount in settlements:
+            remaining[debtor] += to_cents(amount)
+            remaining[creditor] -= to_cents(amount)
+        assert all(cents == 0 for cents in remaining.values()), remaining
+
+    # Too many members left after pairing opposite balances, or no time left: greedy result
+    net_balances = {1: -400, 2: -800, 3: -700, 4: 800, 5: 1100}
+    greedy = calculator.settle_transactions(net_balances, "group")
+    assert optimal_settlements(net_balances, "group", max_members=2) == greedy
+    assert optimal_settlements(net_balances, "group", time_budget=0) == greedy
+
+
+if __name__ == "__main__":
+    test_heap_settlements_match_reference()
+    test_settlements_clear_all_balances()
+    test_splits_add_up_to_the_total()
+    test_optimal_solver_uses_fewest_transfers()
+    print("\nSettlement tests completed successfully!")
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Test script for the versioned settlement cache
+"""
+
+from connection_sqlite import Database
+from user_controller import UserController
+from group_controller import GroupController
+from expense_controller import ExpenseController
+from logic import BalanceCalculator, settlement_cache
+from test_support import temp_database
+
+
+class CountingCalculator(BalanceCalculator):
+    def __init__(self):
+        super().__init__()
+        self.recomputes = 0
+
+    def process_group_settlements(self, group_id, version=None):
+        self.recomputes += 1
+        return super().process_group_settlements(group_id, version)
+
+
+def test_settlements_recompute_only_after_expense_writes():
+    print("Testing settlement cache invalidation...")
+    with temp_database('cache.db'):
+        users = UserController()
+        alice = users.register("cache_alice", "alice@example.com", "secret")['user_id']
+        bob = users.register("cache_bob", "bob@example.com", "secret")['user_id']
+        group_id = GroupController().create_group("Cache Group", alice)['group_id']
+        GroupController().add_user_to_group(group_id, bob)
+        expenses = ExpenseController()
+        expenses.create_expense(group_id, "Dinner", 50.0, alice, [alice, bob])
+
+        calculator = CountingCalculator()
+        first = calculator.get_settlements(group_id)
+        assert [(s["borrower_name"], s["receiver_name"], s["amount"]) for s in first] == [("cache_bob", "cache_alice", 25.0)]
+        assert calculator.get_settlements(group_id) == first
+        assert calculator.recomputes == 1, "Second view should be served from the LRU"
+
+        # A fresh process has an empty LRU but can reuse the stored balance_sheet
+        settlement_cache.clear()
+        assert calculator.get_settlements(group_id) == first
+        assert calculator.recomputes == 1, "balance_sheet is current and should not be recomputed"
+
+        expenses.create_expense(group_id, "Lunch", 50.0, bob, [alice, bob])
+        assert calculator.get_settlements(group_id) == []
+        assert calculator.recomputes == 2, "An expense write must invalidate the cached settlements"
+
+
+def test_store_settlements_writes_only_changes():
+    print("Testing diff-based settlement storage...")
+    with temp_database('diff.db'):
+        users = UserController()
+        alice = users.register("diff_alice", "alice@example.com", "secret")['user_id']
+        bob = users.register("diff_bob", "bob@example.com", "secret")['user_id']
+        carol = users.register("diff_carol", "carol@example.com", "secret")['user_id']
+        group_id = GroupController().create_group("Diff Group", alice)['group_id']
+        expenses = ExpenseController()
+        expenses.create_expense(group_id, "Dinner", 90.0, alice, [alice, bob, carol])
+
+        calculator = CountingCalculator()
+        calculator.get_settlements(group_id)
+
+        def stored_rows():
+            with Database() as db:
+                db.cur.execute("SELECT id, borrower_id, amount FROM balance_sheet WHERE group_id = ? ORDER BY id",
+                               (group_id,))
+                return db.cur.fetchall()
+
+        before = stored_rows()
+        assert [(row[1], row[2]) for row in before] == [(bob, 30.0), (carol, 30.0)]
+
+        # Recomputing unchanged balances touches no rows
+        diff = calculator.store_settlements(calculator.settle_transactions(
+            calculator.get_net_balances(group_id), group_id), group_id)
+        assert not any(diff.values()), diff
+        assert stored_rows() == before
+
+        # Only carol's transfer changes; her row is updated in place
+        expenses.create_custom_expense(group_id, "Taxi", 10.0, alice, {carol: 10.0})
+        settlements = calculator.get_settlements(group_id)
+        assert [(s["borrower_id"], s["amount"]) for s in settlements] == [(carol, 40.0), (bob, 30.0)]
+        after = stored_rows()
+        assert [row[0] for row in after] == [row[0] for row in before]
+
+        # A write that moves no balance still recomputes, but the cached result is kept
+        expenses.create_expense(group_id, "Snacks", 5.0, alice, [alice])
+        recomputes = calculator.recomputes
+        hits = settlement_cache.hits
+        assert calculator.get_settlements(group_id) == settlements
+        assert calculator.recomputes == recomputes + 1
+        assert settlement_cache.hits == hits + 1
+        assert stored_rows() == after
+
+
+if __name__ == "__main__":
+    test_settlements_recompute_only_after_expense_writes()
+    test_store_settlements_writes_only_changes()
+    print("\nSettlement cache tests completed successfully!")
@@ -0,0 +1,56 @@
+"""
+Shared setup for the test scripts, which run under pytest and as plain scripts.
+
+    with temp_database('payments.db'):
+        ...
+
+runs the block against a new, empty SQLite file and puts the previous
+database back afterwards.
+"""
+
+import os
+import tempfile
+from contextlib import contextmanager
+from connection_sqlite import close_all_pools
+from logic import settlement_cache
+
+
+@contextmanager
+def environment(**values):
+    """Set environment variables for the with block (None unsets one), then restore the previous values"""
+    old_env = {key: os.environ.get(key) for key in values}
+    try:
+        for key, value in values.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+        yield
+    finally:
+        for key, value in old_env.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+
+
+@contextmanager
+def temp_database(name='test.db', **env):
+    """
+    Point DB_PATH at a new database file in a temporary directory for the with block.
+
+    Pooled connections and cached settlements are dropped on the way in and
+    out, so nothing carries over between tests. Other variables in env (e.g.
+    DB_POOL_SIZE='1', DB_ARCHIVE_PATH=None) are set for the block as well.
+
+    :return: Path of the database file
+    """
+    db_path = os.path.join(tempfile.mkdtemp(), name)
+    with environment(DB_PATH=db_path, **env):
+        close_all_pools()
+        settlement_cache.clear()
+        try:
+            yield db_path
+        finally:
+            close_all_pools()
+            settlement_cache.clear()
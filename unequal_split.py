@@ -1,3 +1,5 @@
+from money import to_cents, from_cents
+
 class UnequalExpenseSplit:
     def process_split(self, paid_by, user_shares, total_amount):
         """
@@ -9,20 +11,31 @@ class UnequalExpenseSplit:
         :return: List of tuples in format (borrower_id, paid_by_id, amount)
         """
 
-        total_assigned_amount = sum(entry.get("amount", 0) for entry in user_shares)
-        if total_assigned_amount != total_amount:
+        for entry in user_shares:
+            if entry.get("borrower_id") is None or entry.get("amount") is None:
+                raise ValueError(f"Invalid entry format: {entry}")
+
+        # Compared in whole cents, so 0.1 + 0.2 matches a total of 0.3
+        share_cents = [to_cents(entry["amount"]) for entry in user_shares]
+        if sum(share_cents) != to_cents(total_amount):
             raise ValueError("Sum of split amounts must match the total amount.")
 
         split_transactions = []
 
-        for entry in user_shares:
-            user = entry.get("borrower_id")
-            amount = entry.get("amount")
-
-            if user is None or amount is None:
-                raise ValueError(f"Invalid entry format: {entry}")
+        for entry, amount_cents in zip(user_shares, share_cents):
+            user = entry["borrower_id"]
 
             if user != paid_by:  
-                split_transactions.append((user, paid_by, amount))
+                split_transactions.append((user, paid_by, from_cents(amount_cents)))
 
         return split_transactions
+
+    def process_batch(self, expense_idx, borrower_ids, paid_by, total_cents, amount_cents):
+        """
+        Unequal split of many expenses at once; see batch_split for the columnar inputs.
+
+        :param amount_cents: Share amount of each row in minor units
+        :return: batch_split.SplitBatch
+        """
+        from batch_split import split_unequal  # NumPy is only needed for batch splits
+        return split_unequal(expense_idx, borrower_ids, paid_by, total_cents, amount_cents)
@@ -1,7 +1,6 @@
-from connection_sqlite import Database
+from database import Database, DatabaseError, IntegrityError
 from user import User
 import logging
-import sqlite3
 import hashlib
 
 logger = logging.getLogger(__name__)
@@ -18,10 +17,10 @@ class UserController:
                 db.cur.execute(query, values)
                 logger.info(f"User added successfully! ID: {user.get_user_id()}")
                 return user.get_user_id()
-            except sqlite3.IntegrityError as e:
+            except IntegrityError as e:
                 logger.error(f"User already exists: {e}")
                 raise ValueError("User already exists")
-            except sqlite3.Error as e:
+            except DatabaseError as e:
                 logger.error(f"Database error adding user: {e}")
                 raise
 
@@ -35,7 +34,7 @@ class UserController:
                 db.cur.execute(query, (user_id,))
                 result = db.cur.fetchone()
                 return User(result[0], result[1]) if result else None
-            except sqlite3.Error as e:
+            except DatabaseError as e:
                 logger.error(f"Database error fetching user: {e}")
                 return None
 
@@ -46,7 +45,7 @@ class UserController:
                 db.cur.execute(query)
                 results = db.cur.fetchall()
                 return [User(row[0], row[1]) for row in results]
-            except sqlite3.Error as e:
+            except DatabaseError as e:
                 logger.error(f"Database error fetching users: {e}")
                 return []
     
@@ -71,16 +70,16 @@ class UserController:
                     return {'success': False, 'message': 'Email already exists'}
                 
                 # Insert new user
-                db.cur.execute(
+                user_id = db.insert_returning_id(
                     "INSERT INTO users (user_name, email, password_hash) VALUES (?, ?, ?)",
-                    (username, email, password_hash)
+                    (username, email, password_hash),
+                    "user_id"
                 )
                 
-                user_id = db.cur.lastrowid
                 logger.info(f"User registered successfully: {username}")
                 return {'success': True, 'user_id': user_id, 'message': 'Registration successful'}
                 
-            except sqlite3.Error as e:
+            except DatabaseError as e:
                 logger.error(f"Database error during registration: {e}")
                 return {'success': False, 'message': 'Registration failed'}
     
@@ -105,6 +104,6 @@ class UserController:
                 else:
                     return {'success': False, 'message': 'Invalid username or password'}
                     
-            except sqlite3.Error as e:
+            except DatabaseError as e:
                 logger.error(f"Database error during login: {e}")
                 return {'success': False, 'message': 'Login failed'}
\ No newline at end of file
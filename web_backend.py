@@ -6,6 +6,7 @@ Run this and go to http://localhost:8000 to view data
 
 from http.server import HTTPServer, BaseHTTPRequestHandler
 from connection_sqlite import Database
+from ledger_export import FETCH_SIZE
 import json
 import urllib.parse
 
@@ -212,6 +213,11 @@ class SplitWiseHandler(BaseHTTPRequestHandler):
         self.send_json(groups)
     
     def serve_expenses(self):
+        # Written out as one JSON array a fetchmany batch at a time, never holding every expense in memory
+        self.send_response(200)
+        self.send_header('Content-type', 'application/json')
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.end_headers()
         with Database() as db:
             db.cur.execute("""
                 SELECT e.name, u.user_name as paid_by, e.total_amount, 
@@ -221,18 +227,24 @@ class SplitWiseHandler(BaseHTTPRequestHandler):
                 JOIN groups g ON e.group_id = g.group_id
                 ORDER BY e.created_at DESC
             """)
-            expenses = []
-            for row in db.cur.fetchall():
-                expenses.append({
-                    "name": row[0],
-                    "paid_by": row[1],
-                    "amount": float(row[2]),
-                    "split_type": row[3],
-                    "group": row[4],
-                    "created": row[5]
-                })
-        
-        self.send_json(expenses)
+            separator = "["
+            while True:
+                rows = db.cur.fetchmany(FETCH_SIZE)
+                if not rows:
+                    break
+                chunk = []
+                for row in rows:
+                    chunk.append(separator + json.dumps({
+                        "name": row[0],
+                        "paid_by": row[1],
+                        "amount": float(row[2]),
+                        "split_type": row[3],
+                        "group": row[4],
+                        "created": row[5]
+                    }))
+                    separator = ","
+                self.wfile.write("".join(chunk).encode())
+            self.wfile.write(b"[]" if separator == "[" else b"]")
     
     def serve_settlements(self):
         with Database() as db: